@@ -0,0 +1,349 @@
+"""
+fakes.py
+
+Deterministic stand-ins for the two paid backends, used by the offline
+benchmarks:
+
+- FakeSerperServer — a local HTTP server answering Serper-shaped POSTs
+  with canned organic results (plus a configurable latency). Point the
+  planner at it with SERPER_BASE_URL.
+- FakeLLM — a CrewAI BaseLLM that answers every task in the ReAct format
+  the agents expect, calls the same tools a real model would (web_search,
+  budget_calculator), sleeps for a configurable latency and reports token
+  usage, so the crew, tools, compaction and prechecks run for real.
+"""
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crewai import BaseLLM
+
+from travel_planner.validation import parse_budget_table
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha1(text.lower().encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / 4)
+
+
+# ---------------------------------------------------------------------------
+# Serper
+# ---------------------------------------------------------------------------
+class _SerperHandler(BaseHTTPRequestHandler):
+    server_version = "FakeSerper/1.0"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            query = json.loads(self.rfile.read(length) or b"{}").get("q", "")
+        except ValueError:
+            query = ""
+        if self.server.latency_s:
+            time.sleep(self.server.latency_s)
+        with self.server.lock:
+            self.server.requests += 1
+
+        seed = _seed(query)
+        organic = [
+            {
+                "title":   f"{query.title()} — result {i + 1}",
+                "snippet": f"Travellers report about ${20 + (seed >> i) % 180} for {query}. "
+                           f"Open daily, best visited early in the morning.",
+                "link":    f"https://example.com/{seed % 997}/{i}",
+            }
+            for i in range(5)
+        ]
+        body = json.dumps({"organic": organic}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSerperServer:
+    """Serper look-alike on 127.0.0.1; use as a context manager."""
+
+    def __init__(self, latency_s: float = 0.05):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _SerperHandler)
+        self._server.daemon_threads = True
+        self._server.latency_s = latency_s
+        self._server.requests = 0
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-serper", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def __enter__(self) -> "FakeSerperServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---------------------------------------------------------------------------
+# LLM
+# ---------------------------------------------------------------------------
+# task → phrase from its tasks.yaml description, for when from_task is not passed
+_TASK_MARKERS = (
+    ("research_task",       "Research the travel destination"),
+    ("price_research_task", "Gather current price data"),
+    ("transport_leg_task",  "Find how to travel from"),
+    ("budget_task",         "Create a detailed budget breakdown"),
+    ("itinerary_task",      "day-by-day itinerary"),
+    ("validation_task",     "Review the travel plan"),
+)
+
+
+def _content(message) -> str:
+    return str(message.get("content", "")) if isinstance(message, dict) else str(message)
+
+
+def _trip(prompt: str) -> dict:
+    """Destination, days and budget as interpolated into the task prompt."""
+    destination = re.search(
+        r"(?:travel destination:|trip to|travel plan for)\s+(.+?)(?:\.|\s\(|\n)", prompt
+    )
+    days = re.search(r"(\d+)[- ]day", prompt)
+    budget = re.search(r"\$([\d,.]+)\s*USD", prompt)
+    return {
+        "destination": destination.group(1).strip() if destination else "the destination",
+        "num_days":    int(days.group(1)) if days else 3,
+        "budget_usd":  float(budget.group(1).replace(",", "").rstrip(".")) if budget else 0.0,
+    }
+
+
+class FakeLLM(BaseLLM):
+    """
+    Scripted model. `latency_s` is slept once per call, plus
+    completion_tokens / `tokens_per_s` when a generation speed is given.
+    `padding_tokens` appends filler to the research answer to model a
+    verbose model (and exercise compaction).
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.2,
+        tokens_per_s: float = 0.0,
+        padding_tokens: int = 0,
+        **kwargs,
+    ):
+        super().__init__(model="fake/travel-planner", **kwargs)
+        self.latency_s = latency_s
+        self.tokens_per_s = tokens_per_s
+        self.padding_tokens = padding_tokens
+
+    # -- BaseLLM interface --
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 128_000
+
+    def call(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        **kwargs,
+    ) -> str:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        self._emit("_emit_call_started_event", messages=messages, tools=tools,
+                   callbacks=callbacks, available_functions=available_functions,
+                   from_task=from_task, from_agent=from_agent)
+
+        response = self._respond(messages, getattr(from_task, "name", None))
+
+        prompt_tokens = sum(_estimate_tokens(_content(m)) for m in messages)
+        completion_tokens = _estimate_tokens(response)
+        delay = self.latency_s
+        if self.tokens_per_s:
+            delay += completion_tokens / self.tokens_per_s
+        time.sleep(delay)
+
+        self._emit("_track_token_usage_internal", {
+            "prompt_tokens":     prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens":      prompt_tokens + completion_tokens,
+        })
+        self._emit("_emit_call_completed_event", response=response, call_type=_llm_call_type(),
+                   from_task=from_task, from_agent=from_agent, messages=messages)
+        return response
+
+    def _emit(self, method: str, *args, **kwargs) -> None:
+        """Call an optional BaseLLM hook (events / usage); absent hooks are skipped."""
+        hook = getattr(self, method, None)
+        if hook is None:
+            return
+        try:
+            hook(*args, **kwargs)
+        except TypeError:
+            pass
+
+    # -- scripted answers --
+    def _respond(self, messages: list, task_name) -> str:
+        prompt = "\n".join(_content(m) for m in messages)
+        if not task_name:
+            task_name = next((n for n, marker in _TASK_MARKERS if marker in prompt), "research_task")
+        observations = [
+            _content(m).split("Observation:", 1)[1].strip()
+            for m in messages
+            if isinstance(m, dict) and m.get("role") == "assistant" and "Observation:" in _content(m)
+        ]
+        trip = _trip(prompt)
+        # itinerary segments ("itinerary_task.part_2") answer like the itinerary task
+        return getattr(self, f"_{task_name.split('.')[0]}")(trip, prompt, observations)
+
+    @staticmethod
+    def _action(tool: str, args: dict) -> str:
+        return (
+            "Thought: I need more information before answering.\n"
+            f"Action: {tool}\n"
+            f"Action Input: {json.dumps(args)}"
+        )
+
+    @staticmethod
+    def _final(answer: str) -> str:
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+    @staticmethod
+    def _prices(destination: str) -> dict:
+        seed = _seed(destination)
+        return {
+            "rate":       80 + seed % 90,
+            "food":       25 + seed % 40,
+            "transport":  6 + seed % 10,
+            "activities": 12 + seed % 25,
+        }
+
+    def _research_task(self, trip: dict, prompt: str, observations: list) -> str:
+        d = trip["destination"]
+        if not observations:
+            return self._action("web_search", {"query": "; ".join([
+                f"{d} top attractions", f"{d} local food", f"{d} visa currency safety weather",
+                f"{d} best areas to stay",
+            ])})
+        answer = [
+            f"## Overview\n{d} is a lively destination with plenty to see.",
+            "## Top Attractions",
+            *(f"- {d} Sight {i} — a landmark worth half a day." for i in range(1, 7)),
+            "## Local Culture & Food",
+            *(f"- Dish {i}: a local speciality served in most markets." for i in range(1, 5)),
+            "## Practical Tips",
+            "- Visa: check entry rules before booking. Most visitors get visa-free entry.",
+            "- Currency: cards are widely accepted. Carry some cash for markets.",
+            "- Weather: mild during the travel period. Pack a light jacket.",
+            "## Best Areas to Stay",
+            *(f"- District {i} — central, well connected." for i in range(1, 4)),
+        ]
+        if self.padding_tokens:
+            answer.append("## Notes\n" + " ".join(["Additional detail."] * (self.padding_tokens // 4)))
+        return self._final("\n".join(answer))
+
+    def _price_research_task(self, trip: dict, prompt: str, observations: list) -> str:
+        d = trip["destination"]
+        if not observations:
+            return self._action("web_search", {"query": "; ".join([
+                f"{d} mid-range hotel price per night", f"{d} daily food cost",
+                f"{d} metro pass price", f"{d} attraction entry fees",
+            ])})
+        p = self._prices(d)
+        return self._final("\n".join([
+            f"- Accommodation (mid-range): ${p['rate']} per night [example.com]",
+            f"- Food: ${p['food']} per day [example.com]",
+            f"- Local transport: ${p['transport']} per day [example.com]",
+            *(f"- Activities: {d} Sight {i}: ${p['activities'] + i} entry [example.com]" for i in range(1, 4)),
+        ]))
+
+    def _transport_leg_task(self, trip: dict, prompt: str, observations: list) -> str:
+        leg = re.search(r"travel from (.+?) to (.+?) on (\d{4}-\d{2}-\d{2})", prompt)
+        origin, destination, day = leg.groups() if leg else ("A", "B", "")
+        if not observations:
+            return self._action("web_search", {"query": "; ".join([
+                f"{origin} to {destination} train price", f"{origin} to {destination} flight price",
+            ])})
+        price = 20 + _seed(origin + destination) % 120
+        return self._final(
+            f"- {origin} → {destination} ({day}): train, {2 + price % 5}h, ${price} one way [example.com]"
+        )
+
+    def _budget_task(self, trip: dict, prompt: str, observations: list) -> str:
+        if not observations:
+            p = self._prices(trip["destination"])
+            days = trip["num_days"]
+            return self._action("budget_calculator", {
+                "accommodation_per_night": [p["rate"]],
+                "food_per_day":            p["food"],
+                "transport_total":         p["transport"] * days,
+                "activities_total":        (p["activities"] + 2) * days,
+                "num_days":                [days],
+                "budget_usd":              trip["budget_usd"],
+            })
+        return self._final(observations[-1])
+
+    def _itinerary_task(self, trip: dict, prompt: str, observations: list) -> str:
+        days = trip["num_days"]
+        table = parse_budget_table(prompt)
+        spend = 0.0
+        if table.get("total") is not None and table.get("accommodation") is not None:
+            spend = round((table["total"] - table["accommodation"]) / max(days, 1), 2)
+        d = trip["destination"]
+        segment = re.search(r"Write Days (\d+) to (\d+) only", prompt)
+        first, last = (int(segment.group(1)), int(segment.group(2))) if segment else (1, days)
+        blocks = []
+        for n in range(first, last + 1):
+            blocks.append("\n".join([
+                f"**Day {n} — {d} Sight {(n - 1) % 6 + 1}**",
+                f"- Morning: {'Arrival and check-in' if n == 1 else f'Visit {d} Sight {(n - 1) % 6 + 1}'}",
+                "- Afternoon: Walk through the old town and a local market",
+                f"- Evening: {'Check-out and departure' if n == days else 'Dinner at a neighbourhood restaurant'}",
+                f"- Estimated Daily Spend: ${spend:,.2f}",
+            ]))
+        return self._final("\n\n".join(blocks))
+
+    def _validation_task(self, trip: dict, prompt: str, observations: list) -> str:
+        return self._final("\n".join([
+            "- Budget Alignment: PASS — totals come from the budget calculator",
+            "- Scheduling Feasibility: PASS — one main sight per day",
+            "- Consistency Check: PASS — every day is covered",
+            "- Assumptions: prices in USD at current rates",
+            "- Risk Factors: none flagged",
+            "- Overall Verdict: APPROVED ✅",
+        ]))
+
+
+def _llm_call_type():
+    try:
+        from crewai.events.types.llm_events import LLMCallType
+        return LLMCallType.LLM_CALL
+    except ImportError:
+        return None
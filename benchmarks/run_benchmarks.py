@@ -0,0 +1,264 @@
+"""
+run_benchmarks.py
+
+Offline end-to-end benchmark: runs plan_trip over a corpus of trips with
+the LLM and Serper replaced by the deterministic fakes in fakes.py, at
+several concurrency levels, and reports per level:
+
+- wall time and throughput (plans/min)
+- plan latency (p50 / p95) and per-task latency from the run records
+- Python-side overhead: process CPU seconds per plan (the fakes only sleep,
+  so this is the orchestration cost)
+- peak RSS
+
+Results are written to benchmarks/results/; --save-baseline stores them as
+the committed baseline, and every run is compared against that baseline.
+
+    python benchmarks/run_benchmarks.py --concurrency 1,4 --check
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_DEFAULT_CORPUS = os.path.join(_HERE, "corpus.jsonl")
+_DEFAULT_BASELINE = os.path.join(_HERE, "baselines", "offline.json")
+_RESULTS_DIR = os.path.join(_HERE, "results")
+
+# metric → True when higher is better
+_COMPARED = {
+    "plans_per_min":    True,
+    "plan_p50_s":       False,
+    "cpu_per_plan_s":   False,
+    "peak_rss_mb":      False,
+}
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return round(ordered[index], 4)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_HERE,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _isolate(workdir: str, serper_url: str) -> None:
+    """Point every cache, store and output at a scratch dir and the fakes."""
+    os.environ.update({
+        "SERPER_BASE_URL":            serper_url,
+        "SERPER_API_KEY":             "offline-benchmark",
+        "GROQ_API_KEY":               "offline-benchmark",
+        "TRAVEL_PLANNER_CACHE_DIR":   os.path.join(workdir, "cache"),
+        "TRAVEL_PLANNER_OUTPUT_DIR":  os.path.join(workdir, "output"),
+        "TRAVEL_PLANNER_METRICS_DIR": os.path.join(workdir, "metrics"),
+        # every plan must do the full work: no cross-run reuse
+        "SERPER_CACHE_ENABLED":       "0",
+        "RESEARCH_STORE_ENABLED":     "0",
+        "CHECKPOINTS_ENABLED":        "0",
+        "PLAN_STORE_ENABLED":         "0",
+        # the fake server has no quota; concurrency control stays on
+        "SERPER_QPS":                 "0",
+    })
+
+
+def _run_level(plan_trip, corpus: list, concurrency: int, metrics_dir: str) -> dict:
+    """Plan the whole corpus with `concurrency` plans in flight."""
+    def plan(inputs: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            result = plan_trip(inputs)
+            return {"ok": True, "elapsed_s": time.perf_counter() - started, "run_id": result.run_id}
+        except Exception as e:
+            return {"ok": False, "elapsed_s": time.perf_counter() - started, "error": str(e)}
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        outcomes = list(pool.map(plan, corpus))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    ok = [o for o in outcomes if o["ok"]]
+    latencies = [o["elapsed_s"] for o in ok]
+
+    task_latency: dict = {}
+    for o in ok:
+        path = os.path.join(metrics_dir, "runs", f"run_{o['run_id']}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, stats in record.get("tasks", {}).items():
+            if stats.get("duration_s") is not None:
+                task_latency.setdefault(name, []).append(stats["duration_s"])
+
+    return {
+        "concurrency":    concurrency,
+        "plans":          len(outcomes),
+        "failed":         len(outcomes) - len(ok),
+        "errors":         sorted({o["error"] for o in outcomes if not o["ok"]})[:5],
+        "wall_s":         round(wall, 3),
+        "plans_per_min":  round(len(ok) / (wall / 60), 2) if wall else 0.0,
+        "plan_p50_s":     _percentile(latencies, 50),
+        "plan_p95_s":     _percentile(latencies, 95),
+        "cpu_per_plan_s": round(cpu / len(outcomes), 4) if outcomes else 0.0,
+        "peak_rss_mb":    _peak_rss_mb(),
+        "tasks": {
+            name: {"p50_s": _percentile(v, 50), "p95_s": _percentile(v, 95)}
+            for name, v in sorted(task_latency.items())
+        },
+    }
+
+
+def _compare(results: dict, baseline: dict, tolerance: float) -> tuple:
+    """(lines describing each compared metric, the lines that regressed)."""
+    lines, regressions = [], []
+    old_levels = {lvl["concurrency"]: lvl for lvl in baseline.get("levels", [])}
+    for level in results["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        for metric, higher_is_better in _COMPARED.items():
+            before, after = old.get(metric), level.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else ""
+            line = (f"  c={level['concurrency']:<3} {metric:<15} "
+                    f"{before:>10} → {after:<10} ({change:+.1%}) {flag}")
+            lines.append(line)
+            if flag:
+                regressions.append(line)
+    return lines, regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline planner benchmark with fake LLM and Serper.")
+    parser.add_argument("--corpus", default=_DEFAULT_CORPUS, help="JSONL trip inputs (batch format)")
+    parser.add_argument("--concurrency", default="1,2,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--repeat", type=int, default=1, help="Plan the corpus this many times per level")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds per call")
+    parser.add_argument("--llm-tokens-per-s", type=float, default=0.0,
+                        help="Fake generation speed; adds completion_tokens / rate per call")
+    parser.add_argument("--llm-padding", type=int, default=0,
+                        help="Extra tokens in the fake research answer")
+    parser.add_argument("--serper-latency", type=float, default=0.05, help="Fake Serper seconds per request")
+    parser.add_argument("--baseline", default=_DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on any regression")
+    args = parser.parse_args()
+    if args.check and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(
+            f"--check needs a baseline, but {args.baseline} does not exist; "
+            "record one first with --save-baseline"
+        )
+
+    sys.path.insert(0, _HERE)
+    from fakes import FakeLLM, FakeSerperServer
+
+    with tempfile.TemporaryDirectory(prefix="travel_planner_bench_") as workdir, \
+            FakeSerperServer(latency_s=args.serper_latency) as serper:
+        _isolate(workdir, serper.url)
+
+        # imported after _isolate so module-level paths pick up the scratch dirs
+        import travel_planner.crew as crew_module
+        from travel_planner.batch import load_requests, normalise_inputs
+
+        crew_module._get_llm = lambda: FakeLLM(
+            latency_s=args.llm_latency,
+            tokens_per_s=args.llm_tokens_per_s,
+            padding_tokens=args.llm_padding,
+        )
+        corpus = [
+            normalise_inputs(record)
+            for _, record in load_requests(args.corpus)
+            if not isinstance(record, Exception)
+        ] * max(1, args.repeat)
+
+        levels = []
+        for concurrency in (int(c) for c in args.concurrency.split(",") if c.strip()):
+            print(f"→ concurrency {concurrency}: {len(corpus)} plan(s)...", flush=True)
+            level = _run_level(crew_module.plan_trip, corpus, concurrency,
+                               os.environ["TRAVEL_PLANNER_METRICS_DIR"])
+            levels.append(level)
+            print(f"  {level['plans_per_min']} plans/min, p50 {level['plan_p50_s']}s, "
+                  f"CPU {level['cpu_per_plan_s']}s/plan, peak RSS {level['peak_rss_mb']} MB, "
+                  f"{level['failed']} failed", flush=True)
+        serper_requests = serper.requests
+
+    results = {
+        "meta": {
+            "created_at":      datetime.now().isoformat(timespec="seconds"),
+            "commit":          _git_commit(),
+            "python":          platform.python_version(),
+            "platform":        platform.platform(),
+            "corpus":          os.path.relpath(args.corpus, _HERE),
+            "corpus_size":     len(corpus),
+            "llm_latency_s":   args.llm_latency,
+            "llm_tokens_per_s": args.llm_tokens_per_s,
+            "llm_padding":     args.llm_padding,
+            "serper_latency_s": args.serper_latency,
+            "serper_requests": serper_requests,
+        },
+        "levels": levels,
+    }
+
+    os.makedirs(_RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(_RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults → {results_path}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressions = _compare(results, baseline, args.tolerance)
+        print(f"\nAgainst baseline {baseline['meta'].get('commit') or args.baseline}:")
+        print("\n".join(lines) or "  (no matching concurrency levels)")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved → {args.baseline}")
+
+    if any(level["failed"] for level in levels):
+        print("\nSome plans failed; see the errors in the results file.")
+        return 1
+    if regressions and args.check:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+startup.py
+
+Cold-start benchmark for the CLI. Each measurement runs in a fresh
+interpreter (median of --runs):
+
+- import_main_s   — `import travel_planner.main`
+- import_crew_s   — `import travel_planner.crew` (crewai, litellm, pydantic),
+                    the cost deferred until a plan runs
+- first_prompt_s  — process start until the "Destination" prompt is shown
+- side_effects    — files created under logs/ and output/ before the first
+                    prompt (should be 0)
+
+Results go to benchmarks/results/; --save-baseline stores them as
+benchmarks/baselines/startup.json, which later runs are compared against.
+
+    python benchmarks/startup.py --runs 5 --check
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.dirname(_HERE)
+_DEFAULT_BASELINE = os.path.join(_HERE, "baselines", "startup.json")
+_RESULTS_DIR = os.path.join(_HERE, "results")
+_WATCHED_DIRS = ("logs", "output")
+
+_TIMED_IMPORT = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.join(_ROOT, "src"), env.get("PYTHONPATH")]))
+    env["PYTHONUNBUFFERED"] = "1"
+    env.setdefault("GROQ_API_KEY", "startup-benchmark")
+    env.setdefault("SERPER_API_KEY", "startup-benchmark")
+    return env
+
+
+def _time_import(module: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _TIMED_IMPORT.format(module=module)],
+        env=_env(), capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _count_files() -> int:
+    total = 0
+    for name in _WATCHED_DIRS:
+        for _, _, files in os.walk(os.path.join(_ROOT, name)):
+            total += len(files)
+    return total
+
+
+def _time_first_prompt(timeout: float = 60) -> float:
+    """Seconds from spawning the interactive CLI until it asks for the destination."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "from travel_planner.main import run; run()"],
+        env=_env(), cwd=_ROOT,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    seen = b""
+    try:
+        while b"Destination" not in seen:
+            chunk = proc.stdout.read1(4096)
+            if not chunk or time.perf_counter() - started > timeout:
+                raise RuntimeError(f"CLI exited or stalled before the first prompt: {seen[-200:]!r}")
+            seen += chunk
+        return time.perf_counter() - started
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def _median(fn, runs: int) -> float:
+    return round(statistics.median(fn() for _ in range(runs)), 4)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CLI cold-start benchmark.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--baseline", default=_DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on any regression")
+    args = parser.parse_args()
+    if args.check and not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(
+            f"--check needs a baseline, but {args.baseline} does not exist; "
+            "record one first with --save-baseline"
+        )
+
+    files_before = _count_files()
+    first_prompt = _median(_time_first_prompt, args.runs)
+    side_effects = _count_files() - files_before
+
+    results = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python":     sys.version.split()[0],
+            "runs":       args.runs,
+        },
+        "metrics": {
+            "import_main_s":  _median(lambda: _time_import("travel_planner.main"), args.runs),
+            "import_crew_s":  _median(lambda: _time_import("travel_planner.crew"), args.runs),
+            "first_prompt_s": first_prompt,
+            "side_effects":   side_effects,
+        },
+    }
+    for name, value in results["metrics"].items():
+        print(f"  {name:<15} {value}")
+
+    os.makedirs(_RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(_RESULTS_DIR, f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults → {results_path}")
+
+    regressed = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        print("\nAgainst baseline:")
+        for name, after in results["metrics"].items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            worse = (after - before) / before > args.tolerance if before else after > before
+            print(f"  {name:<15} {before:>8} → {after:<8} {'REGRESSION' if worse else ''}")
+            if worse:
+                regressed.append(name)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved → {args.baseline}")
+
+    return 1 if regressed and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,26 @@
 """
-Exporting all tools so crew.py can import from one place
+Exporting all tools so crew.py can import from one place.
+
+The tools pull in crewai, so they are imported on first access rather
+than with the package; `import travel_planner.main` stays cheap.
 """
 
-from travel_planner.tools.serper_tool import SerperSearchTool
-from travel_planner.tools.calculator_tool import calculate_budget
+import importlib
+
+_EXPORTS = {
+    "SerperSearchTool":           "travel_planner.tools.serper_tool",
+    "BudgetCalculatorTool":       "travel_planner.tools.budget_tool",
+    "calculate_budget":           "travel_planner.tools.calculator_tool",
+    "calculate_budget_scenarios": "travel_planner.tools.calculator_tool",
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = ["SerperSearchTool", "calculate_budget"]
\ No newline at end of file
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
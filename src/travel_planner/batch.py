@@ -0,0 +1,201 @@
+"""
+batch.py
+
+Non-interactive batch planning: reads a JSONL file of trip requests,
+runs up to N crews concurrently and writes one result line per request,
+or hands every request to the durable job queue for worker processes.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from travel_planner.logger import get_logger
+from travel_planner.multi_city import parse_stops, route_name
+
+log = get_logger(__name__)
+
+_REQUIRED_FIELDS = ("destination", "start_date", "end_date", "budget_usd")
+
+
+def normalise_inputs(record: dict) -> dict:
+    """
+    Build the inputs dict run_travel_crew expects from one batch record.
+    Accepts the fields at the top level or under an "inputs" key, and
+    derives num_days from the dates when it is missing.
+
+    A multi-city trip gives `stops` ([{"city", "nights"}, ...] or
+    "City: nights; City: nights") whose nights must add up to the trip;
+    its destination defaults to the route, e.g. "Lisbon → Porto".
+    """
+    fields = record.get("inputs", record) if isinstance(record, dict) else record
+    if not isinstance(fields, dict):
+        raise ValueError(f"Expected a JSON object, got {type(fields).__name__}")
+    stops = parse_stops(fields.get("stops"))
+    required = [f for f in _REQUIRED_FIELDS if not (f == "destination" and stops)]
+    missing = [f for f in required if not fields.get(f)]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+
+    start = datetime.strptime(str(fields["start_date"]), "%Y-%m-%d").date()
+    end = datetime.strptime(str(fields["end_date"]), "%Y-%m-%d").date()
+    if end <= start:
+        raise ValueError("end_date must be after start_date")
+
+    budget = float(str(fields["budget_usd"]).replace(",", ""))
+    if budget <= 0:
+        raise ValueError("budget_usd must be positive")
+
+    inputs = {
+        "destination": str(fields.get("destination") or route_name(stops) if len(stops) > 1
+                           else fields.get("destination") or stops[0]["city"]).strip(),
+        "start_date":  str(start),
+        "end_date":    str(end),
+        "num_days":    int(fields.get("num_days") or (end - start).days),
+        "budget_usd":  budget,
+        "preferences": fields.get("preferences") or "None",
+    }
+    if len(stops) > 1:
+        nights = sum(s["nights"] for s in stops)
+        if nights != inputs["num_days"]:
+            raise ValueError(
+                f"Stops add up to {nights} nights but the trip is {inputs['num_days']} days"
+            )
+        inputs["stops"] = stops
+    return inputs
+
+
+def load_requests(path: str) -> list:
+    """
+    Read (request_id, record) pairs from a JSONL file. Lines that are not
+    a valid JSON object are kept as (request_id, error) so they are
+    reported, not lost.
+    """
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                requests.append((f"line-{line_no}", ValueError(f"Invalid JSON: {e}")))
+                continue
+            if not isinstance(record, dict):
+                requests.append((
+                    f"line-{line_no}",
+                    ValueError(f"Expected a JSON object, got {type(record).__name__}"),
+                ))
+                continue
+            request_id = record.get("request_id") or f"line-{line_no}"
+            requests.append((request_id, record))
+    return requests
+
+
+def _plan_one(request_id: str, record) -> dict:
+    """Run one request; failures are captured in the result line."""
+    from travel_planner.crew import plan_trip  # heavy; only needed once planning starts
+
+    started = time.perf_counter()
+    try:
+        if isinstance(record, Exception):
+            raise record
+        result = plan_trip(normalise_inputs(record))
+        return {
+            "request_id":   request_id,
+            "status":       "ok",
+            "output_path":  result.output_path,
+            "total_tokens": result.total_tokens,
+            "elapsed_s":    result.elapsed_s,
+            "shared":       result.shared,
+            "reused":       result.reused,
+        }
+    except Exception as e:
+        log.error(f"[Batch] {request_id} failed: {e}")
+        return {
+            "request_id": request_id,
+            "status":     "error",
+            "error":      str(e),
+            "elapsed_s":  round(time.perf_counter() - started, 2),
+        }
+
+
+def run_batch(input_path: str, results_path: str = "", concurrency: int = 4) -> dict:
+    """
+    Plan every request in input_path with at most `concurrency` crews in
+    flight. Result lines are appended to results_path as requests finish.
+    Returns the aggregate summary.
+    """
+    requests = load_requests(input_path)
+    if not results_path:
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        results_path = os.path.join(
+            os.path.dirname(os.path.abspath(input_path)),
+            f"{stem}.results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+        )
+
+    log.info(
+        f"[Batch] {len(requests)} request(s) from {input_path}, "
+        f"concurrency={concurrency}, results → {results_path}"
+    )
+
+    results = []
+    started = time.perf_counter()
+
+    with open(results_path, "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency),
+                               thread_name_prefix="batch") as pool:
+        futures = [pool.submit(_plan_one, rid, rec) for rid, rec in requests]
+        for future in as_completed(futures):
+            line = future.result()
+            results.append(line)
+            out.write(json.dumps(line) + "\n")
+            out.flush()
+            log.info(f"[Batch] {line['request_id']}: {line['status']} "
+                     f"({len(results)}/{len(requests)})")
+
+    elapsed = time.perf_counter() - started
+    ok = [r for r in results if r["status"] == "ok"]
+    # plans that called the LLM; stored, shared and fully checkpointed ones
+    # cost nothing and would understate the cost of planning a trip
+    planned = [r for r in ok if r.get("total_tokens")]
+    tokens = sum(r["total_tokens"] for r in planned)
+
+    summary = {
+        "requests":        len(results),
+        "succeeded":       len(ok),
+        "failed":          len(results) - len(ok),
+        "reused":          len(ok) - len(planned),
+        "elapsed_s":       round(elapsed, 2),
+        "plans_per_min":   round(len(ok) / (elapsed / 60), 2) if elapsed else 0.0,
+        "tokens_per_plan": round(tokens / len(planned)) if planned else 0,
+        "results_path":    results_path,
+    }
+    log.info(f"[Batch] Summary: {summary}")
+    return summary
+
+
+def enqueue_batch(input_path: str) -> list:
+    """
+    Queue every request in input_path on the durable job queue (see
+    job_store.py) for `plan_workers` to plan. Returns one line per
+    request with its job_id, or its error when the record is invalid.
+    """
+    from travel_planner.job_store import get_job_store
+
+    store = get_job_store()
+    lines = []
+    for request_id, record in load_requests(input_path):
+        try:
+            if isinstance(record, Exception):
+                raise record
+            job = store.submit(normalise_inputs(record))
+            lines.append({"request_id": request_id, "status": "queued", "job_id": job.job_id})
+        except ValueError as e:
+            log.error(f"[Batch] {request_id} not queued: {e}")
+            lines.append({"request_id": request_id, "status": "error", "error": str(e)})
+    log.info(f"[Batch] Queued {sum(l['status'] == 'queued' for l in lines)} job(s) in {store.path}")
+    return lines
@@ -0,0 +1,178 @@
+"""
+checkpoints.py
+
+Saves each task's output to disk as soon as the task completes, so a run
+that dies part-way can resume from the last good task.
+
+A checkpoint is keyed on the task name plus only the inputs that task
+depends on. Research and price lookups ignore the budget and preferences,
+so changing those reuses them and reruns just the downstream tasks.
+
+Checkpoints exist to resume a run that died. Once a run finishes, a
+repeat of the same request starts over rather than replaying it (reusing
+finished plans is the plan store's job); a rerun of chosen tasks still
+reuses the finished run's upstream outputs.
+"""
+
+import copy
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.paths import cache_path
+
+log = get_logger(__name__)
+
+_ALL_FIELDS = ("destination", "start_date", "end_date", "num_days", "budget_usd", "preferences")
+
+# Inputs each task's output depends on; anything not listed uses all fields
+_TASK_FIELDS = {
+    "research_task":       ("destination", "start_date", "end_date", "num_days"),
+    "price_research_task": ("destination", "start_date", "end_date", "num_days"),
+    # multi-city transport legs (see multi_city.py): shared by every trip taking the
+    # leg with the same preferences, which the leg prompt includes
+    "transport_leg_task":  ("leg_from", "leg_to", "leg_date", "preferences"),
+}
+
+_DEFAULT_MAX_AGE_HOURS = 24
+
+
+def checkpoint_key(task_name: str, inputs: dict) -> str:
+    """Stable hash of the task name and the inputs it depends on."""
+    fields = _TASK_FIELDS.get(task_name, _ALL_FIELDS)
+    material = {"task": task_name, **{f: str(inputs.get(f, "")).strip().lower() for f in fields}}
+    if inputs.get("stops") and task_name != "transport_leg_task":
+        material["stops"] = [[s["city"].strip().lower(), int(s["nights"])] for s in inputs["stops"]]
+    return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+
+class CheckpointStore:
+    """One JSON file per (task, key) under the checkpoint directory."""
+
+    def __init__(self, root: str, max_age_s: float):
+        self.root = root
+        self.max_age_s = max_age_s
+        self.not_before = 0.0  # checkpoints saved earlier are not loaded
+        self._lock = threading.Lock()
+
+    def _path(self, task_name: str, inputs: dict) -> str:
+        return os.path.join(self.root, task_name, f"{checkpoint_key(task_name, inputs)}.json")
+
+    def save(self, task_name: str, inputs: dict, raw: str) -> None:
+        path = self._path(task_name, inputs)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"task": task_name, "inputs": inputs, "raw": raw, "saved_at": time.time()}
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp, path)
+        log.info(f"[Checkpoint] Saved {task_name}")
+
+    def load(self, task_names: list, inputs: dict) -> dict:
+        """Task name → raw output for every fresh checkpoint matching the inputs."""
+        found = {}
+        now = time.time()
+        for name in task_names:
+            path = self._path(name, inputs)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            saved_at = record.get("saved_at", 0)
+            if now - saved_at > self.max_age_s or saved_at < self.not_before:
+                continue
+            found[name] = record["raw"]
+        if found:
+            log.info(f"[Checkpoint] Resuming with: {', '.join(found)}")
+        return found
+
+    def discard(self, task_names: list, inputs: dict) -> None:
+        for name in task_names:
+            try:
+                os.remove(self._path(name, inputs))
+            except OSError:
+                pass
+
+    # --- finished runs ---
+    def _finished_path(self, inputs: dict) -> str:
+        return os.path.join(self.root, "finished", f"{checkpoint_key('plan', inputs)}.json")
+
+    def finished_at(self, inputs: dict) -> Optional[float]:
+        """When a run with these inputs last finished, if within max age."""
+        try:
+            with open(self._finished_path(inputs), encoding="utf-8") as f:
+                finished = json.load(f)["finished_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return finished if time.time() - finished <= self.max_age_s else None
+
+    def for_run(self, inputs: dict, rerun: tuple = ()) -> "CheckpointStore":
+        """
+        The store as one run should see it. After a run with these inputs
+        finished, a plain repeat ignores the checkpoints saved up to then
+        and plans afresh; with `rerun`, the finished run's outputs upstream
+        of the rerun tasks are reused as before.
+        """
+        finished = self.finished_at(inputs)
+        if rerun or finished is None:
+            return self
+        view = copy.copy(self)
+        view.not_before = finished
+        return view
+
+    # --- last run, for the replay command ---
+    def record_run(self, inputs: dict, status: str) -> None:
+        path = os.path.join(self.root, "last_run.json")
+        os.makedirs(self.root, exist_ok=True)
+        now = time.time()
+        with self._lock, open(path, "w", encoding="utf-8") as f:
+            json.dump({"inputs": inputs, "status": status, "updated_at": now}, f)
+        if status == "done":
+            finished = self._finished_path(inputs)
+            os.makedirs(os.path.dirname(finished), exist_ok=True)
+            with open(finished, "w", encoding="utf-8") as f:
+                json.dump({"finished_at": now}, f)
+
+    def last_run(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.root, "last_run.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def prune(self) -> None:
+        """Delete checkpoints older than max age."""
+        cutoff = time.time() - self.max_age_s
+        for path in glob.glob(os.path.join(self.root, "*", "*.json")):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """
+    Return the process-wide store, or None when disabled via
+    CHECKPOINTS_ENABLED=0. Age limit comes from CHECKPOINT_MAX_AGE_HOURS.
+    """
+    global _store
+    if os.getenv("CHECKPOINTS_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _store_lock:
+        if _store is None:
+            hours = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", _DEFAULT_MAX_AGE_HOURS))
+            root = os.path.dirname(cache_path("checkpoints", "last_run.json"))
+            _store = CheckpointStore(root, hours * 3600)
+            _store.prune()
+        return _store
@@ -0,0 +1,184 @@
+"""
+compaction.py
+
+Shrinks task outputs before downstream tasks receive them as context.
+Instead of the full prose, each downstream task gets the structured facts
+it needs: attraction / food / area names and short practical tips from the
+research, the price lines from the price research, and the table from the
+budget. Each compacted output is held to a per-task token budget.
+
+The full text is still what ends up in the Markdown plan; only the
+context handed to later agents is compacted. Multi-city outputs are
+compacted per stop (see multi_city.py), each part to the task's budget.
+"""
+
+import math
+import os
+import re
+from typing import Optional
+
+from travel_planner.logger import get_logger
+
+log = get_logger(__name__)
+
+# Approximate token budget for each task's output as downstream context
+_DEFAULT_BUDGETS = {
+    "research_task":       450,
+    "price_research_task": 250,
+    "budget_task":         300,
+}
+
+_HEADING = re.compile(r"^\s*(#{1,6}\s+.+|\*\*[^*\n]+\*\*:?\s*|[A-Z][^:\n|]{2,50}:\s*)$")
+_ITEM = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.+)$")
+_AMOUNT = re.compile(r"[$€£]\s*\d")
+_STOP_PART = re.compile(r"^### (?:Stop \d+: .+|Transport between stops)$", re.MULTILINE)
+
+# research section → label, matched on heading keywords
+_RESEARCH_SECTIONS = (
+    ("Attractions",    ("attraction", "sight", "must-see", "landmark")),
+    ("Food & culture", ("culture", "food", "cuisine", "dining", "experience")),
+    ("Areas to stay",  ("stay", "neighbourhood", "neighborhood", "area", "district")),
+    ("Practical tips", ("tip", "practical", "visa", "currency", "safety", "weather", "transport")),
+)
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count (≈4 characters per token) for a string or LLM message list."""
+    if isinstance(text, list):
+        text = " ".join(
+            str(m.get("content", "")) if isinstance(m, dict) else str(m) for m in text
+        )
+    return math.ceil(len(str(text or "")) / 4)
+
+
+def _load_budgets() -> dict:
+    """Defaults, overridden by TRAVEL_PLANNER_CONTEXT_BUDGETS="research_task=600,budget_task=200"."""
+    budgets = dict(_DEFAULT_BUDGETS)
+    raw = os.getenv("TRAVEL_PLANNER_CONTEXT_BUDGETS", "")
+    for item in filter(None, (p.strip() for p in raw.split(","))):
+        try:
+            name, tokens = item.split("=", 1)
+            budgets[name.strip()] = int(tokens)
+        except ValueError:
+            log.warning(f"[Compaction] Ignoring malformed budget entry: '{item}'")
+    return budgets
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"[*_`#]+", "", text).strip()
+
+
+def _item_name(text: str) -> str:
+    """The name part of a bullet: text before a dash, colon or bracket."""
+    return re.split(r"\s+[—–-]\s+|:\s|\s\(", _clean(text), maxsplit=1)[0].strip(" .")
+
+
+def _first_sentence(text: str, limit: int = 120) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", _clean(text), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[: limit - 1].rstrip() + "…"
+
+
+def _compact_research(raw: str) -> list:
+    """One line per research section with its item names / short tips."""
+    sections: dict = {}
+    current = None
+    for line in raw.splitlines():
+        if _HEADING.match(line) and not _ITEM.match(line):
+            heading = _clean(line).lower()
+            current = next(
+                (label for label, keys in _RESEARCH_SECTIONS if any(k in heading for k in keys)),
+                None,
+            )
+            continue
+        item = _ITEM.match(line)
+        if current and item:
+            sections.setdefault(current, []).append(item.group(1))
+
+    lines = []
+    for label, _ in _RESEARCH_SECTIONS:
+        items = sections.get(label)
+        if not items:
+            continue
+        if label == "Practical tips":
+            lines.append(f"{label}:")
+            lines.extend(f"- {_first_sentence(i)}" for i in items)
+        else:
+            lines.append(f"{label}: " + "; ".join(_item_name(i) for i in items))
+    return lines
+
+
+def _compact_prices(raw: str) -> list:
+    """Only the lines that carry a price figure, without source links."""
+    lines = []
+    for line in raw.splitlines():
+        if _AMOUNT.search(line):
+            lines.append(re.sub(r"\s*\((?:https?://|source)[^)]*\)|\s*\[[^\]]*\]$", "", line.strip()))
+    return lines
+
+
+def _compact_budget(raw: str) -> list:
+    """The budget table rows and the status line."""
+    return [
+        line.strip()
+        for line in raw.splitlines()
+        if line.strip().startswith("|") or "budget status" in line.lower()
+    ]
+
+
+_EXTRACTORS = {
+    "research_task":       _compact_research,
+    "price_research_task": _compact_prices,
+    "budget_task":         _compact_budget,
+}
+
+
+def _fit(lines: list, budget: int) -> str:
+    """Keep whole lines, in order, until the token budget is reached."""
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def _split_stops(raw: str) -> list:
+    """(heading, body) per stop of a multi-city output; [] for a single-city one."""
+    headings = list(_STOP_PART.finditer(raw))
+    if len(headings) < 2:
+        return []
+    ends = [m.start() for m in headings[1:]] + [len(raw)]
+    return [(m.group(0), raw[m.end():end]) for m, end in zip(headings, ends)]
+
+
+def compact_output(task_name: str, raw: str) -> Optional[str]:
+    """
+    Compacted context for a task's output, or None when the task is not
+    compacted (no downstream consumers, or TRAVEL_PLANNER_COMPACTION=0).
+    Falls back to truncating the raw text when nothing could be extracted.
+    """
+    if os.getenv("TRAVEL_PLANNER_COMPACTION", "1").lower() in ("0", "false", "no"):
+        return None
+    extractor = _EXTRACTORS.get(task_name)
+    if extractor is None or not raw:
+        return None
+
+    budget = _load_budgets().get(task_name, _DEFAULT_BUDGETS.get(task_name, 400))
+    parts = _split_stops(raw) or [("", raw)]
+    before = estimate_tokens(raw)
+    if before <= budget * len(parts):
+        log.info(f"[Compaction] {task_name}: {before} tokens, within budget {budget * len(parts)}")
+        return None
+
+    compacted_parts = []
+    for heading, body in parts:
+        lines = extractor(body) or [l for l in body.splitlines() if l.strip()]
+        compacted_parts.append("\n".join(filter(None, (heading, _fit(lines, budget)))))
+    compacted = "\n\n".join(compacted_parts)
+    log.info(
+        f"[Compaction] {task_name}: {before} → {estimate_tokens(compacted)} tokens "
+        f"(budget {budget}{f' × {len(parts)} stops' if len(parts) > 1 else ''})"
+    )
+    return compacted
@@ -1,50 +1,184 @@
+import asyncio
+import contextvars
+import copy
 import os 
-from datetime import datetime
-from typing import Any
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
 
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
+from crewai.tasks.task_output import TaskOutput
+import yaml
 
-from travel_planner.logger import get_logger
+from travel_planner.checkpoints import checkpoint_key, get_checkpoint_store
+from travel_planner.compaction import compact_output
+from travel_planner.itinerary_segments import merge_segments, plan_segments, segment_inputs
+from travel_planner.llm_registry import get_llm
+from travel_planner.logger import enable_file_logging, get_logger, log_context
+from travel_planner.multi_city import combine, is_multi_city, leg_inputs, legs, stop_inputs, with_route
+from travel_planner.metrics import RunRecorder, bind_tasks, finish_run, span, start_run, task_scope
+from travel_planner.plan_store import get_plan_store
+from travel_planner.plan_writer import PlanSection, PlanWriter, assemble
+from travel_planner.research_store import get_research_store
+from travel_planner.scheduler import downstream_of, schedule_tasks
+from travel_planner.single_flight import SingleFlight
+from travel_planner.streaming import PlanCancelled, TokenChunk, bind_stream, unbind_stream
+from travel_planner.tools.budget_tool import BudgetCalculatorTool
+from travel_planner.tools.search_cache import get_search_cache
 from travel_planner.tools.serper_tool import SerperSearchTool
+from travel_planner.validation import precheck
 
 
 log = get_logger(__name__)
-# Output directory at project root
-_PROJECT_ROOT = os.path.abspath(
-    os.path.join(os.path.dirname(__file__), "..", "..",)
-)
-_OUTPUT_DIR = os.path.join(_PROJECT_ROOT, "output")
-os.makedirs(_OUTPUT_DIR, exist_ok=True)
 
 
 
 def _get_llm() -> LLM:
     """
-    CrewAI LLM pointed at Groq via LiteLLM.
+    CrewAI LLM pointed at Groq via LiteLLM, from the shared registry
+    (settings read once, pooled HTTP connections).
     """
-    api_key = os.getenv("GROQ_API_KEY", "")
-    if not api_key:
-        log.error("GROQ_API_KEY is not set.")
-        raise EnvironmentError(
-            "GROQ_API_KEY is missing. Add it to the .env file"
-        )
-    return LLM(
-        model="groq/meta-llama/llama-4-scout-17b-16e-instruct",
-        api_key=api_key,
-        temperature=0.3,
+    return get_llm()
+
+
+_yaml_cache: dict = {}
+_yaml_lock = threading.Lock()
+
+
+def _load_yaml_cached(config_path) -> dict:
+    """
+    Parse a config YAML once per process (re-read when the file changes).
+    Callers get a deep copy, since CrewBase fills agent configs in place.
+    """
+    path = str(config_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    with _yaml_lock:
+        parsed = _yaml_cache.get(key)
+        if parsed is None:
+            with open(path, encoding="utf-8") as f:
+                parsed = yaml.safe_load(f)
+            parsed = parsed if isinstance(parsed, dict) else {}
+            _yaml_cache[key] = parsed
+    return copy.deepcopy(parsed)
+
+def _task_output(t: Task, raw: str) -> TaskOutput:
+    """A TaskOutput for text produced outside the crew (stored or computed)."""
+    return TaskOutput(
+        name = t.name,
+        description = t.description,
+        expected_output = t.expected_output,
+        raw = raw,
+        agent = t.agent.role if t.agent else "",
     )
 
+
+class TrackedTask(Task):
+    """
+    Task that executes inside metrics.task_scope(), so its LLM calls,
+    searches and log records are attributed to its run even when CrewAI
+    runs it async on a thread of its own.
+    """
+
+    def _execute_core(self, agent, context, tools):
+        with task_scope(str(self.id)):
+            return super()._execute_core(agent, context, tools)
+
+
 @CrewBase
 class TravelPlannerCrew:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
-    # ---shared tool---
+    # run after the main crew, once the code-side prechecks have seen its output
+    _POST_CHECK_TASKS = ("validation_task",)
+    # tasks.yaml entries used as templates for side crews, not tasks of the main crew
+    _TEMPLATE_TASKS = ("itinerary_segment_task", "transport_leg_task")
+
+    # ---shared tools---
     def __init__(self):
+        # CrewBase parses agents.yaml / tasks.yaml right after __init__;
+        # serve them from the process-wide cache instead
+        self.load_yaml = _load_yaml_cached
         self._search_tool = SerperSearchTool()
+        self._budget_tool = BudgetCalculatorTool()
+        self._prefilled: dict = {}
+        self._deferred: tuple = ()
+        self._side_agents: list = []
+        self._task_callbacks: list = []
+        self._completed: dict = {}
         log.info("[Crew] TravelPlannerCrew initialised.")
 
+    def prefill(self, outputs: dict, deferred: tuple = ()) -> None:
+        """
+        Use stored text (task name → raw output) instead of running those
+        tasks in the next crew(). Pass {} to run every task. Tasks in
+        `deferred` are left out of the crew because the caller produces
+        them separately (e.g. a segmented itinerary). Starts a new run,
+        so completed_outputs() is cleared.
+        """
+        self._prefilled = dict(outputs)
+        self._deferred = tuple(deferred)
+        self._completed = {}
+
+    def clear_side_crews(self) -> None:
+        """Forget the side-crew agents of the previous run (see side_crew)."""
+        self._side_agents = []
+
+    def set_task_callbacks(self, callbacks: list) -> None:
+        """Functions called with each TaskOutput as its task completes."""
+        self._task_callbacks = list(callbacks)
+
+    def completed_outputs(self) -> dict:
+        """Full (uncompacted) text of every task completed in this run."""
+        return dict(self._completed)
+
+    def all_tasks(self) -> list:
+        """Every task declared in tasks.yaml, in declaration order."""
+        return [getattr(self, name)() for name in self.tasks_config if name not in self._TEMPLATE_TASKS]
+
+    def token_usage(self) -> dict:
+        """
+        Token counters summed over this instance's agents. CrewAI keeps them
+        on each agent's LLM for its lifetime, so a reused instance reports
+        the totals of every run it has done; plan_trip takes the difference.
+        """
+        totals = dict.fromkeys(
+            ("prompt_tokens", "completion_tokens", "total_tokens", "successful_requests"), 0
+        )
+        agents = [getattr(self, name)() for name in self.agents_config] + self._side_agents
+        for a in agents:
+            llm = a.llm
+            summary = llm.get_token_usage_summary() if hasattr(llm, "get_token_usage_summary") else None
+            for key in totals:
+                totals[key] += getattr(summary, key, 0) or 0
+        return totals
+
+    def set_streaming(self, enabled: bool) -> None:
+        """Stream completions (LLMStreamChunkEvent per chunk) from every agent's LLM."""
+        for name in self.agents_config:
+            getattr(self, name)().llm.stream = enabled
+
+    def record_output(self, task_name: str, raw: str) -> None:
+        """Report text produced in code for a task as if the task had run."""
+        t = getattr(self, task_name)()
+        t.output = _task_output(t, raw)
+        self._on_task_complete(t.output)
+
+    def _on_task_complete(self, output: TaskOutput) -> None:
+        self._completed[output.name] = output.raw
+        for callback in self._task_callbacks:
+            callback(output)
+        # downstream tasks read output.raw as context, so hand them the
+        # compact facts; the full text stays in completed_outputs()
+        compacted = compact_output(output.name, output.raw)
+        if compacted is not None:
+            output.raw = compacted
+
     # ---agents---
     @agent
     def destination_researcher(self) -> Agent:
@@ -54,7 +188,7 @@ class TravelPlannerCrew:
         """
         log.info("[Agent] Building destination_researcher agent")
         return Agent(
-            config = self.agents_config["budget_planner"],
+            config = self.agents_config["destination_researcher"],
             tools = [self._search_tool],
             llm = _get_llm(),
             verbose = True,
@@ -65,12 +199,13 @@ class TravelPlannerCrew:
     def budget_planner(self) -> Agent:
         """
         Loads config from agents.yaml → budget_planner.
-        Uses Serper to fetch real price data.
+        Uses Serper to fetch real price data and the budget calculator
+        for the arithmetic.
         """
         log.info("[Agent] Building budget_planner")
         return Agent(
             config=self.agents_config["budget_planner"],
-            tools=[self._search_tool],
+            tools=[self._search_tool, self._budget_tool],
             llm=_get_llm(),
             verbose=True,
             allow_delegation=False,
@@ -112,22 +247,36 @@ class TravelPlannerCrew:
     def research_task(self) -> Task:
         """Loads description/expected_output from tasks.yaml → research_task."""
         log.info("[Task] Building research_task")
-        return Task(
+        return TrackedTask(
             config = self.tasks_config["research_task"],
             agent = self.destination_researcher(),
         )
     
+    @task
+    def price_research_task(self) -> Task:
+        """
+        Loads config from tasks.yaml → price_research_task.
+        Needs no prior context, so it runs alongside research_task.
+        """
+        log.info("[Task] Building price_research_task")
+        return TrackedTask(
+            config = self.tasks_config["price_research_task"],
+            agent = self.budget_planner(),
+            tools = [self._search_tool],
+            context = [],
+        )
+
     @task
     def budget_task(self) -> Task:
         """
         Loads config from tasks.yaml → budget_task.
-        Context: research_task output is passed forward automatically.
+        Context: research + price research outputs.
         """
         log.info("[Task] Building budget_task")
-        return Task(
+        return TrackedTask(
             config = self.tasks_config["budget_task"],
             agent = self.budget_planner(),
-            context = [self.research_task()],
+            context = [self.research_task(), self.price_research_task()],
         )
     
     @task
@@ -137,7 +286,7 @@ class TravelPlannerCrew:
         Context: research + budget task outputs.
         """
         log.info("[Task] Building itinerary_task")
-        return Task(
+        return TrackedTask(
             config = self.tasks_config["itinerary_task"],
             agent = self.itinerary_designer(),
             context = [self.research_task(), self.budget_task()],
@@ -147,47 +296,183 @@ class TravelPlannerCrew:
     def validation_task(self) -> Task:
         """
         Loads config from tasks.yaml → validation_task.
-        Context: all three prior task outputs.
+        Context: none — it receives the compact {precheck_findings} summary
+        instead of the full research, budget and itinerary texts.
         """
         log.info("[Task] Building validation_task")
-        return Task(
+        return TrackedTask(
             config = self.tasks_config["validation_task"],
             agent = self.validation_agent(),
-            context = [
-                self.research_task(),
-                self.budget_task(),
-                self.itinerary_task(),
-            ],
+            context = [],
         )
     
     # ---crew----
     @crew
     def crew(self) -> Crew:
-        log.info("[Crew] Assembling crew in sequential process")
+        """Entry point for the crewai CLI; see build_crew()."""
+        return self.build_crew()
+
+    def build_crew(self) -> Crew:
+        """
+        Tasks are reordered into dependency waves; independent tasks are
+        marked async so the sequential process runs them concurrently.
+
+        CrewBase memoizes crew() per instance, so a reused instance calls
+        this directly to get a crew for its current prefill. Agents and
+        tasks themselves are memoized and shared between those crews.
+        """
+        log.info("[Crew] Assembling crew with dependency-aware scheduling")
+
+        # prefilled tasks are left out; setting their output up front is what
+        # downstream tasks read as context. Clear outputs left by a previous run.
+        tasks = []
+        for t in self.all_tasks():
+            if t.name in self._POST_CHECK_TASKS:
+                continue
+            if t.name in self._deferred:
+                t.output = None
+                continue
+            if t.name in self._prefilled:
+                log.info(f"[Crew] Reusing stored output for {t.name}")
+                raw = self._prefilled[t.name]
+                t.output = _task_output(t, compact_output(t.name, raw) or raw)
+            else:
+                t.output = None
+                tasks.append(t)
+
+        return Crew(
+            agents = [getattr(self, name)() for name in self.agents_config],
+            tasks = schedule_tasks(tasks),
+            process = Process.sequential,
+            task_callback = self._on_task_complete,
+            verbose = True,
+        )
+
+    def side_crew(
+        self,
+        task_key: str,
+        agent_key: str,
+        name: str,
+        search: bool = False,
+        context: tuple = (),
+    ) -> Crew:
+        """
+        Single-task crew for work split off the main crew (itinerary
+        segments, per-city research, transport legs), with a fresh agent
+        so several can run at once. `task_key` / `agent_key` select the
+        tasks.yaml / agents.yaml entries; `name` names the task.
+        """
+        worker = Agent(
+            config = self.agents_config[agent_key],
+            tools = [self._search_tool] if search else [],
+            llm = _get_llm(),
+            verbose = True,
+            allow_delegation = False,
+        )
+        self._side_agents.append(worker)
+        side_task = TrackedTask(
+            config = self.tasks_config[task_key],
+            name = name,
+            agent = worker,
+            context = list(context),
+        )
+        return Crew(
+            agents = [worker],
+            tasks = [side_task],
+            process = Process.sequential,
+            verbose = True,
+        )
+
+    def validation_crew(self) -> Crew:
+        """Single-task crew for the LLM validator, run after the prechecks."""
+        validation = self.validation_task()
+        validation.output = None
         return Crew(
-            agents = self.agents, # will be auto collected by @CrewBase from @agent methods
-            tasks = self.tasks,
+            agents = [self.validation_agent()],
+            tasks = [validation],
             process = Process.sequential,
+            task_callback = self._on_task_complete,
             verbose = True,
         )
     
+class CrewPool:
+    """
+    Idle TravelPlannerCrew instances kept for reuse, so a new plan only
+    pays for input interpolation, not for building agents, tools and tasks.
+    A crew whose run raised is dropped rather than returned to the pool.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self._idle: list = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        with self._lock:
+            travel_crew = self._idle.pop() if self._idle else None
+        if travel_crew is None:
+            log.info("[Runner] Initialising TravelPlannerCrew...")
+            travel_crew = TravelPlannerCrew()
+        yield travel_crew  # an exception skips the return below
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(travel_crew)
+
+    def warm(self, count: int) -> None:
+        """Build crews up front (e.g. one per service worker) and keep at least that many."""
+        built = [TravelPlannerCrew() for _ in range(count)]
+        with self._lock:
+            self.max_idle = max(self.max_idle, count)
+            self._idle.extend(built[: self.max_idle - len(self._idle)])
+
+
+_crew_pool: "CrewPool | None" = None
+_crew_pool_lock = threading.Lock()
+
+
+def get_crew_pool() -> CrewPool:
+    """Process-wide crew pool; TRAVEL_PLANNER_CREW_POOL sets how many idle crews are kept."""
+    global _crew_pool
+    with _crew_pool_lock:
+        if _crew_pool is None:
+            _crew_pool = CrewPool(int(os.getenv("TRAVEL_PLANNER_CREW_POOL", "4")))
+        return _crew_pool
+
+
+@dataclass
+class PlanResult:
+    """Outcome of one planning run: where the plan was saved and what it cost."""
+    output_path: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    llm_calls: int = 0
+    elapsed_s: float = 0.0
+    run_id: str = ""
+    # True when this caller joined an identical run already in flight
+    # (tokens are then 0: the run was paid for by the caller that started it)
+    shared: bool = False
+    # True when a fresh stored plan was returned without running the crew
+    reused: bool = False
+
+
 # Token Usage Logger
-def _log_token_usage(result: Any) -> None:
+def _log_token_usage(before: dict, after: dict) -> dict:
     """
-    Extract and log token usage from the crew result.
+    Log the token usage of one run from the crew's counters before and
+    after it (see TravelPlannerCrew.token_usage). Returns the counts
+    (empty if unavailable).
     """
     try:
-        usage = getattr(result, "token_usage", None)
+        prompt_tokens     = after["prompt_tokens"] - before["prompt_tokens"]
+        completion_tokens = after["completion_tokens"] - before["completion_tokens"]
+        total_tokens      = after["total_tokens"] - before["total_tokens"]
+        successful_calls  = after["successful_requests"] - before["successful_requests"]
 
-        if not usage:
-            log.warning("[Tokens] No token usage data available in result.")
-            return
-
-        # Extract fields — CrewAI returns a UsageMetrics object
-        prompt_tokens     = getattr(usage, "prompt_tokens", 0)
-        completion_tokens = getattr(usage, "completion_tokens", 0)
-        total_tokens      = getattr(usage, "total_tokens", 0)
-        successful_calls  = getattr(usage, "successful_requests", 0)
+        if not successful_calls and not total_tokens:
+            log.warning("[Tokens] No token usage data available for this run.")
+            return {}
 
         log.debug(f"[Tokens] prompt_tokens     : {prompt_tokens}")
         log.debug(f"[Tokens] completion_tokens : {completion_tokens}")
@@ -206,16 +491,101 @@ def _log_token_usage(result: Any) -> None:
         log.info(summary)
         print(summary)
 
+        return {
+            "prompt_tokens":     prompt_tokens or 0,
+            "completion_tokens": completion_tokens or 0,
+            "total_tokens":      total_tokens or 0,
+            "llm_calls":         successful_calls or 0,
+        }
+
     except Exception as e:
         log.warning(f"[Tokens] Could not read token usage: {e}")
+        return {}
 
 
 # --execute command --
-def run_travel_crew(inputs: dict) -> str:
+def run_travel_crew(
+    inputs: dict,
+    on_section: Optional[Callable[[PlanSection], None]] = None,
+    on_token: Optional[Callable[[TokenChunk], None]] = None,
+) -> str:
     """
     Instantiate the crew, kick it off with the given inputs dict,
-    and save the result to a Markdown file.
+    and save the result to a Markdown file. Returns the file path.
     """
+    return plan_trip(inputs, on_section=on_section, on_token=on_token).output_path
+
+
+def plan_trip(
+    inputs: dict,
+    travel_crew: "TravelPlannerCrew | None" = None,
+    rerun: tuple = (),
+    on_section: Optional[Callable[[PlanSection], None]] = None,
+    on_token: Optional[Callable[[TokenChunk], None]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> PlanResult:
+    """
+    Same as run_travel_crew, but returns a PlanResult with token usage
+    and wall time for callers that aggregate runs (batch mode).
+
+    Without `travel_crew`, an idle crew is leased from the process-wide
+    CrewPool, so its agents, tools and tasks are reused and kickoff only
+    re-interpolates the inputs. Callers can also pass a TravelPlannerCrew
+    they own. One instance must not be used by two runs at the same time.
+
+    Completed tasks are checkpointed, and matching checkpoints are reused,
+    so a failed run resumes where it stopped. Task names in `rerun` (and
+    everything downstream of them) are discarded and run again.
+
+    Timings and token counts are exported as a run record and Prometheus
+    metrics (see metrics.py).
+
+    The Markdown file is written incrementally (see plan_writer.py); each
+    part is also passed to `on_section` as soon as it is on disk.
+
+    With `on_token`, the agents' LLMs stream for this run and every chunk
+    is passed on as a TokenChunk. Setting `cancel` stops the run at the
+    next task boundary.
+
+    Pooled runs with the same inputs (and rerun) as a run already in
+    flight join it rather than planning again (see _coalesced_plan), and
+    ones matching a fresh plan in the plan store return that plan at once
+    (see plan_store.py). Finished plans are added to the store.
+    """
+    if travel_crew is None:
+        if not rerun and on_token is None:
+            stored = _stored_plan(inputs, on_section)
+            if stored is not None:
+                return stored
+        if on_token is None and cancel is None and _coalescing_enabled():
+            return _coalesced_plan(inputs, rerun, on_section)
+        with get_crew_pool().lease() as pooled:
+            return plan_trip(
+                inputs, travel_crew=pooled, rerun=rerun,
+                on_section=on_section, on_token=on_token, cancel=cancel,
+            )
+
+    inputs = with_route(inputs)
+    started = time.perf_counter()
+    enable_file_logging()
+    recorder = start_run(inputs)
+    with log_context(run_id=recorder.run_id):
+        return _run_plan(
+            travel_crew, inputs, rerun, on_section, on_token, cancel, recorder, started
+        )
+
+
+def _run_plan(
+    travel_crew: TravelPlannerCrew,
+    inputs: dict,
+    rerun: tuple,
+    on_section: Optional[Callable[[PlanSection], None]],
+    on_token: Optional[Callable[[TokenChunk], None]],
+    cancel: Optional[threading.Event],
+    recorder: RunRecorder,
+    started: float,
+) -> PlanResult:
+    """plan_trip's run on one crew, recorded by `recorder`; its records carry the run id."""
     log.info("=" * 60)
     log.info(f"[Runner] Destination : {inputs.get('destination')}")
     log.info(f"[Runner] Dates       : {inputs.get('start_date')} → {inputs.get('end_date')}")
@@ -224,120 +594,497 @@ def run_travel_crew(inputs: dict) -> str:
     log.info(f"[Runner] Preferences : {inputs.get('preferences') or 'None'}")
     log.info("=" * 60)
 
+    checkpoints = get_checkpoint_store()
+    if checkpoints is not None:
+        checkpoints = checkpoints.for_run(inputs, rerun)
+
+    # the header and Trip Overview go to disk before any agent runs
+    writer = PlanWriter(inputs, on_section)
+    try:
+        writer.start()
+    except Exception as e:
+        log.exception(f"[Runner] Failed to create output: {e}")
+        finish_run(recorder, "failed")
+        raise RuntimeError(f"Output saving failed: {e}") from e
+
     # -- build and run the crew --
+    streamed: list = []
     try:
-        log.info("[Runner] Initialising TravelPlannerCrew...")
-        travel_crew = TravelPlannerCrew()
+        all_tasks = travel_crew.all_tasks()
+        task_names = [t.name for t in all_tasks]
+        bind_tasks(recorder, all_tasks)
+        if on_token is not None:
+            bind_stream(all_tasks, on_token)
+            streamed = all_tasks
+            travel_crew.set_streaming(True)
+        stale = downstream_of(all_tasks, rerun) if rerun else set()
+        travel_crew.clear_side_crews()
+        usage_before = travel_crew.token_usage()
+
+        # popular destinations reuse stored research and skip that agent
+        # (multi-city trips use it per city, in _research_stops)
+        research_store = get_research_store()
+        multi_city = is_multi_city(inputs)
+        prefilled = {}
+        if research_store is not None and not multi_city and "research_task" not in stale:
+            stored = research_store.get(inputs)
+            if stored:
+                prefilled["research_task"] = stored
+                recorder.task("research_task")["reused_from"] = "research_store"
+
+        # long trips get their itinerary in concurrent segments (see itinerary_segments.py)
+        segments = plan_segments(inputs)
+
+        # checkpoints of an earlier (possibly failed) run with matching inputs
+        callbacks = [lambda output: writer.add(output.name, output.raw)]
+        if checkpoints is not None:
+            if "itinerary_task" in stale:
+                stale |= {s.name for s in segments}
+            checkpoints.discard(sorted(stale), inputs)
+            restored = checkpoints.load(task_names, inputs)
+            for name in restored:
+                recorder.task(name)["reused_from"] = "checkpoint"
+            prefilled.update(restored)
+            checkpoints.record_run(inputs, "running")
+            callbacks.append(lambda output: _save_checkpoint(checkpoints, inputs, output))
+        if cancel is not None:
+            callbacks.append(lambda output: _check_cancel(cancel))
+
+        # multi-city: research and prices per stop, concurrently, then combined
+        if multi_city and not {"research_task", "price_research_task"} <= prefilled.keys():
+            with span("stage", "stop_research"):
+                combined = _research_stops(
+                    travel_crew, inputs, stale, research_store, checkpoints, recorder, on_token
+                )
+            for name, text in combined.items():
+                prefilled.setdefault(name, text)
+
+        if "itinerary_task" in prefilled:
+            segments = []
+        deferred = ("itinerary_task",) if segments else ()
+        travel_crew.prefill(prefilled, deferred=deferred)
+        travel_crew.set_task_callbacks(callbacks)
+        for name, text in prefilled.items():
+            writer.add(name, text)
+
+        main_names = [
+            n for n in task_names if n not in travel_crew._POST_CHECK_TASKS and n not in deferred
+        ]
+        if all(name in prefilled for name in main_names):
+            log.info("[Runner] Every task restored from storage — nothing to run.")
+        else:
+            log.info("[Runner] Kicking off crew execution...")
+            with span("stage", "crew"):
+                travel_crew.build_crew().kickoff(inputs=inputs)
+            log.info("[Runner] Crew execution completed.")
 
-        log.info("[Runner] Kicking off crew execution...")
-        result = travel_crew.crew().kickoff(inputs=inputs)
-        log.info("[Runner] Crew execution completed.")
+        if segments:
+            with span("stage", "itinerary_segments"):
+                _run_segments(travel_crew, inputs, segments, recorder, checkpoints, on_token)
 
-        _log_token_usage(result) #log token usage
+        sections = travel_crew.completed_outputs()
+        sections.update(prefilled)
+
+        if "validation_task" not in prefilled:
+            _check_cancel(cancel)
+            with span("stage", "validation"):
+                sections["validation_task"] = _validate(travel_crew, inputs, sections)
+            writer.add("validation_task", sections["validation_task"])
+
+        usage = _log_token_usage(usage_before, travel_crew.token_usage()) #log token usage
+        if research_store is not None and "research_task" not in prefilled \
+                and sections.get("research_task"):
+            research_store.put(inputs, sections["research_task"])
+
+        cache = get_search_cache()
+        if cache is not None:
+            log.info(f"[Runner] Search cache: {cache.stats()}")
 
     except Exception as e:
+        if cancel is not None and cancel.is_set():
+            log.info("[Runner] Run cancelled by the caller.")
+            writer.abort(PlanCancelled("cancelled"))
+            finish_run(recorder, "cancelled")
+            if checkpoints is not None:
+                checkpoints.record_run(inputs, "cancelled")
+            raise RuntimeError("Planning cancelled") from e
         log.exception(f"[Runner] Crew execution failed: {e}")
+        writer.abort(e)
+        finish_run(recorder, "failed")
+        if checkpoints is not None:
+            checkpoints.record_run(inputs, "failed")
+            raise RuntimeError(
+                f"Crew execution error: {e} (completed tasks were checkpointed; "
+                "run `replay` to resume)"
+            ) from e
         raise RuntimeError(f"Crew execution error: {e}") from e
+    finally:
+        if streamed:
+            unbind_stream(streamed)
+            travel_crew.set_streaming(False)
     
     # ---save Markdown output---
     try:
-        output_path = _save_markdown(inputs, result)
-        return output_path
+        with span("stage", "save"):
+            output_path = writer.finish()
     except Exception as e:
         log.exception(f"[Runner] Failed to save output: {e}")
+        finish_run(recorder, "failed", usage)
         raise RuntimeError(f"Output saving failed: {e}") from e
 
+    if checkpoints is not None:
+        checkpoints.record_run(inputs, "done")
+    plan_store = get_plan_store()
+    if plan_store is not None:
+        try:
+            plan_store.put(
+                inputs, writer.sections, output_path, recorder.run_id, usage.get("total_tokens", 0)
+            )
+        except Exception as e:
+            log.warning(f"[Runner] Could not store the plan: {e}")
+    finish_run(recorder, "done", usage)
+
+    return PlanResult(
+        output_path=output_path,
+        elapsed_s=round(time.perf_counter() - started, 2),
+        run_id=recorder.run_id,
+        **usage,
+    )
+
 
-def _save_markdown(inputs: dict, crew_result: Any) -> str:
+def _stored_plan(
+    inputs: dict, on_section: Optional[Callable[[PlanSection], None]],
+) -> Optional[PlanResult]:
     """
-    Write the structured travel plan to a Markdown file in /output/.
+    A fresh stored plan for these inputs, replayed to on_section, or None.
+    The plan file is written again from the store if it was deleted.
     """
-    destination = inputs.get("destination", "Unknown")
-    task_outputs = getattr(crew_result, "tasks_output", [])
+    store = get_plan_store()
+    if store is None:
+        return None
+    started = time.perf_counter()
+    try:
+        plan = store.fresh(inputs)
+        if plan is None:
+            return None
+        sections = store.sections(plan.plan_id)
+        path = plan.output_path
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(assemble(sections))
+    except Exception as e:
+        log.warning(f"[Runner] Plan store lookup failed, planning instead: {e}")
+        return None
 
-    def _get(index: int) -> str:
-        """Safely pull raw text from a task output by index."""
-        try:
-            return task_outputs[index].raw if index < len(task_outputs) else "_No output available._"
-        except Exception:
-            return "_Output unavailable._"
+    age_min = (time.time() - plan.created_at) / 60
+    log.info(
+        f"[Runner] Reusing the plan for {inputs.get('destination')} "
+        f"from {age_min:.0f} min ago → {path}"
+    )
+    if on_section is not None:
+        for s in [*sections, {"name": "done", "title": "Done", "markdown": ""}]:
+            try:
+                on_section(PlanSection(s["name"], s["title"], s["markdown"], path))
+            except Exception as e:
+                log.warning(f"[Output] Section callback failed for {s['name']}: {e}")
+    return PlanResult(
+        output_path=path, elapsed_s=round(time.perf_counter() - started, 3),
+        run_id=plan.run_id, reused=True,
+    )
+
+
+_plans = SingleFlight("plan")
+
+
+def _coalescing_enabled() -> bool:
+    return os.getenv("TRAVEL_PLANNER_COALESCE", "1").lower() not in ("0", "false", "no")
+
+
+def _coalesced_plan(
+    inputs: dict, rerun: tuple, on_section: Optional[Callable[[PlanSection], None]],
+) -> PlanResult:
+    """
+    plan_trip for a pooled run, shared with identical runs in flight.
+    Every caller gets the sections (from the start, even if it joined
+    late) and the same output file. Runs that stream tokens or can be
+    cancelled are per caller and never coalesced.
+    """
+    started = time.perf_counter()
+    key = checkpoint_key("plan", inputs) + ":" + ",".join(sorted(rerun))
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_dest = destination.replace(" ", "_").replace(",", "").lower()
-    filename  = f"travel_plan_{safe_dest}_{timestamp}.md"
-    filepath  = os.path.join(_OUTPUT_DIR, filename)
+    def run(publish) -> PlanResult:
+        with get_crew_pool().lease() as pooled:
+            return plan_trip(inputs, travel_crew=pooled, rerun=rerun, on_section=publish)
 
-    # checking if the travel duration is in the past
+    result, shared = _plans.do(key, run, on_event=on_section)
+    if not shared:
+        return result
+    log.info(f"[Runner] Shared the in-flight plan for {inputs.get('destination')} → {result.output_path}")
+    return replace(
+        result, shared=True, prompt_tokens=0, completion_tokens=0, total_tokens=0,
+        llm_calls=0, elapsed_s=round(time.perf_counter() - started, 2),
+    )
+
+
+def _validate(travel_crew: TravelPlannerCrew, inputs: dict, sections: dict) -> str:
+    """
+    Run the code-side prechecks, then the LLM validator only if needed.
+    TRAVEL_PLANNER_LLM_VALIDATION: auto (default; skip when every check
+    passes), always, or never. Returns the validation text.
+    """
+    report = precheck(inputs, sections.get("budget_task", ""), sections.get("itinerary_task", ""))
+    mode = os.getenv("TRAVEL_PLANNER_LLM_VALIDATION", "auto").lower()
+
+    if mode == "never" or (mode == "auto" and report.passed):
+        log.info("[Runner] Validation settled by automated checks — skipping the LLM validator.")
+        text = report.to_markdown()
+        travel_crew.record_output("validation_task", text)
+        return text
+
+    log.info("[Runner] Running the LLM validator on the precheck findings...")
+    result = travel_crew.validation_crew().kickoff(
+        inputs={**inputs, "precheck_findings": report.summary()}
+    )
+    return result.raw
+
+
+def _run_side_crews(
+    jobs: dict,
+    recorder: Any,
+    on_token: Optional[Callable[[TokenChunk], None]],
+    max_workers: int = 0,
+    on_done: Optional[Callable[[str, str], None]] = None,
+) -> dict:
+    """
+    Kick off single-task side crews concurrently. `jobs` maps a name to
+    (crew, inputs); returns name → raw output. `on_done(name, raw)` runs as
+    each one finishes (e.g. to checkpoint it). The first failure is raised
+    once the others have finished. max_workers 0 runs them all at once.
+    """
+    side_tasks = [side.tasks[0] for side, _ in jobs.values()]
+    bind_tasks(recorder, side_tasks)
+    if on_token is not None:
+        bind_stream(side_tasks, on_token)
+        for side, _ in jobs.values():
+            side.agents[0].llm.stream = True
+
+    def _kickoff(name: str) -> str:
+        side, side_inputs = jobs[name]
+        raw = side.kickoff(inputs=side_inputs).raw
+        if on_done is not None:
+            on_done(name, raw)
+        return raw
+
+    results = {}
     try:
-        trip_start  = datetime.strptime(inputs.get("start_date", ""), "%Y-%m-%d").date()
-        today       = datetime.now().date()
-        is_past     = trip_start < today
-    except ValueError:
-        is_past     = False
-
-    past_date_banner = ""
-    if is_past:
-        log.warning(
-            f"[Output] Trip start date {inputs.get('start_date')} is in the past. "
-            "Adding past-date notice to output file."
-        )
-        past_date_banner = f"""> [!WARNING]
-> ⚠️ **You are viewing a travel plan for a past date.**
-> The trip start date **{inputs.get('start_date')}** has already passed.
-> Prices, attractions, and availability may no longer be accurate.
-> Please re-run the planner with future dates for up-to-date information.
+        if jobs:
+            workers = min(max_workers or len(jobs), len(jobs))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="side-crew") as pool:
+                futures = {
+                    name: pool.submit(contextvars.copy_context().run, _kickoff, name) for name in jobs
+                }
+                for name, future in futures.items():
+                    results[name] = future.result()
+    finally:
+        if on_token is not None:
+            unbind_stream(side_tasks)
+    return results
 
----
 
-"""
+def _save_side_output(checkpoints: Any, task_name: str, inputs: dict, raw: str) -> None:
+    """Checkpoint a side crew's output; failures never stop the run."""
+    if checkpoints is None:
+        return
+    try:
+        checkpoints.save(task_name, inputs, raw)
+    except Exception as e:
+        log.warning(f"[Checkpoint] Could not save {task_name}: {e}")
 
-    md = f"""# Travel Plan: {destination}
 
-> **Generated:** {datetime.now().strftime('%d %B %Y, %H:%M')}
+def _run_segments(
+    travel_crew: TravelPlannerCrew,
+    inputs: dict,
+    segments: list,
+    recorder: Any,
+    checkpoints: Any,
+    on_token: Optional[Callable[[TokenChunk], None]],
+) -> None:
+    """
+    Write a long itinerary as concurrent segment crews, reusing segments
+    checkpointed by an earlier attempt, and record the merged, renumbered
+    text as itinerary_task's output. ITINERARY_SEGMENT_WORKERS caps how
+    many segments run at once (default: all of them).
+    """
+    texts = checkpoints.load([s.name for s in segments], inputs) if checkpoints is not None else {}
+    pending = [s for s in segments if s.name not in texts]
+    log.info(f"[Runner] Writing the itinerary in {len(segments)} segments ({len(pending)} to run)...")
 
----
+    context = (travel_crew.research_task(), travel_crew.budget_task())
+    jobs = {
+        s.name: (
+            travel_crew.side_crew("itinerary_segment_task", "itinerary_designer", s.name, context=context),
+            segment_inputs(inputs, s),
+        )
+        for s in pending
+    }
+    texts.update(_run_side_crews(
+        jobs, recorder, on_token,
+        max_workers=int(os.getenv("ITINERARY_SEGMENT_WORKERS", "0")),
+        on_done=lambda name, raw: _save_side_output(checkpoints, name, inputs, raw),
+    ))
+    travel_crew.record_output("itinerary_task", merge_segments(segments, texts))
 
-{past_date_banner}## 📋 Trip Overview
 
-| Field        | Details                                      |
-|--------------|----------------------------------------------|
-| Destination  | {destination}                                
-| Start Date   | {inputs.get('start_date')}                   
-| End Date     | {inputs.get('end_date')}                     
-| Duration     | {inputs.get('num_days')} days                
-| Budget       | ${float(inputs.get('budget_usd', 0)):,.2f} USD 
-| Preferences  | {inputs.get('preferences') or 'None'}        
+# agents.yaml entry for each per-city side task
+_STOP_AGENTS = {
+    "research_task":       "destination_researcher",
+    "price_research_task": "budget_planner",
+}
 
----
 
-## Destination Research
+def _research_stops(
+    travel_crew: TravelPlannerCrew,
+    inputs: dict,
+    stale: set,
+    research_store: Any,
+    checkpoints: Any,
+    recorder: Any,
+    on_token: Optional[Callable[[TokenChunk], None]],
+) -> dict:
+    """
+    Research and price every stop of a multi-city trip and price the legs
+    between stops, all as concurrent side crews, so the wait is close to
+    the slowest city. Per-city results are reused from (and saved to) the
+    research store and checkpoints under single-city inputs, so they are
+    shared with other trips through the same city. Returns the combined
+    research_task and price_research_task texts.
+    """
+    targets = {}  # side task name → (task / checkpoint name, inputs it is keyed on)
+    for index in range(1, len(inputs["stops"]) + 1):
+        city_inputs = stop_inputs(inputs, index)
+        for task_name in _STOP_AGENTS:
+            targets[f"{task_name}.stop_{index}"] = (task_name, city_inputs)
+    for index, leg in enumerate(legs(inputs), start=1):
+        targets[f"transport_leg_task.leg_{index}"] = ("transport_leg_task", leg_inputs(inputs, leg))
 
-{_get(0)}
+    texts, jobs = {}, {}
+    for name, (task_name, keyed_on) in targets.items():
+        reused = None
+        if task_name not in stale:
+            if task_name == "research_task" and research_store is not None:
+                texts[name] = research_store.get(keyed_on)
+                reused = "research_store" if texts[name] else None
+            if not reused and checkpoints is not None:
+                texts[name] = checkpoints.load([task_name], keyed_on).get(task_name)
+                reused = "checkpoint" if texts[name] else None
+        if reused:
+            recorder.task(name)["reused_from"] = reused
+            continue
+        agent_key = _STOP_AGENTS.get(task_name, "budget_planner")
+        jobs[name] = (travel_crew.side_crew(task_name, agent_key, name, search=True), keyed_on)
 
----
+    def _store(name: str, raw: str) -> None:
+        task_name, keyed_on = targets[name]
+        _save_side_output(checkpoints, task_name, keyed_on, raw)
+        if task_name == "research_task" and research_store is not None and raw:
+            research_store.put(keyed_on, raw)
 
-## Budget Breakdown
+    log.info(
+        f"[Runner] Multi-city: {len(inputs['stops'])} stops, {len(legs(inputs))} leg(s), "
+        f"{len(jobs)} lookup(s) to run"
+    )
+    texts.update(_run_side_crews(
+        jobs, recorder, on_token,
+        max_workers=int(os.getenv("MULTI_CITY_WORKERS", "0")),
+        on_done=_store,
+    ))
+
+    stop_count = len(inputs["stops"])
+    leg_texts = [texts[f"transport_leg_task.leg_{i}"] for i in range(1, stop_count)]
+    combined = {
+        task_name: combine(
+            inputs,
+            [texts[f"{task_name}.stop_{i}"] for i in range(1, stop_count + 1)],
+            leg_texts if task_name == "price_research_task" else (),
+        )
+        for task_name in _STOP_AGENTS
+    }
+    for task_name, text in combined.items():
+        _save_side_output(checkpoints, task_name, inputs, text)
+    return combined
 
-{_get(1)}
 
----
+def _check_cancel(cancel: Optional[threading.Event]) -> None:
+    """Raise PlanCancelled once the caller has set `cancel`."""
+    if cancel is not None and cancel.is_set():
+        raise PlanCancelled("Planning cancelled by the caller")
 
-## Day-wise Itinerary
 
-{_get(2)}
+def _save_checkpoint(checkpoints: Any, inputs: dict, output: TaskOutput) -> None:
+    """Task callback: persist one finished task. Failures never stop the run."""
+    try:
+        checkpoints.save(output.name, inputs, output.raw)
+    except Exception as e:
+        log.warning(f"[Checkpoint] Could not save {output.name}: {e}")
 
----
 
-## Validation Summary
+def iter_plan(inputs: dict, rerun: tuple = ()) -> Iterator[PlanSection]:
+    """
+    Run plan_trip on a background thread and yield each PlanSection as it
+    is written, ending with "done" (or "failed", after which the run's
+    error is raised).
+    """
+    sections: "queue.Queue[Optional[PlanSection]]" = queue.Queue()
+    outcome: dict = {}
 
-{_get(3)}
+    def _run():
+        try:
+            plan_trip(inputs, rerun=rerun, on_section=sections.put)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            sections.put(None)
 
----
-*Generated by AI Travel Planner · *
-"""
+    threading.Thread(target=_run, name="plan-stream", daemon=True).start()
+    while (section := sections.get()) is not None:
+        yield section
+    if "error" in outcome:
+        raise outcome["error"]
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(md)
 
-    log.info(f"[Runner] Output saved → {filepath}")
-    return filepath
\ No newline at end of file
+async def plan_trip_stream(inputs: dict, rerun: tuple = ()) -> AsyncIterator[TokenChunk]:
+    """
+    Run plan_trip on a worker thread with token streaming on and yield each
+    TokenChunk as it arrives. Leaving the loop early (break, aclose() or
+    task cancellation) cancels the run at its next task boundary; finished
+    tasks stay checkpointed. The run's error is raised after the last chunk.
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+    cancel = threading.Event()
+    finished = object()
+
+    def _put(item) -> None:
+        if cancel.is_set():
+            return
+        try:
+            loop.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:  # event loop already closed
+            pass
+
+    def _run() -> PlanResult:
+        try:
+            return plan_trip(inputs, rerun=rerun, on_token=_put, cancel=cancel)
+        finally:
+            _put(finished)
+
+    run = loop.run_in_executor(None, _run)
+    try:
+        while (chunk := await chunks.get()) is not finished:
+            yield chunk
+        await run
+    finally:
+        cancel.set()
+        # an abandoned run ends with "Planning cancelled"; nobody awaits it
+        run.add_done_callback(lambda f: f.cancelled() or f.exception())
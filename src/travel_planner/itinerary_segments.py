@@ -0,0 +1,165 @@
+"""
+itinerary_segments.py
+
+Week-sized itinerary segments for long trips. Rather than one completion
+covering every day, the itinerary is split into balanced segments that are
+written concurrently from the same research and budget context, then
+merged and renumbered.
+
+The segments never see each other's text, so every boundary is settled up
+front: each segment is told its day range, which part of the research to
+favour, and the shared rule for the first day of a part (optional move to
+the next area to stay). Neighbouring segments read the same rule, so
+hotel changes and travel days line up.
+"""
+
+import itertools
+import math
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from travel_planner.multi_city import is_multi_city
+
+# day headings only: "**Day N", "## Day N" or "## **Day N" at the start of a
+# line, so prose such as "Day 1 was tiring" is never renumbered
+_DAY_HEADING = re.compile(
+    r"^(\s*(?:#{1,6}\s+(?:\*\*|__)?|\*\*|__)\s*Day\s+)(\d+)\b", re.IGNORECASE | re.MULTILINE
+)
+
+
+@dataclass
+class Segment:
+    """Days start_day..end_day (1-based, inclusive) of the trip, part `index` of `count`."""
+    index: int
+    count: int
+    start_day: int
+    end_day: int
+    start_date: str
+    end_date: str
+
+    @property
+    def name(self) -> str:
+        """Task / checkpoint name, e.g. itinerary_task.part_2."""
+        return f"itinerary_task.part_{self.index}"
+
+    def notes(self, num_days: int, follow_route: bool = False) -> str:
+        """
+        Boundary rules for this segment, interpolated into its task
+        description. Multi-city trips (`follow_route`) take their stays and
+        travel days from the route instead of the area-to-stay rule.
+        """
+        others = [
+            f"Days {start}-{end}" for start, end in _ranges(num_days, self.count)
+            if start != self.start_day
+        ]
+        lines = [
+            f"This is part {self.index} of {self.count} of the itinerary; "
+            f"{', '.join(others)} are written separately at the same time.",
+            f"Parts share the same research, so to avoid repeating each other favour the "
+            f"attractions and neighbourhoods listed at positions {self.index}, "
+            f"{self.index + self.count}, {self.index + 2 * self.count}, ... in the research.",
+        ]
+        if self.index == 1:
+            lines.append("Day 1 is the arrival day: account for arrival and check-in logistics.")
+        if follow_route:
+            lines.append(
+                f"Follow the route for Days {self.start_day}-{self.end_day}: it says which city "
+                "the traveller is in each day and on which mornings they travel between stops."
+            )
+        elif self.index > 1:
+            lines.append(
+                f"Day {self.start_day} starts this part of the trip. If the research lists "
+                f"more than one area to stay, the traveller moves this morning to area number {self.index} "
+                "on that list (starting again from the top when the list runs out): plan "
+                "check-out, the transfer and check-in, and keep the rest of the day light. "
+                "With a single area, they stay where they are."
+            )
+        if self.index == self.count:
+            lines.append(
+                f"Day {self.end_day} is the last day: account for check-out and departure logistics."
+            )
+        else:
+            lines.append(
+                f"Day {self.end_day} is not the end of the trip: no check-out or departure; "
+                "end the evening in this part's area."
+            )
+        return "\n".join(f"- {line}" for line in lines)
+
+
+def segment_size() -> int:
+    """Days per segment; ITINERARY_SEGMENT_DAYS (default 7), 0 turns segmenting off."""
+    return int(os.getenv("ITINERARY_SEGMENT_DAYS", "7"))
+
+
+def _ranges(num_days: int, count: int) -> list:
+    """`count` consecutive (start, end) day ranges covering num_days, sizes differing by at most one."""
+    base, extra = divmod(num_days, count)
+    ranges, start = [], 1
+    for i in range(count):
+        length = base + (1 if i < extra else 0)
+        ranges.append((start, start + length - 1))
+        start += length
+    return ranges
+
+
+def plan_segments(inputs: dict, size: Optional[int] = None) -> list:
+    """
+    Segments for the trip, or [] when it fits in one segment (or segmenting
+    is off). 8 days with size 7 become two segments of 4.
+    """
+    size = segment_size() if size is None else size
+    try:
+        num_days = int(inputs.get("num_days") or 0)
+    except (TypeError, ValueError):
+        return []
+    if size <= 0 or num_days <= size:
+        return []
+
+    try:
+        first = datetime.strptime(str(inputs.get("start_date", "")), "%Y-%m-%d").date()
+    except ValueError:
+        first = None
+
+    def _date(day: int) -> str:
+        return (first + timedelta(days=day - 1)).isoformat() if first else f"Day {day}"
+
+    count = math.ceil(num_days / size)
+    return [
+        Segment(i + 1, count, start, end, _date(start), _date(end))
+        for i, (start, end) in enumerate(_ranges(num_days, count))
+    ]
+
+
+def segment_inputs(inputs: dict, segment: Segment) -> dict:
+    """Trip inputs plus the segment placeholders used by itinerary_segment_task."""
+    return {
+        **inputs,
+        "segment_start_day":  segment.start_day,
+        "segment_end_day":    segment.end_day,
+        "segment_start_date": segment.start_date,
+        "segment_end_date":   segment.end_date,
+        "segment_notes":      segment.notes(int(inputs["num_days"]), follow_route=is_multi_city(inputs)),
+    }
+
+
+def merge_segments(segments: list, texts: dict) -> str:
+    """
+    One itinerary from the segment texts (segment name → text), in day
+    order. Anything before a segment's first day heading (preamble) is
+    dropped, and the headings (bold or Markdown, not mentions of a day in
+    the text) are renumbered so the days run from Day 1 to Day num_days
+    even if a segment restarted its count.
+    """
+    parts = []
+    for segment in segments:
+        text = (texts.get(segment.name) or "").strip()
+        first = _DAY_HEADING.search(text)
+        if first is None:
+            parts.append(text)
+            continue
+        day = itertools.count(segment.start_day)
+        parts.append(_DAY_HEADING.sub(lambda m: f"{m.group(1)}{next(day)}", text[first.start():]))
+    return "\n\n".join(p for p in parts if p)
@@ -0,0 +1,316 @@
+"""
+job_store.py
+
+Durable planning job queue in SQLite, shared by the service and any
+number of worker processes pointing at the same file.
+
+A worker claims the oldest queued job with a lease and renews it with
+heartbeats while the plan runs. A job whose lease runs out (its worker
+crashed or hung) goes back to the queue for another worker, up to
+JOB_MAX_ATTEMPTS claims; completed tasks are checkpointed, so the retry
+resumes where the lost run stopped. Results and written plan sections
+are stored with the job, so any process can report on it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.paths import cache_path
+
+log = get_logger(__name__)
+
+_BUSY_TIMEOUT_MS = 10_000
+_DEFAULT_MAX_ATTEMPTS = 3
+
+FINISHED = ("done", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised by JobStore.submit when the queue already holds max_queued jobs."""
+
+
+@dataclass
+class Job:
+    """One planning request and its lifecycle."""
+    job_id: str
+    inputs: dict
+    status: str = "queued"  # queued → running → done | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    output_path: Optional[str] = None
+    total_tokens: int = 0
+    error: Optional[str] = None
+    attempts: int = 0
+    worker: Optional[str] = None  # lease holder while running
+    sections: list = field(default_factory=list)  # PlanSection dicts, in write order
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["sections"] = [s["name"] for s in self.sections]
+        return data
+
+
+_COLUMNS = (
+    "job_id, inputs, status, created_at, started_at, finished_at, "
+    "output_path, total_tokens, error, attempts, lease_owner"
+)
+
+
+def _job(row) -> Job:
+    return Job(
+        job_id=row[0], inputs=json.loads(row[1]), status=row[2], created_at=row[3],
+        started_at=row[4], finished_at=row[5], output_path=row[6],
+        total_tokens=row[7] or 0, error=row[8], attempts=row[9], worker=row[10],
+    )
+
+
+class JobStore:
+    """
+    Jobs and their sections in one SQLite file. State changes run in
+    IMMEDIATE transactions, so two workers never claim the same job.
+    """
+
+    def __init__(self, path: str, max_attempts: int = _DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id            TEXT PRIMARY KEY,
+                inputs            TEXT NOT NULL,
+                status            TEXT NOT NULL,
+                created_at        REAL NOT NULL,
+                started_at        REAL,
+                finished_at       REAL,
+                output_path       TEXT,
+                total_tokens      INTEGER,
+                error             TEXT,
+                attempts          INTEGER NOT NULL DEFAULT 0,
+                lease_owner       TEXT,
+                lease_expires_at  REAL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_sections (
+                id       INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id   TEXT NOT NULL,
+                section  TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_job_sections_job ON job_sections (job_id, id)"
+        )
+
+    def _write(self, fn):
+        """Run fn(conn) in an IMMEDIATE transaction and return its result."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _read(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # --- producers ---
+    def submit(self, inputs: dict, max_queued: int = 0) -> Job:
+        """Queue a job; raises QueueFullError when `max_queued` (> 0) jobs are already waiting."""
+        job = Job(job_id=uuid.uuid4().hex, inputs=inputs)
+
+        def fn(conn):
+            if max_queued > 0:
+                queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if queued >= max_queued:
+                    raise QueueFullError("Planning queue is full, retry later.")
+            conn.execute(
+                "INSERT INTO jobs (job_id, inputs, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (job.job_id, json.dumps(inputs), job.created_at),
+            )
+
+        self._write(fn)
+        return job
+
+    # --- workers ---
+    def claim(self, worker: str, lease_s: float) -> Optional[Job]:
+        """
+        Lease the oldest queued job to `worker` for lease_s seconds, after
+        re-queueing jobs whose lease has expired. None when nothing is queued.
+        """
+        def fn(conn):
+            now = time.time()
+            self._expire(conn, now)
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            # a retried job starts its section stream over
+            conn.execute("DELETE FROM job_sections WHERE job_id = ?", (row[0],))
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1, "
+                "lease_owner = ?, lease_expires_at = ?, error = NULL WHERE job_id = ?",
+                (now, worker, now + lease_s, row[0]),
+            )
+            return conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (row[0],)).fetchone()
+
+        row = self._write(fn)
+        return _job(row) if row else None
+
+    def _expire(self, conn, now: float) -> None:
+        """Re-queue running jobs whose lease ran out, or fail them after max_attempts."""
+        expired = conn.execute(
+            "SELECT job_id, attempts, lease_owner FROM jobs "
+            "WHERE status = 'running' AND lease_expires_at < ?",
+            (now,),
+        ).fetchall()
+        for job_id, attempts, owner in expired:
+            if attempts >= self.max_attempts:
+                log.error(f"[JobStore] {job_id} lost its worker {attempts} time(s); giving up")
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                    "error = ? WHERE job_id = ?",
+                    (now, f"Worker lost {attempts} time(s) (last: {owner})", job_id),
+                )
+            else:
+                log.warning(f"[JobStore] Lease of {job_id} held by {owner} expired; re-queued")
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', lease_owner = NULL WHERE job_id = ?",
+                    (job_id,),
+                )
+
+    def heartbeat(self, job_id: str, worker: str, lease_s: float) -> bool:
+        """Extend the lease; False if `worker` no longer holds it."""
+        def fn(conn):
+            return conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? "
+                "WHERE job_id = ? AND lease_owner = ? AND status = 'running'",
+                (time.time() + lease_s, job_id, worker),
+            ).rowcount == 1
+
+        return self._write(fn)
+
+    def finish(self, job_id: str, worker: str, status: str, output_path: Optional[str] = None,
+               total_tokens: int = 0, error: Optional[str] = None) -> bool:
+        """Record the outcome if `worker` still holds the lease."""
+        def fn(conn):
+            return conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, output_path = ?, total_tokens = ?, "
+                "error = ?, lease_owner = NULL, lease_expires_at = NULL "
+                "WHERE job_id = ? AND lease_owner = ? AND status = 'running'",
+                (status, time.time(), output_path, total_tokens, error, job_id, worker),
+            ).rowcount == 1
+
+        return self._write(fn)
+
+    def release(self, job_id: str, worker: str) -> bool:
+        """Hand a job back to the queue unfinished (worker shutting down), not counting the attempt."""
+        def fn(conn):
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_owner = NULL, "
+                "lease_expires_at = NULL WHERE job_id = ? AND lease_owner = ? AND status = 'running'",
+                (job_id, worker),
+            ).rowcount == 1
+
+        return self._write(fn)
+
+    def release_owned(self, owners: list) -> int:
+        """release() every running job leased by one of `owners`."""
+        if not owners:
+            return 0
+
+        def fn(conn):
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = attempts - 1, lease_owner = NULL, "
+                f"lease_expires_at = NULL WHERE status = 'running' AND lease_owner IN "
+                f"({', '.join('?' * len(owners))})",
+                list(owners),
+            ).rowcount
+
+        return self._write(fn)
+
+    def add_section(self, job_id: str, section: dict) -> None:
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO job_sections (job_id, section) VALUES (?, ?)",
+            (job_id, json.dumps(section)),
+        ))
+
+    # --- readers ---
+    def get(self, job_id: str) -> Optional[Job]:
+        rows = self._read(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,))
+        if not rows:
+            return None
+        job = _job(rows[0])
+        job.sections = [s for _, s in self.sections(job_id)]
+        return job
+
+    def status(self, job_id: str) -> Optional[str]:
+        rows = self._read("SELECT status FROM jobs WHERE job_id = ?", (job_id,))
+        return rows[0][0] if rows else None
+
+    def sections(self, job_id: str, after: int = 0) -> list:
+        """(id, section dict) pairs written after section id `after`."""
+        rows = self._read(
+            "SELECT id, section FROM job_sections WHERE job_id = ? AND id > ? ORDER BY id",
+            (job_id, after),
+        )
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def counts(self) -> dict:
+        """Number of jobs per status."""
+        return dict(self._read("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def prune(self, keep_finished: int) -> int:
+        """Delete the oldest finished jobs (and their sections) beyond keep_finished."""
+        def fn(conn):
+            stale = [r[0] for r in conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('done', 'failed') "
+                "ORDER BY finished_at DESC LIMIT -1 OFFSET ?",
+                (keep_finished,),
+            ).fetchall()]
+            for job_id in stale:
+                conn.execute("DELETE FROM job_sections WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            return len(stale)
+
+        return self._write(fn)
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """
+    The process-wide job store, opened on first use at JOB_STORE_PATH
+    (default .cache/jobs.sqlite3). JOB_MAX_ATTEMPTS caps claims per job.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            path = os.getenv("JOB_STORE_PATH") or cache_path("jobs.sqlite3")
+            _store = JobStore(path, int(os.getenv("JOB_MAX_ATTEMPTS", _DEFAULT_MAX_ATTEMPTS)))
+            log.info(f"[JobStore] Opened {path}")
+        return _store
@@ -0,0 +1,202 @@
+"""
+jobs.py
+
+Job manager for the planning service, on top of the durable queue in
+job_store.py. Submitted jobs survive a restart, and are planned by the
+manager's own worker threads and/or by worker processes started with
+`plan_workers` (see workers.py) on the same store. Crews come from the
+shared CrewPool, which is warmed with one crew per worker at start, so
+each job reuses a built crew (search tool, parsed configs, LLM clients).
+
+Each job also keeps the plan sections written so far, which events()
+replays and then follows for the service's server-sent event stream,
+whichever process the job runs in.
+"""
+
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict
+from typing import Iterator, Optional
+
+from travel_planner.crew import get_crew_pool, plan_trip
+from travel_planner.job_store import FINISHED, Job, JobStore, QueueFullError, get_job_store  # noqa: F401
+from travel_planner.logger import get_logger, log_context
+
+log = get_logger(__name__)
+
+# how often an idle worker looks for new jobs, and events() for new sections
+_POLL_S = 0.5
+
+
+def worker_id(name: str) -> str:
+    """Lease owner id: host, pid and worker name."""
+    return f"{socket.gethostname()}:{os.getpid()}:{name}"
+
+
+def _lease_s() -> float:
+    return float(os.getenv("JOB_LEASE_S", "60"))
+
+
+def run_job(store: JobStore, job: Job, worker: str, lease_s: float) -> None:
+    """
+    Plan one claimed job, heartbeating its lease every lease_s / 3. A run
+    that loses its lease (this worker stalled and the job was re-queued)
+    still finishes, but its outcome is left to the new lease holder. If
+    the worker is interrupted, the job goes straight back to the queue.
+    """
+    done = threading.Event()
+    lost = threading.Event()
+
+    def heartbeat():
+        while not done.wait(lease_s / 3):
+            if not store.heartbeat(job.job_id, worker, lease_s):
+                log.warning(f"[Jobs] {job.job_id}: lease lost; another worker owns the job now")
+                lost.set()
+                return
+
+    beats = threading.Thread(target=heartbeat, name=f"heartbeat-{job.job_id[:8]}", daemon=True)
+    beats.start()
+    log.info(f"[Jobs] {worker} running {job.job_id} (attempt {job.attempts})")
+    try:
+        with log_context(job_id=job.job_id):
+            result = plan_trip(
+                job.inputs, on_section=lambda section: store.add_section(job.job_id, asdict(section))
+            )
+    except Exception as e:
+        log.error(f"[Jobs] {job.job_id} failed: {e}")
+        if not lost.is_set():
+            store.finish(job.job_id, worker, "failed", error=str(e))
+    except BaseException:
+        # interrupted (worker shutting down): completed tasks are checkpointed,
+        # so the next worker resumes the plan
+        store.release(job.job_id, worker)
+        raise
+    else:
+        store.finish(job.job_id, worker, "done", result.output_path, result.total_tokens)
+    finally:
+        done.set()
+        beats.join()
+
+
+def run_worker(store: JobStore, name: str, stop: threading.Event, lease_s: Optional[float] = None) -> None:
+    """Claim and plan jobs from `store` until `stop` is set."""
+    worker = worker_id(name)
+    lease_s = lease_s or _lease_s()
+    while not stop.is_set():
+        try:
+            job = store.claim(worker, lease_s)
+        except Exception as e:
+            log.error(f"[Jobs] {worker} could not claim a job: {e}")
+            job = None
+        if job is None:
+            stop.wait(_POLL_S)
+            continue
+        run_job(store, job, worker, lease_s)
+
+
+class JobManager:
+    """
+    Accepts jobs into the durable queue (at most `queue_size` waiting) and
+    runs them on `workers` threads; workers=0 only queues, leaving the
+    planning to worker processes. submit() never blocks: it raises
+    QueueFullError instead so the HTTP layer can answer 429.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 16,
+        keep_finished: int = 1000,
+        store: Optional[JobStore] = None,
+    ):
+        self.workers = max(0, workers)
+        self.queue_size = queue_size
+        self.keep_finished = keep_finished
+        self.store = store or get_job_store()
+        self._stop = threading.Event()
+        self._threads: list = []
+
+    # --- lifecycle ---
+    def start(self) -> None:
+        if self.workers:
+            try:
+                get_crew_pool().warm(self.workers)
+            except Exception as e:
+                log.error(f"[Jobs] Could not pre-build crews: {e}")
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=run_worker, args=(self.store, f"thread-{i}", self._stop),
+                name=f"plan-worker-{i}", daemon=True,
+            )
+            t.start()
+            self._threads.append((f"thread-{i}", t))
+        log.info(f"[Jobs] Started {self.workers} worker(s), queue size {self.queue_size}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        for _, t in self._threads:
+            t.join(timeout=timeout)
+        # a thread that exited can no longer touch its job, so a lease it
+        # still holds is handed back now rather than when it expires. Jobs of
+        # threads still planning keep their leases: releasing them would let
+        # another worker plan the same job alongside; if the process exits,
+        # the leases run out and the jobs are claimed again.
+        exited = [worker_id(name) for name, t in self._threads if not t.is_alive()]
+        running = [name for name, t in self._threads if t.is_alive()]
+        self._threads.clear()
+        released = self.store.release_owned(exited)
+        if released:
+            log.info(f"[Jobs] Returned {released} unfinished job(s) to the queue.")
+        if running:
+            log.warning(
+                f"[Jobs] {len(running)} worker(s) still planning after {timeout:.0f}s; "
+                "their jobs keep their leases."
+            )
+        log.info("[Jobs] Workers stopped.")
+
+    # --- public API ---
+    def submit(self, inputs: dict) -> Job:
+        try:
+            job = self.store.submit(inputs, max_queued=self.queue_size)
+        except QueueFullError:
+            log.warning("[Jobs] Queue full — rejecting request.")
+            raise
+        self.store.prune(self.keep_finished)
+        log.info(f"[Jobs] Queued {job.job_id} for {inputs.get('destination')}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self.store.counts().get("queued", 0)
+
+    def events(self, job_id: str, keepalive_s: float = 15.0) -> Iterator[Optional[dict]]:
+        """
+        The job's section events from the start, then new ones as they are
+        written, ending after "done" or "failed". Yields None when nothing
+        happened for `keepalive_s` so the caller can keep the connection open.
+        """
+        last_id = 0
+        idle_since = time.monotonic()
+        while True:
+            status = self.store.status(job_id)
+            if status is None:
+                return
+            new = self.store.sections(job_id, after=last_id)
+            for last_id, section in new:
+                yield section
+                if section["name"] in FINISHED:
+                    return
+            if new:
+                idle_since = time.monotonic()
+            elif status in FINISHED:
+                return
+            elif time.monotonic() - idle_since >= keepalive_s:
+                idle_since = time.monotonic()
+                yield None
+            else:
+                time.sleep(_POLL_S)
@@ -0,0 +1,200 @@
+"""
+llm_cache.py
+
+Exact-match cache of LLM responses (and, when recording, Serper results).
+
+A response is keyed on everything that shapes it: model, rendered
+messages, tool schemas and sampling parameters. Bodies are stored
+zlib-compressed in SQLite, bounded by LLM_CACHE_MAX_MB with least
+recently used rows evicted first. LLM_CACHE selects the mode:
+
+- off (default)  — every call goes to Groq
+- read-write     — serve hits, store misses
+- read-only      — serve hits, never store
+- record         — always call Groq and store the answer (and every
+                   Serper search), refreshing a recording
+- replay         — serve only recorded answers and searches; a miss is
+                   an error, so a replayed run is offline and deterministic
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.metrics import count_cache_lookup
+from travel_planner.paths import cache_path
+
+log = get_logger(__name__)
+
+MODES = ("off", "read-write", "read-only", "record", "replay")
+
+_DEFAULT_MAX_MB = 512
+
+# Recency is only rewritten when older than this, so hot hits stay read-only
+_TOUCH_INTERVAL_S = 60
+
+
+class CacheMiss(RuntimeError):
+    """Raised in replay mode for a call that was never recorded."""
+
+
+def cache_mode() -> str:
+    mode = os.getenv("LLM_CACHE", "off").strip().lower() or "off"
+    if mode not in MODES:
+        log.warning(f"[LLMCache] Unknown LLM_CACHE mode '{mode}', caching is off")
+        return "off"
+    return mode
+
+
+def _digest(material: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def llm_key(model: str, messages, tools, params: dict) -> str:
+    """Cache key of one completion request; params are the sampling settings."""
+    return "llm:" + _digest({"model": model, "messages": messages, "tools": tools, "params": params})
+
+
+def search_key(normalized_query: str) -> str:
+    return "serper:" + _digest({"q": normalized_query})
+
+
+class ResponseCache:
+    """key → compressed JSON body, with LRU eviction above max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key          TEXT PRIMARY KEY,
+                kind         TEXT NOT NULL,
+                body         BLOB NOT NULL,
+                size         INTEGER NOT NULL,
+                created_at   REAL NOT NULL,
+                last_access  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_access ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, last_access FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > _TOUCH_INTERVAL_S:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, kind: str, value: Any) -> None:
+        body = zlib.compress(json.dumps(value).encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, body, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, body, len(body), now, now),
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+            self._conn.commit()
+
+    def _evict(self, excess: int) -> None:
+        """Delete least recently used rows until `excess` bytes are freed."""
+        freed, stale = 0, []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ):
+            if freed >= excess:
+                break
+            stale.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        log.info(f"[LLMCache] Evicted {len(stale)} response(s), {freed:,} bytes")
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": count, "bytes": size}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    The process-wide cache, or None when LLM_CACHE is off. Opened on
+    first use at LLM_CACHE_PATH (default .cache/llm_responses.sqlite3).
+    """
+    global _cache
+    mode = cache_mode()
+    if mode == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv("LLM_CACHE_PATH") or cache_path("llm_responses.sqlite3")
+            max_mb = float(os.getenv("LLM_CACHE_MAX_MB", _DEFAULT_MAX_MB))
+            _cache = ResponseCache(path, int(max_mb * 1024 * 1024))
+            log.info(f"[LLMCache] Opened {path} in {mode} mode")
+        return _cache
+
+
+def through_cache(
+    key: str,
+    kind: str,
+    fn: Callable[[], Any],
+    encode: Callable[[Any], Any] = lambda value: value,
+) -> tuple:
+    """
+    fn() routed through the cache according to the mode. Returns
+    (value, hit); a hit's value is the stored encode(result), which must
+    be usable in place of the result. encode returning None marks a
+    result as not cacheable.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return fn(), False
+    mode = cache_mode()
+
+    if mode in ("read-write", "read-only", "replay"):
+        stored = cache.get(key)
+        count_cache_lookup(f"{kind}_responses", stored is not None)
+        if stored is not None:
+            return stored, True
+        if mode == "replay":
+            raise CacheMiss(
+                f"No recorded {kind} response for this request (LLM_CACHE=replay); "
+                "record it again with LLM_CACHE=record"
+            )
+
+    result = fn()
+    if mode in ("read-write", "record"):
+        value = encode(result)
+        if value is not None:
+            cache.put(key, kind, value)
+    return result, False
@@ -0,0 +1,199 @@
+"""
+llm_registry.py
+
+Process-wide LLM settings and HTTP connection pool.
+
+The environment is read once, and every LLM built afterwards shares one
+keep-alive HTTP client to Groq, so concurrent agents and crews reuse TLS
+connections instead of opening a new one per call. Each agent still gets
+its own LLM object: CrewAI keeps token usage counters on the LLM, and
+sharing one instance would mix the counts of different agents and runs.
+
+Every call goes through the shared Groq limiter (rate_limit.py): it waits
+for request and token quota, and 429s / transient errors are retried
+there with jittered backoff instead of failing the task. With LLM_CACHE
+set, identical requests are answered from the response cache
+(llm_cache.py) before reaching the limiter.
+"""
+
+import os
+import threading
+from typing import Optional
+
+from crewai import LLM
+
+from travel_planner.compaction import estimate_tokens
+from travel_planner.llm_cache import cache_mode, llm_key, through_cache
+from travel_planner.logger import get_logger
+from travel_planner.metrics import record_llm_usage
+from travel_planner.rate_limit import get_provider
+
+log = get_logger(__name__)
+
+_MODEL = "groq/meta-llama/llama-4-scout-17b-16e-instruct"
+
+# completion tokens budgeted per call when the LLM sets no max_tokens
+_COMPLETION_ALLOWANCE = 1024
+
+_lock = threading.Lock()
+_settings: Optional[dict] = None
+_http_client = None
+
+
+class RateLimitedLLM(LLM):
+    """
+    LLM whose calls are metered and retried by the shared Groq limiter.
+    The usage Groq reports for each call is added to the calling task's
+    run metrics.
+    """
+
+    def call(self, messages, *args, **kwargs):
+        before = dict(self._token_usage)
+        try:
+            return self._limited_call(messages, *args, **kwargs)
+        finally:
+            record_llm_usage(
+                kwargs.get("from_task"),
+                self._token_usage["prompt_tokens"] - before["prompt_tokens"],
+                self._token_usage["completion_tokens"] - before["completion_tokens"],
+            )
+
+    def _limited_call(self, messages, *args, **kwargs):
+        provider = get_provider("groq")
+        if provider is None:
+            return super().call(messages, *args, **kwargs)
+
+        # prompt plus an allowance for the answer; settled against the
+        # usage Groq reports once the call returns
+        expected = estimate_tokens(messages) + (self.max_tokens or _COMPLETION_ALLOWANCE)
+        used_before = self._token_usage["total_tokens"]
+        return provider.call(
+            lambda: super(RateLimitedLLM, self).call(messages, *args, **kwargs),
+            tokens=expected,
+            used=lambda _: self._token_usage["total_tokens"] - used_before,
+        )
+
+
+# sampling settings that change the answer, part of the cache key
+_SAMPLING_FIELDS = (
+    "temperature", "top_p", "n", "stop", "max_tokens", "max_completion_tokens",
+    "presence_penalty", "frequency_penalty", "logit_bias", "seed", "response_format",
+    "reasoning_effort",
+)
+
+
+def _encode_response(result):
+    """A text answer, or native tool calls as plain dicts; None if not cacheable."""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, list) and result and all(hasattr(c, "function") for c in result):
+        return [
+            {
+                "id":       getattr(c, "id", None),
+                "type":     getattr(c, "type", None) or "function",
+                "function": {"name": c.function.name, "arguments": c.function.arguments},
+            }
+            for c in result
+        ]
+    return None
+
+
+class CachedLLM(RateLimitedLLM):
+    """
+    RateLimitedLLM answering repeated identical requests from the response
+    cache. Calls where CrewAI executes the tools inside the LLM call
+    (available_functions) are never cached, as the tools have effects.
+    """
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None, **kwargs):
+        def fresh():
+            return super(CachedLLM, self).call(
+                messages, tools=tools, callbacks=callbacks,
+                available_functions=available_functions, from_task=from_task,
+                from_agent=from_agent, response_model=response_model, **kwargs,
+            )
+
+        if available_functions:
+            return fresh()
+
+        params = {f: getattr(self, f, None) for f in _SAMPLING_FIELDS}
+        if response_model is not None:
+            params["response_model"] = response_model.model_json_schema()
+        key = llm_key(self.model, messages, tools, params)
+        value, hit = through_cache(key, "llm", fresh, encode=_encode_response)
+        if hit:
+            self._emit_cached(value, messages, tools, from_task, from_agent)
+        return value
+
+    def _emit_cached(self, value, messages, tools, from_task, from_agent) -> None:
+        """The events a live call emits, so streaming and run metrics see cache hits."""
+        from crewai.events import LLMCallStartedEvent, LLMStreamChunkEvent, crewai_event_bus
+        from crewai.events.types.llm_events import LLMCallType
+
+        call_type = LLMCallType.LLM_CALL if isinstance(value, str) else LLMCallType.TOOL_CALL
+        context = {"from_task": from_task, "from_agent": from_agent, "model": self.model}
+        crewai_event_bus.emit(self, event=LLMCallStartedEvent(messages=messages, tools=tools, **context))
+        if self.stream and isinstance(value, str):
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=value, call_type=call_type, **context))
+        self._handle_emit_call_events(
+            response=value, call_type=call_type, from_task=from_task,
+            from_agent=from_agent, messages=messages,
+        )
+
+
+def _load_settings() -> dict:
+    api_key = os.getenv("GROQ_API_KEY", "")
+    if not api_key:
+        log.error("GROQ_API_KEY is not set.")
+        raise EnvironmentError(
+            "GROQ_API_KEY is missing. Add it to the .env file"
+        )
+    return {
+        "model":       _MODEL,
+        "api_key":     api_key,
+        "temperature": 0.3,
+        "pool_size":   int(os.getenv("LLM_POOL_SIZE", "16")),
+        "timeout":     float(os.getenv("LLM_TIMEOUT", "600")),
+    }
+
+
+def _build_http_client(pool_size: int, timeout: float):
+    """LiteLLM's httpx wrapper with a bounded keep-alive pool, or None."""
+    try:
+        from litellm.llms.custom_httpx.http_handler import HTTPHandler
+    except ImportError as e:
+        log.warning(f"[LLM] Pooled HTTP client unavailable, using LiteLLM defaults: {e}")
+        return None
+    return HTTPHandler(timeout=timeout, concurrent_limit=pool_size)
+
+
+def get_llm() -> LLM:
+    """
+    A new LLM for one agent, built from the shared settings and bound to
+    the shared connection pool. Settings come from the environment on
+    first use (LLM_POOL_SIZE, LLM_TIMEOUT).
+    """
+    global _settings, _http_client
+    with _lock:
+        if _settings is None:
+            _settings = _load_settings()
+            _http_client = _build_http_client(_settings["pool_size"], _settings["timeout"])
+            log.info(
+                f"[LLM] Registry initialised: {_settings['model']}, "
+                f"pool of {_settings['pool_size']} connection(s)"
+            )
+        settings, client = _settings, _http_client
+
+    extra = {"client": client} if client is not None else {}
+    if get_provider("groq") is not None:
+        # retries happen in the limiter, where they wait for shared quota
+        extra["max_retries"] = 0
+    llm_class = RateLimitedLLM if cache_mode() == "off" else CachedLLM
+    return llm_class(
+        model=settings["model"],
+        api_key=settings["api_key"],
+        temperature=settings["temperature"],
+        timeout=settings["timeout"],
+        **extra,
+    )
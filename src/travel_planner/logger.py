@@ -2,10 +2,33 @@
 logger.py
 
 Centralised logging for the Travel Planner package.
+
+Loggers only put records on a queue; a background thread (QueueListener)
+formats them and writes the console and the log file, so a thread that
+logs never waits on the terminal or the disk. Records carry the run and
+job ids bound with log_context(), which the JSON-lines file format
+(LOG_FORMAT=json) includes on every line.
+
+The console handler is set up on import. The log file is only created
+when a plan actually runs (enable_file_logging()), so prompts, --help and
+cancelled runs never touch the filesystem; records logged before that are
+buffered and written to the file once it is opened. Each process writes
+its own file, rotated by size (LOG_MAX_MB) and age (LOG_ROTATE_HOURS);
+files older than LOG_RETENTION_DAYS are deleted when a new one is opened.
 """
 
+import atexit
+import contextvars
+import glob
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
 # Resolve project root (src/travel_planner/logger.py → ../../.. = project root)
@@ -14,46 +37,209 @@ _PROJECT_ROOT = os.path.abspath(
 )
 
 _LOG_DIR = os.path.join(_PROJECT_ROOT, "logs")
-os.makedirs(_LOG_DIR, exist_ok=True)
 
-_LOG_FILE = os.path.join(
-    _LOG_DIR,
-    f"travel_planner_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log",
-)
+
+def _log_dir() -> str:
+    """TRAVEL_PLANNER_LOG_DIR, default <project root>/logs."""
+    return os.getenv("TRAVEL_PLANNER_LOG_DIR") or _LOG_DIR
+
+# records kept for the log file until it is opened
+_BUFFER_SIZE = 5000
 
 _FORMATTER = logging.Formatter(
     fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
+# ids attached to every record logged in this context (run_id, job_id)
+_context: contextvars.ContextVar = contextvars.ContextVar("travel_planner_log_context", default={})
+
+_file_lock = threading.Lock()
+_log_file = None
+_file_slot = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the record's run / job ids."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts":      datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level":   record.levelname,
+            "logger":  record.name,
+            "message": record.getMessage(),
+            "thread":  record.threadName,
+        }
+        for key in ("run_id", "job_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _AsyncHandler(logging.handlers.QueueHandler):
+    """
+    Queues records for the writer thread. Only the message is resolved
+    (so later changes to its arguments cannot alter it) and the context
+    ids attached; formatting happens on the writer thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        for key, value in _context.get().items():
+            setattr(record, key, value)
+        return record
+
+
+class _FileSlot(logging.Handler):
+    """Holds the most recent records until the log file is opened, then writes to it."""
+
+    def __init__(self, capacity: int, level: int):
+        super().__init__(level)
+        self.records = deque(maxlen=capacity)
+        self.target = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.target is None:
+            self.records.append(record)
+        else:
+            self.target.handle(record)
+
+    def open(self, handler: logging.Handler) -> None:
+        """Write the buffered records to handler and send it everything after."""
+        with self.lock:
+            for record in self.records:
+                handler.handle(record)
+            self.records.clear()
+            self.target = handler
+
+
+class _RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotates when the file reaches max_bytes or is older than interval_s (0 = never)."""
+
+    def __init__(self, path: str, max_bytes: int, interval_s: float, backups: int):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self.interval_s = interval_s
+        self.rollover_at = time.time() + interval_s
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval_s and record.created >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval_s
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _file_level() -> int:
+    level = logging.getLevelName(os.getenv("LOG_FILE_LEVEL", "DEBUG").upper())
+    return level if isinstance(level, int) else logging.DEBUG
+
 
 def _init_root_logger() -> logging.Logger:
     """Initialise the root logger once; subsequent imports reuse it."""
+    global _file_slot, _listener
     root = logging.getLogger("travel_planner")
     if root.handlers:
-        return root  
-
-    root.setLevel(logging.DEBUG)
+        return root
 
     # Console — INFO
     ch = logging.StreamHandler()
     ch.setLevel(logging.INFO)
     ch.setFormatter(_FORMATTER)
-    root.addHandler(ch)
-
-    # File — DEBUG
-    fh = logging.FileHandler(_LOG_FILE, encoding="utf-8")
-    fh.setLevel(logging.DEBUG)
-    fh.setFormatter(_FORMATTER)
-    root.addHandler(fh)
 
-    root.info(f"Logging initialised → {_LOG_FILE}")
+    # File — DEBUG (LOG_FILE_LEVEL), once enable_file_logging() is called
+    _file_slot = _FileSlot(_BUFFER_SIZE, _file_level())
+
+    # records below both levels are dropped before a LogRecord is built
+    root.setLevel(min(ch.level, _file_slot.level))
+    _listener = logging.handlers.QueueListener(
+        queue.SimpleQueue(), ch, _file_slot, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)  # drains the queue before the process exits
+    root.addHandler(_AsyncHandler(_listener.queue))
     return root
 
 
 _init_root_logger()
 
 
+def _prune_old_logs(log_dir: str, days: float) -> None:
+    cutoff = time.time() - days * 86400
+    for path in glob.glob(os.path.join(log_dir, "travel_planner_*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def enable_file_logging() -> str:
+    """
+    Open the timestamped log file in the log directory (once per process)
+    and write the records buffered so far into it. Returns the file path.
+    """
+    global _log_file
+    if _log_file is not None:
+        return _log_file
+    with _file_lock:
+        if _log_file is not None:
+            return _log_file
+
+        log_dir = _log_dir()
+        os.makedirs(log_dir, exist_ok=True)
+        retention_days = _env_float("LOG_RETENTION_DAYS", 14)
+        if retention_days > 0:
+            _prune_old_logs(log_dir, retention_days)
+
+        as_json = os.getenv("LOG_FORMAT", "text").lower() == "json"
+        path = os.path.join(
+            log_dir,
+            f"travel_planner_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+            f".{'jsonl' if as_json else 'log'}",
+        )
+        fh = _RotatingFileHandler(
+            path,
+            max_bytes=int(_env_float("LOG_MAX_MB", 20) * 1024 * 1024),
+            interval_s=_env_float("LOG_ROTATE_HOURS", 24) * 3600,
+            backups=int(_env_float("LOG_BACKUPS", 5)),
+        )
+        fh.setFormatter(JsonFormatter() if as_json else _FORMATTER)
+        _file_slot.open(fh)
+
+        _log_file = path
+        logging.getLogger("travel_planner").info(f"Logging initialised → {path}")
+        return path
+
+
+def bind_log_context(**ids) -> contextvars.Token:
+    """Attach ids (run_id=..., job_id=...) to every record logged in this context from now on."""
+    return _context.set({**_context.get(), **{k: v for k, v in ids.items() if v is not None}})
+
+
+@contextmanager
+def log_context(**ids):
+    """bind_log_context() for the duration of a with block."""
+    token = bind_log_context(**ids)
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Return a child logger under the 'travel_planner' namespace.
@@ -62,4 +248,4 @@ def get_logger(name: str) -> logging.Logger:
         from travel_planner.logger import get_logger
         log = get_logger(__name__)
     """
-    return logging.getLogger(f"travel_planner.{name}")
\ No newline at end of file
+    return logging.getLogger(f"travel_planner.{name}")
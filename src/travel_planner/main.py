@@ -1,5 +1,8 @@
 import sys
 import os
+import argparse
+import json
+import threading
 import warnings
 
 from datetime import datetime, date 
@@ -10,8 +13,10 @@ try:
 except ImportError:
     pass
 
-from travel_planner.crew import run_travel_crew
+from travel_planner.batch import enqueue_batch, normalise_inputs, run_batch
+from travel_planner.checkpoints import get_checkpoint_store
 from travel_planner.logger import get_logger
+from travel_planner.multi_city import parse_stops, route_name
 
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
@@ -30,6 +35,21 @@ def _check_env() -> bool:
     return ok
 
 
+def _preload_crew() -> None:
+    """
+    crew.py (and with it crewai / litellm) is only imported when a plan
+    runs; the interactive prompt warms it on a background thread while
+    the user types.
+    """
+    def _load():
+        try:
+            import travel_planner.crew  # noqa: F401
+        except Exception as e:
+            log.debug(f"[Main] Background import of the crew failed: {e}")
+
+    threading.Thread(target=_load, name="preload-crew", daemon=True).start()
+
+
 # --input prompts--
 
 def _prompt(label: str, required: bool = True) -> str:
@@ -69,15 +89,27 @@ def _collect_inputs() -> dict:
     print(" AI Travel Planner ")
     print("═" * 55 + "\n")
 
-    destination = _prompt("Destination (city / country):")
+    # "City: nights; City: nights" plans a multi-city trip
+    while True:
+        destination = _prompt("Destination (city / country, or stops like 'Lisbon: 3; Porto: 2'):")
+        try:
+            stops = parse_stops(destination) if ":" in destination else []
+            break
+        except ValueError as e:
+            print(f"!! {e}")
 
     # date validation loop
     while True: 
         start_date = _prompt_date("Start Date (YYYY-MM-DD): ")
         end_date = _prompt_date("End Date (YYYY-MM-DD): ")
-        if end_date > start_date:
-            break
-        print("End date must be after start date. Try again.")
+        if end_date <= start_date:
+            print("End date must be after start date. Try again.")
+            continue
+        nights = sum(s["nights"] for s in stops)
+        if stops and nights != (end_date - start_date).days:
+            print(f"The stops add up to {nights} nights; pick dates {nights} days apart.")
+            continue
+        break
     
     budget_usd = _prompt_budget()
     preferences = _prompt(
@@ -96,6 +128,12 @@ def _collect_inputs() -> dict:
         "preferences": preferences or "None",
     }
 
+    if len(stops) > 1:
+        inputs["destination"] = route_name(stops)
+        inputs["stops"] = stops
+    elif stops:
+        inputs["destination"] = stops[0]["city"]
+
     log.info(f"[Input] Collected: {inputs}")
     return inputs
 
@@ -107,6 +145,7 @@ def main() -> None:
     if not _check_env():
         print("\n Missing API keys. Exiting.\n")
         sys.exit(1)
+    _preload_crew()
     
     # collect inputs
     try:
@@ -140,7 +179,8 @@ def main() -> None:
     log.info("[Main] Handing off to CrewAI pipeline.")
 
     try:
-        output_path = run_travel_crew(inputs)
+        from travel_planner.crew import run_travel_crew
+        output_path = run_travel_crew(inputs, on_section=_print_section, on_token=_token_printer())
         print("\n" + "═" * 55)
         print("  Travel plan generated successfully!")
         print(f"  Saved to: {output_path}")
@@ -164,10 +204,200 @@ def main() -> None:
         print("     Check /logs for the full error trace.\n")
         sys.exit(1)
 
+def _streaming() -> bool:
+    """LLM_STREAM=1 prints the agents' output token by token."""
+    return os.getenv("LLM_STREAM", "0") == "1"
+
+
+def _print_section(section) -> None:
+    """Progress line for each part of the plan as it lands on disk."""
+    if section.name in ("done", "failed"):
+        return
+    prefix = "\n" if _streaming() else ""  # end the line of streamed tokens first
+    print(f"{prefix}  ✓ {section.title} ready → {section.output_path}")
+
+
+def _token_printer():
+    """on_token callback writing chunks to the terminal, with a heading whenever the task changes."""
+    lock = threading.Lock()
+    last = [None]
+
+    def _print_token(chunk) -> None:
+        with lock:
+            if chunk.task != last[0]:
+                last[0] = chunk.task
+                sys.stdout.write(f"\n\n  ── {(chunk.agent or chunk.task).strip()} · {chunk.task} ──\n\n")
+            sys.stdout.write(chunk.text)
+            sys.stdout.flush()
+
+    return _print_token if _streaming() else None
+
+
 def run():
     """crewai run"""
     main()
 
+
+def replay():
+    """
+    Resume a plan from its task checkpoints. Without an inputs file the
+    last run is resumed. --from-task reruns that task and everything after it.
+    Usage: replay [inputs.json] [--from-task TASK]
+    """
+    parser = argparse.ArgumentParser(prog="replay", description=replay.__doc__)
+    parser.add_argument("inputs", nargs="?", help="JSON file with the trip inputs")
+    parser.add_argument("--from-task", action="append", default=[],
+                        help="task to rerun along with its downstream tasks")
+    args = parser.parse_args()
+
+    if not _check_env():
+        print("\n Missing API keys. Exiting.\n")
+        sys.exit(1)
+
+    try:
+        if args.inputs:
+            with open(args.inputs, encoding="utf-8") as f:
+                inputs = normalise_inputs(json.load(f))
+        else:
+            store = get_checkpoint_store()
+            last = store.last_run() if store is not None else None
+            if not last:
+                print("\n  No previous run to resume.\n")
+                sys.exit(1)
+            inputs = last["inputs"]
+            print(f"\n  Resuming last run ({last['status']}): {inputs['destination']}")
+    except (OSError, ValueError) as e:
+        log.error(f"[Main] Cannot load replay inputs: {e}")
+        print(f"\n  Cannot load inputs: {e}\n")
+        sys.exit(1)
+
+    log.info(f"[Main] Replaying {inputs.get('destination')} (rerun={args.from_task})")
+    from travel_planner.crew import plan_trip
+    try:
+        result = plan_trip(
+            inputs, rerun=tuple(args.from_task),
+            on_section=_print_section, on_token=_token_printer(),
+        )
+    except RuntimeError as e:
+        print(f"\n  Planning failed: {e}")
+        print("     Check /logs for the full error trace.\n")
+        sys.exit(1)
+
+    print("\n" + "═" * 55)
+    print("  Travel plan generated successfully!")
+    print(f"  Saved to: {result.output_path}")
+    print("═" * 55 + "\n")
+
+
+def batch():
+    """
+    Plan every trip in a JSONL file without prompting.
+    Usage: batch_plan requests.jsonl [--concurrency N] [--results out.jsonl]
+           batch_plan requests.jsonl --enqueue   (for plan_workers processes)
+    """
+    parser = argparse.ArgumentParser(prog="batch_plan", description=batch.__doc__)
+    parser.add_argument("input", help="JSONL file, one trip request per line")
+    parser.add_argument(
+        "--concurrency", type=int,
+        default=int(os.getenv("TRAVEL_PLANNER_BATCH_CONCURRENCY", "4")),
+        help="maximum crews running at once (default 4)",
+    )
+    parser.add_argument("--results", default="", help="where to write result lines")
+    parser.add_argument(
+        "--enqueue", action="store_true",
+        help="queue the requests for plan_workers instead of planning them here",
+    )
+    args = parser.parse_args()
+
+    if args.enqueue:
+        try:
+            lines = enqueue_batch(args.input)
+        except OSError as e:
+            log.error(f"[Main] Cannot read batch file: {e}")
+            print(f"\n  Cannot read batch file: {e}\n")
+            sys.exit(1)
+        for line in lines:
+            print(json.dumps(line))
+        sys.exit(0 if all(l["status"] == "queued" for l in lines) else 2)
+
+    log.info("[Main] Batch planning starting")
+    if not _check_env():
+        print("\n Missing API keys. Exiting.\n")
+        sys.exit(1)
+
+    try:
+        summary = run_batch(args.input, args.results, args.concurrency)
+    except OSError as e:
+        log.error(f"[Main] Cannot read batch file: {e}")
+        print(f"\n  Cannot read batch file: {e}\n")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n  Batch interrupted.\n")
+        log.warning("[Main] Batch interrupted.")
+        sys.exit(130)
+
+    print("\n" + "═" * 55)
+    print(f"  Batch finished: {summary['succeeded']}/{summary['requests']} plans")
+    print(f"  Failed          : {summary['failed']}")
+    print(f"  Reused          : {summary['reused']} (stored, shared or restored; no LLM calls)")
+    print(f"  Wall time       : {summary['elapsed_s']:,.1f} s")
+    print(f"  Throughput      : {summary['plans_per_min']} plans/min")
+    print(f"  Tokens per plan : {summary['tokens_per_plan']:,} (plans that called the LLM)")
+    print(f"  Results         : {summary['results_path']}")
+    print("═" * 55 + "\n")
+    sys.exit(0 if summary["failed"] == 0 else 2)
+
+
+def test():
+    """
+    Plan a corpus of trips against recorded LLM responses and Serper
+    searches: offline, deterministic and fast. --record calls the live
+    APIs once and stores their answers for later runs.
+    Usage: test [requests.jsonl] [--record] [--cache PATH] [--concurrency N]
+    """
+    parser = argparse.ArgumentParser(prog="test", description=test.__doc__)
+    parser.add_argument("input", nargs="?", default=os.path.join("benchmarks", "corpus.jsonl"),
+                        help="JSONL file of trip requests (default benchmarks/corpus.jsonl)")
+    parser.add_argument("--record", action="store_true",
+                        help="call Groq and Serper and record their responses")
+    parser.add_argument("--cache", default="", help="recording to use (default LLM_CACHE_PATH)")
+    parser.add_argument("--concurrency", type=int, default=4, help="crews running at once")
+    parser.add_argument("--results", default="", help="where to write result lines")
+    args = parser.parse_args()
+
+    # every answer must come from the recording, not from earlier runs' state
+    os.environ["LLM_CACHE"] = "record" if args.record else "replay"
+    if args.cache:
+        os.environ["LLM_CACHE_PATH"] = args.cache
+    for var in ("CHECKPOINTS_ENABLED", "RESEARCH_STORE_ENABLED", "PLAN_STORE_ENABLED",
+                "SERPER_CACHE_ENABLED", "TRAVEL_PLANNER_COALESCE"):
+        os.environ[var] = "0"
+    if args.record:
+        if not _check_env():
+            print("\n Missing API keys. Exiting.\n")
+            sys.exit(1)
+    else:
+        # replay never reaches the APIs; the clients only need a key to start
+        for var in ("GROQ_API_KEY", "SERPER_API_KEY"):
+            os.environ.setdefault(var, "replay")
+
+    log.info(f"[Main] Test run ({os.environ['LLM_CACHE']}) on {args.input}")
+    try:
+        summary = run_batch(args.input, args.results, args.concurrency)
+    except OSError as e:
+        log.error(f"[Main] Cannot read test corpus: {e}")
+        print(f"\n  Cannot read test corpus: {e}\n")
+        sys.exit(1)
+
+    print("\n" + "═" * 55)
+    print(f"  Test run ({os.environ['LLM_CACHE']}): {summary['succeeded']}/{summary['requests']} plans")
+    print(f"  Failed    : {summary['failed']}")
+    print(f"  Wall time : {summary['elapsed_s']:,.1f} s")
+    print(f"  Results   : {summary['results_path']}")
+    print("═" * 55 + "\n")
+    sys.exit(0 if summary["failed"] == 0 else 2)
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,407 @@
+"""
+metrics.py
+
+Latency and token instrumentation for planning runs.
+
+Timing spans are recorded around every task, every LLM call and every
+Serper search, together with per-task token counts (the usage the
+provider reports) and cache-hit flags.
+Each run is exported as a JSON run record, and process-wide histograms
+and counters are rendered in the Prometheus text format, both to a file
+(for a node-exporter textfile collector) and via the service's /metrics.
+
+Task and LLM spans come from CrewAI's event bus; code-side spans (Serper,
+validation, saving) use the `span()` context manager and are attributed
+to the run active in the current context. CrewAI runs async tasks on
+threads of their own, which do not inherit that context, so the tasks
+enter task_scope() and a task's code finds its run through the task id.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from travel_planner.logger import get_logger, log_context
+from travel_planner.paths import output_path
+
+log = get_logger(__name__)
+
+_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_DURATION_METRIC = "travel_planner_span_duration_seconds"
+_TOKENS_METRIC = "travel_planner_tokens_total"
+_CACHE_METRIC = "travel_planner_cache_lookups_total"
+_RUNS_METRIC = "travel_planner_runs_total"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Registry:
+    """Minimal histogram / counter store rendered as Prometheus text."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict = {}  # (name, labels) → [bucket counts, sum, count]
+        self._counters: dict = {}    # (name, labels) → value
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            buckets, total, count = self._histograms.get(key, ([0] * len(_BUCKETS), 0.0, 0))
+            buckets = [b + (1 if value <= bound else 0) for b, bound in zip(buckets, _BUCKETS)]
+            self._histograms[key] = (buckets, total + value, count + 1)
+
+    def inc(self, name: str, labels: dict, value: float = 1) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        def fmt(labels: tuple, le: str = "") -> str:
+            pairs = list(labels) + ([("le", le)] if le else [])
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (n, labels), (buckets, total, count) in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    for bound, b in zip(_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{fmt(labels, str(bound))} {b}")
+                    lines.append(f"{name}_bucket{fmt(labels, '+Inf')} {count}")
+                    lines.append(f"{name}_sum{fmt(labels)} {round(total, 6)}")
+                    lines.append(f"{name}_count{fmt(labels)} {count}")
+            for name in sorted({n for n, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = _Registry()
+
+
+class RunRecorder:
+    """Spans and per-task stats for one planning run."""
+
+    def __init__(self, inputs: dict):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.inputs = dict(inputs)
+        self.spans: list = []
+        self.tasks: dict = {}
+        self.task_names: dict = {}    # task id → task name
+        self._llm_started: dict = {}  # task id → [start timestamps]
+        self._lock = threading.Lock()
+
+    def task(self, name: str) -> dict:
+        """Stats dict for a task, created on first use."""
+        with self._lock:
+            return self.tasks.setdefault(name, {
+                "duration_s":        None,
+                "llm_calls":         0,
+                "llm_seconds":       0.0,
+                "prompt_tokens":     0,
+                "completion_tokens": 0,
+                "reused_from":       None,
+            })
+
+    def record_span(self, kind: str, name: str, start: float, duration: float, **attrs) -> None:
+        with self._lock:
+            self.spans.append({
+                "kind":       kind,
+                "name":       name,
+                "start":      round(start - self.started_at, 4),
+                "duration_s": round(duration, 4),
+                **attrs,
+            })
+
+    def to_dict(self, status: str, usage: dict) -> dict:
+        by_kind: dict = {}
+        for s in self.spans:
+            by_kind.setdefault(s["kind"], []).append(s["duration_s"])
+        return {
+            "run_id":     self.run_id,
+            "status":     status,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "wall_s":     round(time.time() - self.started_at, 3),
+            "inputs":     self.inputs,
+            "usage":      usage,
+            "tasks":      self.tasks,
+            "totals":     {k: {"count": len(v), "seconds": round(sum(v), 3)} for k, v in by_kind.items()},
+            "spans":      self.spans,
+        }
+
+
+_current_run: contextvars.ContextVar = contextvars.ContextVar("travel_planner_run", default=None)
+_current_task: contextvars.ContextVar = contextvars.ContextVar("travel_planner_task", default=None)
+_task_runs: dict = {}  # task id → RunRecorder
+_task_runs_lock = threading.Lock()
+
+
+def current_run() -> Optional[RunRecorder]:
+    """The run of the task executing in this context, else the run started in it."""
+    return _recorder_for(_current_task.get()) or _current_run.get()
+
+
+def current_task() -> Optional[str]:
+    """Id of the task executing in this context (see task_scope)."""
+    return _current_task.get()
+
+
+@contextmanager
+def task_scope(task_id: str):
+    """
+    Run a task's body as that task: spans and searches inside it are
+    attributed to the run the task is bound to, and its log records carry
+    the run id, whichever thread CrewAI executes it on.
+    """
+    token = _current_task.set(task_id)
+    recorder = _recorder_for(task_id)
+    try:
+        if recorder is None:
+            yield
+        else:
+            with log_context(run_id=recorder.run_id):
+                yield
+    finally:
+        _current_task.reset(token)
+
+
+def start_run(inputs: dict) -> RunRecorder:
+    """Begin recording a run in the current context."""
+    install_crewai_listener()
+    recorder = RunRecorder(inputs)
+    _current_run.set(recorder)
+    return recorder
+
+
+def bind_tasks(recorder: RunRecorder, tasks: list) -> None:
+    """Attribute CrewAI events for these tasks to the recorder."""
+    with _task_runs_lock:
+        for t in tasks:
+            _task_runs[str(t.id)] = recorder
+    with recorder._lock:
+        recorder.task_names.update({str(t.id): t.name for t in tasks})
+
+
+def _metrics_path(*parts: str) -> str:
+    """Path under TRAVEL_PLANNER_METRICS_DIR (default output/metrics), creating its parent."""
+    root = os.getenv("TRAVEL_PLANNER_METRICS_DIR")
+    if not root:
+        return output_path("metrics", *parts)
+    path = os.path.join(root, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def finish_run(recorder: RunRecorder, status: str, usage: Optional[dict] = None) -> str:
+    """
+    Close the run: update the counters, write the JSON run record and
+    refresh the Prometheus file. Returns the run record path.
+    """
+    usage = usage or {}
+    # LLM and task events are handled on the bus's thread pool; let the
+    # ones already emitted land on this run before its tasks are unbound
+    _flush_events()
+    _current_run.set(None)
+    with _task_runs_lock:
+        for task_id in [k for k, v in _task_runs.items() if v is recorder]:
+            del _task_runs[task_id]
+
+    REGISTRY.inc(_RUNS_METRIC, {"status": status})
+    REGISTRY.observe(_DURATION_METRIC, {"kind": "run", "name": "plan"}, time.time() - recorder.started_at)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            REGISTRY.inc(_TOKENS_METRIC, {"task": "all", "type": kind}, usage[kind])
+
+    record_path = _metrics_path("runs", f"run_{recorder.run_id}.json")
+    try:
+        with open(record_path, "w", encoding="utf-8") as f:
+            json.dump(recorder.to_dict(status, usage), f, indent=2, default=str)
+        with open(_metrics_path("travel_planner.prom"), "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        log.info(f"[Metrics] Run record → {record_path}")
+    except OSError as e:
+        log.warning(f"[Metrics] Could not write run record: {e}")
+    return record_path
+
+
+def record_llm_usage(task, prompt_tokens: int, completion_tokens: int) -> None:
+    """
+    Add the token usage the provider reported for one LLM call to the
+    task's stats. `task` is the CrewAI task passed to the call, or None
+    for the task executing in this context.
+    """
+    task_id = str(task.id) if task is not None else _current_task.get()
+    recorder = _recorder_for(task_id)
+    if recorder is None or not (prompt_tokens or completion_tokens):
+        return
+    task_name = getattr(task, "name", None) or recorder.task_names.get(task_id, "unknown")
+    stats = recorder.task(task_name)
+    with recorder._lock:
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+    REGISTRY.inc(_TOKENS_METRIC, {"task": task_name, "type": "prompt_tokens"}, prompt_tokens)
+    REGISTRY.inc(_TOKENS_METRIC, {"task": task_name, "type": "completion_tokens"}, completion_tokens)
+
+
+def render_prometheus() -> str:
+    """All process-wide metrics in the Prometheus text exposition format."""
+    return REGISTRY.render()
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    REGISTRY.inc(_CACHE_METRIC, {"cache": cache, "result": "hit" if hit else "miss"})
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    """
+    Time a block. `name` becomes a Prometheus label, so keep it bounded
+    (task or stage names, not queries); put details in attrs. The yielded
+    dict can be updated inside the block, e.g. with a cache_hit flag.
+    """
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - t0
+        REGISTRY.observe(_DURATION_METRIC, {"kind": kind, "name": name}, duration)
+        if "cache_hit" in attrs:
+            count_cache_lookup(kind, attrs["cache_hit"])
+        recorder = current_run()
+        if recorder is not None:
+            recorder.record_span(kind, name, start, duration, **attrs)
+
+
+# --- CrewAI event bus ---
+_listener_installed = False
+_listener_lock = threading.Lock()
+_event_bus = None
+
+
+def _event_time(event) -> float:
+    ts = getattr(event, "timestamp", None)
+    return ts.timestamp() if isinstance(ts, datetime) else time.time()
+
+
+def _flush_events(timeout: float = 10.0) -> None:
+    if _event_bus is not None and not _event_bus.flush(timeout=timeout):
+        log.warning(f"[Metrics] CrewAI event handlers still pending after {timeout:.0f}s")
+
+
+def _recorder_for(task_id) -> Optional[RunRecorder]:
+    with _task_runs_lock:
+        return _task_runs.get(str(task_id)) if task_id else None
+
+
+def install_crewai_listener() -> None:
+    """Subscribe to task and LLM events once per process."""
+    global _listener_installed, _event_bus
+    with _listener_lock:
+        if _listener_installed:
+            return
+        _listener_installed = True
+        try:
+            from crewai.events import (
+                LLMCallCompletedEvent,
+                LLMCallFailedEvent,
+                LLMCallStartedEvent,
+                TaskCompletedEvent,
+                TaskFailedEvent,
+                TaskStartedEvent,
+                crewai_event_bus,
+            )
+        except ImportError as e:
+            log.warning(f"[Metrics] CrewAI events unavailable, task/LLM spans disabled: {e}")
+            return
+        _event_bus = crewai_event_bus
+
+    def _task_of(source, event):
+        return getattr(event, "task", None) or source
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def _on_task_started(source, event):
+        t = _task_of(source, event)
+        recorder = _recorder_for(getattr(t, "id", None))
+        if recorder is not None:
+            recorder.task(t.name)["_started"] = _event_time(event)
+
+    def _on_task_finished(source, event, status: str):
+        t = _task_of(source, event)
+        recorder = _recorder_for(getattr(t, "id", None))
+        if recorder is None:
+            return
+        stats = recorder.task(t.name)
+        started = stats.pop("_started", None)
+        if started is None:
+            return
+        duration = _event_time(event) - started
+        stats["duration_s"] = round(duration, 3)
+        REGISTRY.observe(_DURATION_METRIC, {"kind": "task", "name": t.name}, duration)
+        recorder.record_span("task", t.name, started, duration, status=status)
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def _on_task_completed(source, event):
+        _on_task_finished(source, event, "ok")
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def _on_task_failed(source, event):
+        _on_task_finished(source, event, "error")
+
+    @crewai_event_bus.on(LLMCallStartedEvent)
+    def _on_llm_started(source, event):
+        recorder = _recorder_for(getattr(event, "task_id", None))
+        if recorder is None:
+            return
+        with recorder._lock:
+            recorder._llm_started.setdefault(str(event.task_id), []).append(_event_time(event))
+
+    def _on_llm_finished(event, status: str):
+        recorder = _recorder_for(getattr(event, "task_id", None))
+        if recorder is None:
+            return
+        with recorder._lock:
+            pending = recorder._llm_started.get(str(event.task_id)) or []
+            started = pending.pop(0) if pending else _event_time(event)
+        duration = _event_time(event) - started
+        task_name = getattr(event, "task_name", None) or "unknown"
+
+        stats = recorder.task(task_name)
+        stats["llm_calls"] += 1
+        stats["llm_seconds"] = round(stats["llm_seconds"] + duration, 3)
+
+        REGISTRY.observe(_DURATION_METRIC, {"kind": "llm", "name": task_name}, duration)
+        recorder.record_span(
+            "llm", task_name, started, duration,
+            model=getattr(event, "model", None), status=status,
+            agent=getattr(event, "agent_role", None),
+        )
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def _on_llm_completed(source, event):
+        _on_llm_finished(event, "ok")
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def _on_llm_failed(source, event):
+        _on_llm_finished(event, "error")
+
+    log.info("[Metrics] CrewAI event listener installed.")
@@ -0,0 +1,156 @@
+"""
+multi_city.py
+
+Multi-stop trips. A trip may carry `stops`: an ordered list of
+{"city", "nights"} whose nights add up to num_days. Research and price
+lookups then run once per city (concurrently, and cached per city like
+any single-city trip), the transport legs between stops are priced
+alongside them, and the per-city texts are combined into the single
+research / price research outputs the budget and itinerary tasks read.
+
+Day numbering follows the rest of the planner (one night per day):
+stop i covers the days from its arrival day up to the next stop's
+arrival day, which is the travel day of the leg between them.
+"""
+
+from datetime import datetime, timedelta
+
+# heading of each city's part in a combined output; compaction.py splits on it
+STOP_HEADING = "### Stop {index}: {city}"
+LEGS_HEADING = "### Transport between stops"
+
+
+def parse_stops(raw) -> list:
+    """
+    Ordered [{"city", "nights"}] from a list of dicts ({"city", "nights"})
+    or a string like "Lisbon, Portugal: 3; Porto, Portugal: 2".
+    Raises ValueError for a malformed stop.
+    """
+    if isinstance(raw, str):
+        items = []
+        for part in filter(None, (p.strip() for p in raw.split(";"))):
+            city, sep, nights = part.rpartition(":")
+            if not sep:
+                raise ValueError(f"Stop '{part}' must look like 'City: nights'")
+            items.append({"city": city, "nights": nights})
+        raw = items
+
+    stops = []
+    for item in raw or []:
+        if not isinstance(item, dict):
+            raise ValueError(f"Stop must be an object with city and nights, got {item!r}")
+        city = str(item.get("city") or "").strip()
+        try:
+            nights = int(str(item.get("nights", "")).strip())
+        except ValueError:
+            raise ValueError(f"Stop '{city}': nights must be a whole number")
+        if not city or nights <= 0:
+            raise ValueError(f"Stop '{city}': needs a city and at least one night")
+        stops.append({"city": city, "nights": nights})
+    return stops
+
+
+def is_multi_city(inputs: dict) -> bool:
+    return len(inputs.get("stops") or []) > 1
+
+
+def _short(city: str) -> str:
+    """'Lisbon, Portugal' → 'Lisbon'."""
+    return city.split(",")[0].strip()
+
+
+def _nights(n: int) -> str:
+    return f"{n} night{'s' if n != 1 else ''}"
+
+
+def route_name(stops: list) -> str:
+    """Destination label for a multi-city trip, e.g. 'Lisbon → Porto → Madrid'."""
+    return " → ".join(_short(s["city"]) for s in stops)
+
+
+def _schedule(inputs: dict) -> list:
+    """Per stop: (index, stop, first_day, arrival_date, departure_date)."""
+    start = datetime.strptime(inputs["start_date"], "%Y-%m-%d").date()
+    rows, day = [], 1
+    for index, stop in enumerate(inputs["stops"], start=1):
+        arrive = start + timedelta(days=day - 1)
+        depart = arrive + timedelta(days=stop["nights"])
+        rows.append((index, stop, day, arrive.isoformat(), depart.isoformat()))
+        day += stop["nights"]
+    return rows
+
+
+def describe_route(inputs: dict) -> str:
+    """
+    The {route} placeholder of the budget and itinerary tasks: the day
+    schedule for a multi-city trip, or just the destination otherwise.
+    """
+    if not is_multi_city(inputs):
+        return f"{inputs.get('destination')} for the whole trip"
+    rows = _schedule(inputs)
+    parts = []
+    for index, stop, first_day, _, _ in rows:
+        last_day = first_day + stop["nights"] - 1
+        days = f"Day {first_day}" if last_day == first_day else f"Days {first_day}-{last_day}"
+        if index > 1:
+            parts.append(
+                f"travel from {rows[index - 2][1]['city']} to {stop['city']} "
+                f"on the morning of Day {first_day}"
+            )
+        parts.append(f"{stop['city']}: {days} ({_nights(stop['nights'])})")
+    return "; then ".join(parts)
+
+
+def with_route(inputs: dict) -> dict:
+    """Inputs with the {route} placeholder filled in (unchanged if already set)."""
+    if inputs.get("route"):
+        return inputs
+    return {**inputs, "route": describe_route(inputs)}
+
+
+def stop_inputs(inputs: dict, index: int) -> dict:
+    """
+    Single-city inputs for stop `index` (1-based): that city and its dates.
+    Research and price checkpoints / research store entries are keyed on
+    these, so they are shared with single-city trips to the same place.
+    """
+    _, stop, _, arrive, depart = _schedule(inputs)[index - 1]
+    city_inputs = {k: v for k, v in inputs.items() if k not in ("stops", "route")}
+    city_inputs.update({
+        "destination": stop["city"],
+        "start_date":  arrive,
+        "end_date":    depart,
+        "num_days":    stop["nights"],
+    })
+    city_inputs["route"] = describe_route(city_inputs)
+    return city_inputs
+
+
+def legs(inputs: dict) -> list:
+    """(from_city, to_city, travel_date) for every move between consecutive stops."""
+    rows = _schedule(inputs)
+    return [
+        (rows[i][1]["city"], rows[i + 1][1]["city"], rows[i + 1][3])
+        for i in range(len(rows) - 1)
+    ]
+
+
+def leg_inputs(inputs: dict, leg: tuple) -> dict:
+    """Trip inputs plus the placeholders of transport_leg_task."""
+    origin, destination, travel_date = leg
+    return {**inputs, "leg_from": origin, "leg_to": destination, "leg_date": travel_date}
+
+
+def combine(inputs: dict, texts: list, leg_texts: list = ()) -> str:
+    """
+    One output from the per-stop texts (in stop order), each under its
+    STOP_HEADING, followed by the transport legs when given.
+    """
+    parts = []
+    for (index, stop, _, arrive, depart), text in zip(_schedule(inputs), texts):
+        heading = STOP_HEADING.format(index=index, city=stop["city"])
+        parts.append(f"{heading} ({_nights(stop['nights'])}, {arrive} to {depart})\n\n{(text or '').strip()}")
+    if leg_texts:
+        parts.append(LEGS_HEADING + "\n\n" + "\n".join((t or "").strip() for t in leg_texts))
+    return "\n\n".join(parts)
+
@@ -0,0 +1,38 @@
+"""
+paths.py
+
+Filesystem locations shared by the planner's on-disk caches, stores and exports.
+"""
+
+import os
+
+# Resolve project root (src/travel_planner/paths.py → ../.. = project root)
+_PROJECT_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..")
+)
+
+
+def cache_path(*parts: str) -> str:
+    """
+    Return a path under the cache directory (TRAVEL_PLANNER_CACHE_DIR,
+    default <project root>/.cache), creating its parent directory.
+    """
+    cache_dir = os.getenv(
+        "TRAVEL_PLANNER_CACHE_DIR", os.path.join(_PROJECT_ROOT, ".cache")
+    )
+    path = os.path.join(cache_dir, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def output_path(*parts: str) -> str:
+    """
+    Return a path under the output directory (TRAVEL_PLANNER_OUTPUT_DIR,
+    default <project root>/output), creating its parent directory.
+    """
+    output_dir = os.getenv(
+        "TRAVEL_PLANNER_OUTPUT_DIR", os.path.join(_PROJECT_ROOT, "output")
+    )
+    path = os.path.join(output_dir, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,247 @@
+"""
+plan_store.py
+
+Index of finished plans. Each plan is stored with its inputs, keyed on
+the normalised inputs (the same key plan coalescing uses), with the
+written sections zlib-compressed in SQLite next to searchable columns:
+destination, travel dates and budget.
+
+A request whose inputs match a stored plan that is still fresh is
+answered from the store in milliseconds instead of running the crew.
+Freshness is the plan's age against PLAN_STORE_MAX_AGE_HOURS (default 6 h,
+the same lifetime as cached price searches, since the budget depends on
+them); older plans stay queryable but are planned again.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from travel_planner.checkpoints import checkpoint_key
+from travel_planner.logger import get_logger
+from travel_planner.metrics import count_cache_lookup
+from travel_planner.paths import cache_path
+from travel_planner.plan_writer import assemble
+
+log = get_logger(__name__)
+
+_DEFAULT_MAX_AGE_HOURS = 6
+_DEFAULT_MAX_PLANS = 5000
+
+
+def plan_key(inputs: dict) -> str:
+    """Key of a plan: every input field (and the stops), normalised."""
+    return checkpoint_key("plan", inputs)
+
+
+def _normalise(text: str) -> str:
+    return " ".join(re.sub(r"[^\w ]+", " ", str(text).lower()).split())
+
+
+@dataclass
+class StoredPlan:
+    """Metadata of one stored plan; sections are only loaded on request."""
+    plan_id: str
+    destination: str
+    start_date: str
+    end_date: str
+    num_days: int
+    budget_usd: float
+    preferences: str
+    output_path: str
+    run_id: str
+    total_tokens: int
+    created_at: float
+    inputs: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+_COLUMNS = (
+    "plan_id, destination, start_date, end_date, num_days, budget_usd, preferences, "
+    "output_path, run_id, total_tokens, created_at, inputs"
+)
+
+
+def _plan(row) -> StoredPlan:
+    return StoredPlan(*row[:11], inputs=json.loads(row[11]))
+
+
+class PlanStore:
+    """SQLite table of plans: indexed metadata plus compressed sections."""
+
+    def __init__(self, path: str, max_age_s: float, max_plans: int = _DEFAULT_MAX_PLANS):
+        self.path = path
+        self.max_age_s = max_age_s
+        self.max_plans = max_plans
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS plans (
+                plan_id       TEXT PRIMARY KEY,
+                key           TEXT NOT NULL,
+                destination   TEXT NOT NULL,
+                dest_norm     TEXT NOT NULL,
+                start_date    TEXT NOT NULL,
+                end_date      TEXT NOT NULL,
+                num_days      INTEGER,
+                budget_usd    REAL,
+                preferences   TEXT,
+                output_path   TEXT,
+                run_id        TEXT,
+                total_tokens  INTEGER,
+                created_at    REAL NOT NULL,
+                inputs        TEXT NOT NULL,
+                sections      BLOB NOT NULL
+            )
+            """
+        )
+        for index in (
+            "idx_plans_key ON plans (key, created_at)",
+            "idx_plans_destination ON plans (dest_norm, start_date)",
+            "idx_plans_start ON plans (start_date)",
+            "idx_plans_budget ON plans (budget_usd)",
+            "idx_plans_created ON plans (created_at)",
+        ):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index}")
+        self._conn.commit()
+
+    def put(self, inputs: dict, sections: list, output_path: str,
+            run_id: str = "", total_tokens: int = 0) -> str:
+        """Store a finished plan; sections are PlanSection dicts in write order. Returns its id."""
+        plan_id = uuid.uuid4().hex
+        body = zlib.compress(json.dumps(sections).encode("utf-8"), 6)
+        destination = str(inputs.get("destination", ""))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO plans (plan_id, key, destination, dest_norm, start_date, end_date, "
+                "num_days, budget_usd, preferences, output_path, run_id, total_tokens, created_at, "
+                "inputs, sections) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    plan_id, plan_key(inputs), destination, _normalise(destination),
+                    str(inputs.get("start_date", "")), str(inputs.get("end_date", "")),
+                    inputs.get("num_days"), float(inputs.get("budget_usd") or 0),
+                    inputs.get("preferences") or "", output_path, run_id, total_tokens,
+                    time.time(), json.dumps(inputs), body,
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM plans WHERE plan_id IN "
+                "(SELECT plan_id FROM plans ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_plans,),
+            )
+            self._conn.commit()
+        log.info(f"[PlanStore] Stored plan {plan_id[:8]} for {destination}")
+        return plan_id
+
+    def fresh(self, inputs: dict) -> Optional[StoredPlan]:
+        """The newest plan for exactly these inputs, if it is still fresh."""
+        if self.max_age_s <= 0:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM plans WHERE key = ? AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (plan_key(inputs), time.time() - self.max_age_s),
+            ).fetchone()
+        count_cache_lookup("plan_store", row is not None)
+        return _plan(row) if row else None
+
+    def get(self, plan_id: str) -> Optional[StoredPlan]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM plans WHERE plan_id = ?", (plan_id,)
+            ).fetchone()
+        return _plan(row) if row else None
+
+    def sections(self, plan_id: str) -> list:
+        """The plan's PlanSection dicts, in write order."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sections FROM plans WHERE plan_id = ?", (plan_id,)
+            ).fetchone()
+        return json.loads(zlib.decompress(row[0]).decode("utf-8")) if row else []
+
+    def markdown(self, plan_id: str) -> Optional[str]:
+        """The plan file's text, rebuilt from the stored sections."""
+        return assemble(self.sections(plan_id)) or None
+
+    def find(
+        self,
+        destination: str = "",
+        start_from: str = "",
+        start_to: str = "",
+        budget_min: Optional[float] = None,
+        budget_max: Optional[float] = None,
+        limit: int = 20,
+    ) -> list:
+        """
+        Stored plans, newest first, filtered by destination (whole words,
+        e.g. "lisbon" matches "Lisbon, Portugal"), start date range
+        (YYYY-MM-DD, inclusive) and budget range.
+        """
+        clauses, params = [], []
+        if destination:
+            clauses.append("(' ' || dest_norm || ' ') LIKE ?")
+            params.append(f"% {_normalise(destination)} %")
+        if start_from:
+            clauses.append("start_date >= ?")
+            params.append(start_from)
+        if start_to:
+            clauses.append("start_date <= ?")
+            params.append(start_to)
+        if budget_min is not None:
+            clauses.append("budget_usd >= ?")
+            params.append(budget_min)
+        if budget_max is not None:
+            clauses.append("budget_usd <= ?")
+            params.append(budget_max)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM plans {where} ORDER BY created_at DESC LIMIT ?",
+                (*params, max(1, limit)),
+            ).fetchall()
+        return [_plan(row) for row in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(sections)), 0) FROM plans"
+            ).fetchone()
+        return {"plans": count, "bytes": size}
+
+
+_store: Optional[PlanStore] = None
+_store_lock = threading.Lock()
+
+
+def get_plan_store() -> Optional[PlanStore]:
+    """
+    Return the process-wide store, or None when disabled via
+    PLAN_STORE_ENABLED=0. Opened on first use at PLAN_STORE_PATH (default
+    .cache/plans.sqlite3); PLAN_STORE_MAX_AGE_HOURS=0 keeps storing plans
+    but never reuses them, PLAN_STORE_MAX_PLANS bounds the table.
+    """
+    global _store
+    if os.getenv("PLAN_STORE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _store_lock:
+        if _store is None:
+            path = os.getenv("PLAN_STORE_PATH") or cache_path("plans.sqlite3")
+            hours = float(os.getenv("PLAN_STORE_MAX_AGE_HOURS", _DEFAULT_MAX_AGE_HOURS))
+            max_plans = int(os.getenv("PLAN_STORE_MAX_PLANS", _DEFAULT_MAX_PLANS))
+            _store = PlanStore(path, hours * 3600, max_plans)
+            log.info(f"[PlanStore] Opened {path}")
+        return _store
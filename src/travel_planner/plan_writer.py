@@ -0,0 +1,213 @@
+"""
+plan_writer.py
+
+Incremental Markdown output. The plan file is created with its header and
+Trip Overview as soon as a run starts, and each section (research, budget,
+itinerary, validation) is appended as its task completes, so the file is
+useful within seconds and a crash keeps everything finished so far.
+Every written part is also passed to an optional `on_section` callback
+and kept in `sections`, which is what the plan store saves.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.paths import output_path
+
+log = get_logger(__name__)
+
+# task name → section heading, in document order
+SECTIONS = (
+    ("research_task",   "Destination Research"),
+    ("budget_task",     "Budget Breakdown"),
+    ("itinerary_task",  "Day-wise Itinerary"),
+    ("validation_task", "Validation Summary"),
+)
+
+_FOOTER = "*Generated by AI Travel Planner · *\n"
+_MISSING = "_No output available._"
+
+
+@dataclass
+class PlanSection:
+    """One part of the plan as it is written: "overview", a task name, "done" or "failed"."""
+    name: str
+    title: str
+    markdown: str
+    output_path: str
+
+
+def _header(inputs: dict, generated_at: datetime) -> str:
+    """Title, past-date notice and Trip Overview."""
+    destination = inputs.get("destination", "Unknown")
+
+    # checking if the travel duration is in the past
+    try:
+        trip_start  = datetime.strptime(inputs.get("start_date", ""), "%Y-%m-%d").date()
+        today       = datetime.now().date()
+        is_past     = trip_start < today
+    except ValueError:
+        is_past     = False
+
+    past_date_banner = ""
+    if is_past:
+        log.warning(
+            f"[Output] Trip start date {inputs.get('start_date')} is in the past. "
+            "Adding past-date notice to output file."
+        )
+        past_date_banner = f"""> [!WARNING]
+> ⚠️ **You are viewing a travel plan for a past date.**
+> The trip start date **{inputs.get('start_date')}** has already passed.
+> Prices, attractions, and availability may no longer be accurate.
+> Please re-run the planner with future dates for up-to-date information.
+
+---
+
+"""
+
+    route_row = ""
+    if len(inputs.get("stops") or []) > 1:
+        route_row = f"| Route        | {inputs.get('route')}\n"
+
+    return f"""# Travel Plan: {destination}
+
+> **Generated:** {generated_at.strftime('%d %B %Y, %H:%M')}
+
+---
+
+{past_date_banner}## 📋 Trip Overview
+
+| Field        | Details                                      |
+|--------------|----------------------------------------------|
+| Destination  | {destination}                                
+| Start Date   | {inputs.get('start_date')}                   
+| End Date     | {inputs.get('end_date')}                     
+| Duration     | {inputs.get('num_days')} days                
+| Budget       | ${float(inputs.get('budget_usd', 0)):,.2f} USD 
+| Preferences  | {inputs.get('preferences') or 'None'}        
+{route_row}
+---
+"""
+
+
+def assemble(sections: list) -> str:
+    """The full plan file from its written parts ({name, title, markdown}, overview first)."""
+    if not sections:
+        return ""
+    head, *rest = sections
+    return head["markdown"] + "".join("\n" + s["markdown"] for s in rest) + _FOOTER
+
+
+def _open_exclusive(filepath: str):
+    """Create the file; concurrent runs for the same destination can share a timestamp."""
+    stem, suffix = os.path.splitext(filepath)
+    attempt = 1
+    while True:
+        try:
+            return open(filepath, "x", encoding="utf-8"), filepath
+        except FileExistsError:
+            attempt += 1
+            filepath = f"{stem}_{attempt}{suffix}"
+
+
+class PlanWriter:
+    """
+    Writes one plan file section by section. Sections may arrive in any
+    order (and from task threads); they are written in document order, each
+    as soon as everything before it is on disk.
+    """
+
+    def __init__(self, inputs: dict, on_section: Optional[Callable[[PlanSection], None]] = None):
+        self.inputs = inputs
+        self.on_section = on_section
+        self.path = ""
+        self._file = None
+        self._pending: dict = {}
+        self._next = 0  # index into SECTIONS of the next section to write
+        self.sections: list = []  # {name, title, markdown} of each part written
+        self._lock = threading.Lock()
+
+    def start(self) -> str:
+        """Create the file with the header and Trip Overview. Returns its path."""
+        generated_at = datetime.now()
+        safe_dest = self.inputs.get("destination", "Unknown").replace(" ", "_").replace(",", "").lower()
+        filename = f"travel_plan_{safe_dest}_{generated_at.strftime('%Y%m%d_%H%M%S')}.md"
+        self._file, self.path = _open_exclusive(output_path(filename))
+
+        header = _header(self.inputs, generated_at)
+        with self._lock:
+            self._write(header)
+        log.info(f"[Output] Writing plan → {self.path}")
+        self._emit(PlanSection("overview", "Trip Overview", header, self.path))
+        return self.path
+
+    def add(self, task_name: str, text: str) -> None:
+        """Queue a task's output; ignored for tasks that are not plan sections."""
+        if task_name not in dict(SECTIONS):
+            return
+        with self._lock:
+            if self._file is None or task_name in self._pending:
+                return
+            self._pending[task_name] = text or _MISSING
+            ready = self._flush_ready()
+        for section in ready:
+            self._emit(section)
+
+    def finish(self) -> str:
+        """Write placeholders for missing sections and the footer; close the file."""
+        with self._lock:
+            for name, _ in SECTIONS:
+                self._pending.setdefault(name, _MISSING)
+            ready = self._flush_ready()
+            self._write(_FOOTER)
+            self._close()
+        for section in ready:
+            self._emit(section)
+        log.info(f"[Runner] Output saved → {self.path}")
+        self._emit(PlanSection("done", "Done", "", self.path))
+        return self.path
+
+    def abort(self, error: Exception) -> None:
+        """Mark the partial plan as incomplete and close it."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(f"\n> [!CAUTION]\n> Planning stopped before this plan was complete: {error}\n")
+            self._close()
+        log.info(f"[Output] Partial plan kept → {self.path}")
+        self._emit(PlanSection("failed", "Failed", str(error), self.path))
+
+    # --- internals (call with the lock held) ---
+    def _flush_ready(self) -> list:
+        written = []
+        while self._next < len(SECTIONS) and SECTIONS[self._next][0] in self._pending:
+            name, title = SECTIONS[self._next]
+            chunk = f"## {title}\n\n{self._pending[name]}\n\n---\n"
+            self._write("\n" + chunk)
+            written.append(PlanSection(name, title, chunk, self.path))
+            self._next += 1
+        return written
+
+    def _write(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+        self._file = None
+
+    def _emit(self, section: PlanSection) -> None:
+        if section.name not in ("done", "failed"):
+            self.sections.append(
+                {"name": section.name, "title": section.title, "markdown": section.markdown}
+            )
+        if self.on_section is None:
+            return
+        try:
+            self.on_section(section)
+        except Exception as e:
+            log.warning(f"[Output] Section callback failed for {section.name}: {e}")
@@ -0,0 +1,419 @@
+"""
+rate_limit.py
+
+Quota-aware throttling for Groq and Serper, shared by every thread and
+every worker process on the machine.
+
+Each provider has token buckets (requests, and for Groq also tokens per
+minute) stored in one SQLite file, so concurrent plans, batch workers and
+service processes draw from the same quota instead of each assuming it
+has the whole of it. A 429 blocks the provider's buckets for everyone
+until its Retry-After has passed, and the call is retried with jittered
+exponential backoff rather than failing the plan.
+
+On top of the quota, each process caps the calls it has in flight per
+provider with an AIMD limit: it grows by one slot per window of
+successful calls, and halves on a 429, a timeout or a 5xx, or shrinks
+when latency climbs well above the best recently seen, so concurrency
+settles just below the point where the provider starts pushing back.
+"""
+
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.metrics import REGISTRY
+from travel_planner.paths import cache_path
+
+log = get_logger(__name__)
+
+_WAITS_METRIC = "travel_planner_rate_limit_waits_total"
+_WAIT_SECONDS_METRIC = "travel_planner_rate_limit_wait_seconds_total"
+_RETRIES_METRIC = "travel_planner_rate_limit_retries_total"
+
+# SQLite waits this long for another process's bucket update
+_BUSY_TIMEOUT_MS = 10_000
+
+# a burst can spend this many seconds of quota at once
+_BURST_S = 10
+
+# backoff: base * 2**attempt seconds of jitter, capped
+_BACKOFF_BASE_S = 1.0
+_BACKOFF_CAP_S = 60.0
+
+# "Please try again in 7.5s" / "in 850ms" in Groq's 429 message
+_TRY_AGAIN = re.compile(r"try again in\s+([\d.]+)\s*(ms|s)\b", re.IGNORECASE)
+
+# set while this thread is inside Provider.call
+_active = threading.local()
+
+
+@dataclass
+class Limit:
+    """`per_minute` units refill continuously into a bucket holding `burst`."""
+    bucket: str
+    per_minute: float
+    burst: float
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+
+def _limit(bucket: str, per_minute: float) -> Optional[Limit]:
+    """A Limit with a burst of _BURST_S seconds of quota, or None for 0 (unlimited)."""
+    if per_minute <= 0:
+        return None
+    return Limit(bucket, per_minute, max(1.0, per_minute * _BURST_S / 60.0))
+
+
+class TokenBuckets:
+    """
+    Token buckets persisted in SQLite. Every take runs in an IMMEDIATE
+    transaction, so processes sharing the file see each other's spending.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                name           TEXT PRIMARY KEY,
+                level          REAL NOT NULL,
+                updated_at     REAL NOT NULL,
+                blocked_until  REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    def _update(self, limit: Limit, fn: Callable[[float, float, float], tuple]):
+        """
+        Refill the bucket, then let fn(level, blocked_until, now) return
+        (new level, new blocked_until, result); stores and returns result.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT level, updated_at, blocked_until FROM buckets WHERE name = ?",
+                    (limit.bucket,),
+                ).fetchone()
+                if row is None:
+                    level, blocked_until = limit.burst, 0.0
+                else:
+                    level = min(limit.burst, row[0] + max(0.0, now - row[1]) * limit.rate)
+                    blocked_until = row[2]
+                level, blocked_until, result = fn(level, blocked_until, now)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated_at, blocked_until) "
+                    "VALUES (?, ?, ?, ?)",
+                    (limit.bucket, level, now, blocked_until),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def take(self, limit: Limit, amount: float) -> float:
+        """
+        Take `amount` units and return 0, or take nothing and return the
+        seconds until they are available. A request larger than the burst
+        goes through once the bucket is full, leaving it in debt.
+        """
+        def fn(level, blocked_until, now):
+            if blocked_until > now:
+                return level, blocked_until, blocked_until - now
+            needed = min(amount, limit.burst)
+            if level >= needed:
+                return level - amount, blocked_until, 0.0
+            return level, blocked_until, (needed - level) / limit.rate
+
+        return self._update(limit, fn)
+
+    def adjust(self, limit: Limit, delta: float) -> None:
+        """Give back (delta > 0) or charge (delta < 0) units after the fact."""
+        self._update(limit, lambda level, blocked, now: (min(limit.burst, level + delta), blocked, None))
+
+    def block(self, limit: Limit, seconds: float) -> None:
+        """Hold every taker of this bucket off for `seconds`."""
+        self._update(limit, lambda level, blocked, now: (level, max(blocked, now + seconds), None))
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD cap on calls in flight. +1 slot after `limit` successful calls,
+    ×0.5 on a throttle or transient error (at most once per
+    _DECREASE_INTERVAL_S, so a burst of 429s counts once), ×0.9 when
+    latency exceeds `latency_slack` × the best recent latency.
+    """
+
+    _DECREASE_INTERVAL_S = 2.0
+
+    def __init__(self, name: str, maximum: int, minimum: int = 1, latency_slack: float = 3.0):
+        self.name = name
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.latency_slack = latency_slack
+        self.limit = float(max(self.minimum, self.maximum // 2))
+        self.in_flight = 0
+        self._latency: Optional[float] = None   # EWMA of call latency
+        self._best: Optional[float] = None      # lowest EWMA, drifting up slowly
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, outcome: str) -> None:
+        """outcome is "ok", "throttled", "transient" or "error" (not the provider's fault)."""
+        with self._cond:
+            self.in_flight -= 1
+            before = int(self.limit)
+            if outcome in ("throttled", "transient"):
+                self._decrease(0.5)
+            elif outcome == "ok":
+                self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+                self._best = self._latency if self._best is None else min(self._best * 1.01, self._latency)
+                if self._latency > self.latency_slack * self._best:
+                    self._decrease(0.9)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            after = int(self.limit)
+            if after < before:
+                log.info(f"[RateLimit] {self.name} concurrency {before} → {after} ({outcome})")
+            elif after > before:
+                log.debug(f"[RateLimit] {self.name} concurrency {before} → {after}")
+            self._cond.notify_all()
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self._DECREASE_INTERVAL_S:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * factor)
+
+
+def backoff_delay(attempt: int, retry_after: float = 0.0) -> float:
+    """Server-requested wait plus full jitter growing exponentially with the attempt."""
+    return retry_after + random.uniform(0, min(_BACKOFF_CAP_S, _BACKOFF_BASE_S * 2 ** attempt))
+
+
+def _retry_after(headers, message: str = "") -> float:
+    """Seconds from a Retry-After header (or Groq's "try again in" text), 0 if absent."""
+    value = (headers or {}).get("retry-after") or (headers or {}).get("Retry-After")
+    try:
+        if value is not None:
+            return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    match = _TRY_AGAIN.search(message or "")
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if match.group(2).lower() == "ms" else seconds
+    return 0.0
+
+
+class Provider:
+    """
+    The quota buckets and concurrency limit of one API. call() runs a
+    request within both, retrying what `classify` marks as retryable.
+    `classify(error)` returns ("throttled" | "transient", retry_after) or
+    None for errors that retrying will not fix.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        buckets: Optional[TokenBuckets],
+        requests: Optional[Limit],
+        concurrency: AdaptiveConcurrency,
+        classify: Callable[[BaseException], Optional[tuple]],
+        tokens: Optional[Limit] = None,
+        max_retries: int = 5,
+    ):
+        self.name = name
+        self.buckets = buckets
+        self.requests = requests
+        self.tokens = tokens
+        self.concurrency = concurrency
+        self.classify = classify
+        self.max_retries = max_retries
+
+    def _limits(self) -> list:
+        return [l for l in (self.requests, self.tokens) if l is not None and self.buckets is not None]
+
+    def _wait_for_quota(self, tokens: int) -> None:
+        waited = 0.0
+        for limit in self._limits():
+            amount = 1 if limit is self.requests else tokens
+            if amount <= 0:
+                continue
+            while True:
+                wait = self.buckets.take(limit, amount)
+                if wait <= 0:
+                    break
+                # a little jitter so waiters do not all retake at the same instant
+                wait *= random.uniform(1.0, 1.2)
+                waited += wait
+                time.sleep(wait)
+        if waited:
+            REGISTRY.inc(_WAITS_METRIC, {"provider": self.name})
+            REGISTRY.inc(_WAIT_SECONDS_METRIC, {"provider": self.name}, round(waited, 3))
+            log.debug(f"[RateLimit] {self.name}: waited {waited:.2f}s for quota")
+
+    def call(self, fn: Callable, tokens: int = 0, used: Optional[Callable] = None):
+        """
+        Run fn() once quota and a concurrency slot are free and return its
+        result. `tokens` is the expected token cost; `used(result)` may
+        return the actual cost, and the difference is given back to (or
+        charged to) the token bucket. A call made from inside another
+        limited call on the same thread (e.g. an LLM retrying itself) runs
+        directly, as the outer call already holds the quota and slot.
+        """
+        if getattr(_active, "inside", False):
+            return fn()
+        attempt = 0
+        while True:
+            self._wait_for_quota(tokens)
+            self.concurrency.acquire()
+            started = time.monotonic()
+            _active.inside = True
+            try:
+                result = fn()
+            except Exception as e:
+                verdict = self.classify(e)
+                self.concurrency.release(time.monotonic() - started, verdict[0] if verdict else "error")
+                if verdict is None or attempt >= self.max_retries:
+                    raise
+                outcome, retry_after = verdict
+            else:
+                latency = time.monotonic() - started
+                actual = used(result) if used is not None and tokens else None
+                # LLM calls vary in length, so their latency is compared per 1k tokens
+                cost = actual or tokens
+                self.concurrency.release(latency * 1000 / cost if cost else latency, "ok")
+                if actual and self.tokens is not None and self.buckets is not None:
+                    self.buckets.adjust(self.tokens, tokens - actual)
+                return result
+            finally:
+                _active.inside = False
+
+            delay = backoff_delay(attempt, retry_after)
+            if outcome == "throttled":
+                for limit in self._limits():
+                    self.buckets.block(limit, retry_after or _BACKOFF_BASE_S)
+            REGISTRY.inc(_RETRIES_METRIC, {"provider": self.name, "reason": outcome})
+            log.warning(
+                f"[RateLimit] {self.name} {outcome} (attempt {attempt + 1}/{self.max_retries}), "
+                f"retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
+
+
+# --- error classification ---
+def _groq_verdict(error: BaseException) -> Optional[tuple]:
+    """LiteLLM exceptions: 429 → throttled; 5xx, timeouts, connection errors → transient."""
+    kind = type(error).__name__
+    status = getattr(error, "status_code", None)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if status == 429 or kind == "RateLimitError":
+        return "throttled", _retry_after(headers, str(error))
+    if (isinstance(status, int) and status >= 500) or kind in (
+        "Timeout", "APIConnectionError", "ServiceUnavailableError", "InternalServerError",
+    ):
+        return "transient", _retry_after(headers)
+    return None
+
+
+def _serper_verdict(error: BaseException) -> Optional[tuple]:
+    """requests exceptions: 429 → throttled; 5xx, timeouts, connection errors → transient."""
+    import requests
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status == 429:
+        return "throttled", _retry_after(response.headers)
+    if isinstance(status, int) and status >= 500:
+        return "transient", _retry_after(response.headers)
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return "transient", 0.0
+    return None
+
+
+# --- process-wide providers ---
+_providers: dict = {}
+_providers_lock = threading.Lock()
+_buckets: Optional[TokenBuckets] = None
+
+
+def _enabled() -> bool:
+    return os.getenv("RATE_LIMIT_ENABLED", "1").lower() not in ("0", "false", "no")
+
+
+def _shared_buckets() -> TokenBuckets:
+    global _buckets
+    if _buckets is None:
+        path = os.getenv("RATE_LIMIT_PATH") or cache_path("rate_limits.sqlite3")
+        _buckets = TokenBuckets(path)
+        log.info(f"[RateLimit] Shared quota buckets at {path}")
+    return _buckets
+
+
+def _build(name: str) -> Provider:
+    buckets = _shared_buckets()
+    retries = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+    if name == "groq":
+        return Provider(
+            name, buckets,
+            requests=_limit("groq.requests", float(os.getenv("GROQ_RPM", "30"))),
+            tokens=_limit("groq.tokens", float(os.getenv("GROQ_TPM", "30000"))),
+            concurrency=AdaptiveConcurrency(name, int(os.getenv("LLM_CONCURRENCY", "16"))),
+            classify=_groq_verdict,
+            max_retries=retries,
+        )
+    if name == "serper":
+        return Provider(
+            name, buckets,
+            requests=_limit("serper.requests", float(os.getenv("SERPER_QPS", "5")) * 60),
+            concurrency=AdaptiveConcurrency(name, int(os.getenv("SERPER_CONCURRENCY", "8"))),
+            classify=_serper_verdict,
+            max_retries=retries,
+        )
+    raise ValueError(f"Unknown provider '{name}'")
+
+
+def get_provider(name: str) -> Optional[Provider]:
+    """
+    The process-wide limiter for "groq" or "serper", built on first use,
+    or None when RATE_LIMIT_ENABLED=0.
+    """
+    if not _enabled():
+        return None
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = _build(name)
+        return _providers[name]
+
+
+def limited(name: str, fn: Callable, tokens: int = 0, used: Optional[Callable] = None):
+    """fn() through the named provider's limiter, or directly when limiting is off."""
+    provider = get_provider(name)
+    if provider is None:
+        return fn()
+    return provider.call(fn, tokens=tokens, used=used)
@@ -0,0 +1,124 @@
+"""
+research_store.py
+
+Reuses research_task output across plans. Research for a destination
+depends on where, when (month) and the traveller's preferences, not on the
+budget or exact dates, so it is keyed on
+(normalised destination, travel month, preferences hash) with a TTL.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.paths import cache_path
+
+log = get_logger(__name__)
+
+_DEFAULT_TTL_DAYS = 14
+
+
+def _normalise(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w ]+", " ", str(text).lower()).split())
+
+
+def research_key(inputs: dict) -> tuple:
+    """(destination, YYYY-MM, preferences hash) for an inputs dict."""
+    destination = _normalise(inputs.get("destination", ""))
+    month = str(inputs.get("start_date", ""))[:7]
+    preferences = _normalise(inputs.get("preferences") or "")
+    if preferences == "none":
+        preferences = ""
+    prefs_hash = hashlib.sha1(preferences.encode("utf-8")).hexdigest()[:12]
+    return destination, month, prefs_hash
+
+
+class ResearchStore:
+    """SQLite table of research texts with an expiry per row."""
+
+    def __init__(self, path: str, ttl_s: float):
+        self.path = path
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS research (
+                destination  TEXT NOT NULL,
+                month        TEXT NOT NULL,
+                prefs_hash   TEXT NOT NULL,
+                body         TEXT NOT NULL,
+                created_at   REAL NOT NULL,
+                expires_at   REAL NOT NULL,
+                PRIMARY KEY (destination, month, prefs_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, inputs: dict) -> Optional[str]:
+        """
+        Stored research for these inputs, or None if missing/expired. A
+        failing store (locked or corrupt file) counts as a miss.
+        """
+        key = research_key(inputs)
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT body, expires_at FROM research "
+                    "WHERE destination = ? AND month = ? AND prefs_hash = ?",
+                    key,
+                ).fetchone()
+        except sqlite3.Error as e:
+            log.warning(f"[ResearchStore] Lookup failed, researching instead: {e}")
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        log.info(f"[ResearchStore] Hit for {key[0]} ({key[1]})")
+        return row[0]
+
+    def put(self, inputs: dict, body: str) -> None:
+        """Store research for these inputs; a failing store is logged and skipped."""
+        key = research_key(inputs)
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO research "
+                    "(destination, month, prefs_hash, body, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, body, now, now + self.ttl_s),
+                )
+                self._conn.execute("DELETE FROM research WHERE expires_at <= ?", (now,))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                log.warning(f"[ResearchStore] Could not store research for {key[0]}: {e}")
+                return
+        log.info(f"[ResearchStore] Stored research for {key[0]} ({key[1]})")
+
+
+_store: Optional[ResearchStore] = None
+_store_lock = threading.Lock()
+
+
+def get_research_store() -> Optional[ResearchStore]:
+    """
+    Return the process-wide store, or None when disabled via
+    RESEARCH_STORE_ENABLED=0. TTL comes from RESEARCH_STORE_TTL_DAYS.
+    """
+    global _store
+    if os.getenv("RESEARCH_STORE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _store_lock:
+        if _store is None:
+            ttl_days = float(os.getenv("RESEARCH_STORE_TTL_DAYS", _DEFAULT_TTL_DAYS))
+            _store = ResearchStore(cache_path("research_store.sqlite3"), ttl_days * 86400)
+        return _store
@@ -0,0 +1,110 @@
+"""
+scheduler.py
+
+Turns the context=[...] dependencies declared in crew.py into execution
+waves so that independent tasks run concurrently.
+
+CrewAI's sequential process starts async tasks in the background and
+joins every pending one before the next sync task runs. We exploit that:
+tasks are ordered topologically, and each wave with more than one task is
+marked async so its members start together and are joined by the first
+task of the following wave.
+"""
+
+import os
+
+from travel_planner.logger import get_logger
+
+log = get_logger(__name__)
+
+
+def _dependencies(task, tasks: list) -> list:
+    """Context tasks that are part of this crew (NOT_SPECIFIED counts as none)."""
+    context = getattr(task, "context", None)
+    if not isinstance(context, list):
+        return []
+    return [t for t in context if any(t is other for other in tasks)]
+
+
+def _task_name(task) -> str:
+    return getattr(task, "name", None) or type(task).__name__
+
+
+def plan_waves(tasks: list) -> list:
+    """
+    Group tasks into waves: a task lands in the wave after the latest of
+    its dependencies. Within a wave the declaration order is kept.
+    """
+    levels: dict = {}
+
+    def level(task) -> int:
+        key = id(task)
+        if key not in levels:
+            levels[key] = -1  # cycle guard
+            deps = _dependencies(task, tasks)
+            levels[key] = 1 + max((level(d) for d in deps), default=-1)
+        elif levels[key] < 0:
+            raise ValueError(f"Task context cycle involving '{_task_name(task)}'")
+        return levels[key]
+
+    waves: list = []
+    for task in tasks:
+        lvl = level(task)
+        while len(waves) <= lvl:
+            waves.append([])
+        waves[lvl].append(task)
+    return waves
+
+
+def schedule_tasks(tasks: list) -> list:
+    """
+    Return the tasks in dependency order with async_execution set so each
+    wave runs concurrently. Set TRAVEL_PLANNER_PARALLEL=0 to keep the
+    declared order and run everything sequentially.
+
+    A wave that directly follows another parallel wave keeps its first
+    task sync so it can join the previous wave, and the crew always ends
+    on a sync task as CrewAI requires.
+    """
+    if os.getenv("TRAVEL_PLANNER_PARALLEL", "1").lower() in ("0", "false", "no"):
+        for task in tasks:
+            task.async_execution = False
+        return list(tasks)
+
+    waves = plan_waves(tasks)
+    ordered: list = []
+    previous_parallel = False
+
+    for wave in waves:
+        parallel = len(wave) > 1
+        for i, task in enumerate(wave):
+            task.async_execution = parallel and not (i == 0 and previous_parallel)
+            ordered.append(task)
+        previous_parallel = parallel and any(t.async_execution for t in wave)
+
+    if ordered:
+        ordered[-1].async_execution = False
+
+    log.info(
+        "[Scheduler] Waves: "
+        + " → ".join(
+            "[" + ", ".join(_task_name(t) for t in wave) + "]" for wave in waves
+        )
+    )
+    return ordered
+
+
+def downstream_of(tasks: list, names) -> set:
+    """Names of the given tasks plus every task that depends on them, transitively."""
+    selected = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for task in tasks:
+            name = _task_name(task)
+            if name in selected:
+                continue
+            if any(_task_name(dep) in selected for dep in _dependencies(task, tasks)):
+                selected.add(name)
+                changed = True
+    return selected
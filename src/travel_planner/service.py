@@ -0,0 +1,184 @@
+"""
+service.py
+
+HTTP planning service. Trip requests are queued and planned in the
+background; clients poll for the status and fetch the Markdown plan, or
+follow the sections as they are written.
+
+    POST /plans              → 202 {"job_id": ...}   (429 when the queue is full)
+    GET  /plans/{job_id}     → job status
+    GET  /plans/{job_id}/events → server-sent events, one per plan section
+    GET  /plans/{job_id}/plan → the finished Markdown plan
+    GET  /stored-plans       → stored plans by destination / start dates / budget
+    GET  /stored-plans/{plan_id} → a stored Markdown plan
+    GET  /health             → worker / queue info
+    GET  /metrics            → Prometheus metrics
+"""
+
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from travel_planner.batch import normalise_inputs
+from travel_planner.jobs import JobManager, QueueFullError
+from travel_planner.logger import get_logger
+from travel_planner.metrics import render_prometheus
+from travel_planner.plan_store import get_plan_store
+
+log = get_logger(__name__)
+
+
+class TripStop(BaseModel):
+    """One stop of a multi-city trip."""
+    city: str = Field(..., min_length=1)
+    nights: int = Field(..., gt=0)
+
+
+class TripRequest(BaseModel):
+    """Same fields as the interactive prompt / batch records."""
+    destination: Optional[str] = Field(None, description="Required unless stops are given")
+    start_date: str = Field(..., description="YYYY-MM-DD")
+    end_date: str = Field(..., description="YYYY-MM-DD")
+    budget_usd: float = Field(..., gt=0)
+    preferences: Optional[str] = None
+    num_days: Optional[int] = None
+    stops: Optional[List[TripStop]] = Field(
+        None, description="Multi-city trip: ordered stops whose nights add up to the trip"
+    )
+
+
+def create_app(workers: Optional[int] = None, queue_size: Optional[int] = None) -> FastAPI:
+    """
+    Build the FastAPI app. Worker count and queue size default to
+    TRAVEL_PLANNER_WORKERS (2) and TRAVEL_PLANNER_QUEUE_SIZE (16). With 0
+    workers the service only queues jobs, and `plan_workers` processes
+    sharing its job store plan them; a queue size of 0 means no limit.
+    """
+    manager = JobManager(
+        workers=workers if workers is not None else int(os.getenv("TRAVEL_PLANNER_WORKERS", "2")),
+        queue_size=queue_size if queue_size is not None else int(os.getenv("TRAVEL_PLANNER_QUEUE_SIZE", "16")),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        manager.start()
+        yield
+        manager.stop()
+
+    app = FastAPI(title="AI Travel Planner", lifespan=lifespan)
+    app.state.jobs = manager
+
+    @app.post("/plans", status_code=202)
+    def submit_plan(request: TripRequest) -> dict:
+        try:
+            inputs = normalise_inputs(request.model_dump(exclude_none=True))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        try:
+            job = manager.submit(inputs)
+        except QueueFullError as e:
+            raise HTTPException(
+                status_code=429, detail=str(e), headers={"Retry-After": "30"}
+            )
+        return {"job_id": job.job_id, "status": job.status}
+
+    @app.get("/plans/{job_id}")
+    def get_plan_status(job_id: str) -> dict:
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job id")
+        return job.to_dict()
+
+    @app.get("/plans/{job_id}/events")
+    def get_plan_events(job_id: str) -> StreamingResponse:
+        if manager.get(job_id) is None:
+            raise HTTPException(status_code=404, detail="Unknown job id")
+
+        def stream():
+            for section in manager.events(job_id):
+                if section is None:
+                    yield ": keepalive\n\n"
+                    continue
+                kind = section["name"] if section["name"] in ("done", "failed") else "section"
+                yield f"event: {kind}\ndata: {json.dumps(section)}\n\n"
+
+        return StreamingResponse(
+            stream(), media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.get("/plans/{job_id}/plan", response_class=PlainTextResponse)
+    def get_plan(job_id: str) -> PlainTextResponse:
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job id")
+        if job.status == "failed":
+            raise HTTPException(status_code=500, detail=job.error or "Planning failed")
+        if job.status != "done" or not job.output_path:
+            raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+        with open(job.output_path, encoding="utf-8") as f:
+            return PlainTextResponse(f.read(), media_type="text/markdown")
+
+    @app.get("/stored-plans")
+    def find_stored_plans(
+        destination: str = "",
+        start_from: str = "",
+        start_to: str = "",
+        budget_min: Optional[float] = None,
+        budget_max: Optional[float] = None,
+        limit: int = 20,
+    ) -> dict:
+        store = get_plan_store()
+        if store is None:
+            raise HTTPException(status_code=404, detail="The plan store is disabled")
+        plans = store.find(destination, start_from, start_to, budget_min, budget_max, min(limit, 200))
+        return {"plans": [p.to_dict() for p in plans]}
+
+    @app.get("/stored-plans/{plan_id}", response_class=PlainTextResponse)
+    def get_stored_plan(plan_id: str) -> PlainTextResponse:
+        store = get_plan_store()
+        markdown = store.markdown(plan_id) if store is not None else None
+        if markdown is None:
+            raise HTTPException(status_code=404, detail="Unknown plan id")
+        return PlainTextResponse(markdown, media_type="text/markdown")
+
+    @app.get("/health")
+    def health() -> dict:
+        return {
+            "status":      "ok",
+            "workers":     manager.workers,
+            "queue_depth": manager.queue_depth(),
+            "jobs":        manager.store.counts(),
+        }
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics() -> PlainTextResponse:
+        return PlainTextResponse(
+            render_prometheus(), media_type="text/plain; version=0.0.4"
+        )
+
+    return app
+
+
+def serve() -> None:
+    """Run the service with uvicorn (HOST / PORT env vars, default 0.0.0.0:8000)."""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to serve the API: pip install uvicorn")
+
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", "8000"))
+    log.info(f"[Service] Listening on {host}:{port}")
+    uvicorn.run(create_app(), host=host, port=port)
@@ -0,0 +1,103 @@
+"""
+single_flight.py
+
+Request coalescing. While a call for a key is in flight, identical calls
+join it instead of starting their own, and every caller gets the same
+result (or the same exception). Used for Serper queries and for whole
+plans, so a burst of identical requests costs one search or one crew run.
+
+The call can publish progress events (plan sections); each caller's
+on_event receives them all, including any published before it joined.
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.metrics import REGISTRY
+
+log = get_logger(__name__)
+
+_COALESCED_METRIC = "travel_planner_coalesced_total"
+
+
+class _Flight:
+    """One in-flight call: its outcome, its events so far and who is listening."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.events: list = []
+        self.listeners: list = []
+        self.lock = threading.Lock()
+
+    # delivery happens under the lock so every listener sees events in order
+    def subscribe(self, on_event: Callable) -> None:
+        """Replay the events so far to on_event and send it the rest."""
+        with self.lock:
+            for event in self.events:
+                _deliver(on_event, event)
+            self.listeners.append(on_event)
+
+    def publish(self, event) -> None:
+        with self.lock:
+            self.events.append(event)
+            for on_event in self.listeners:
+                _deliver(on_event, event)
+
+
+def _deliver(on_event: Callable, event) -> None:
+    # one caller's failing callback must not break the call or the others
+    try:
+        on_event(event)
+    except Exception as e:
+        log.warning(f"[SingleFlight] Event callback failed: {e}")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls by key; `name` labels logs and metrics."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable, on_event: Optional[Callable] = None) -> tuple:
+        """
+        Run fn(publish), or wait for the identical call already running.
+        Returns (result, shared) where shared is True for callers that
+        joined another's call; the leader's exception is raised in every
+        caller.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if on_event is not None:
+            flight.subscribe(on_event)
+
+        if not leader:
+            REGISTRY.inc(_COALESCED_METRIC, {"kind": self.name})
+            log.info(f"[SingleFlight] {self.name}: joined in-flight call {key[:16]}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn(flight.publish)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # later callers start a fresh call; joiners read the outcome
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
@@ -0,0 +1,83 @@
+"""
+streaming.py
+
+Token streaming. When an agent's LLM has stream=True, CrewAI emits an
+LLMStreamChunkEvent for every chunk Groq sends, synchronously on the
+thread making the call. The listener here routes each chunk, by task id,
+to the on_token callback of the run that owns the task, tagged with the
+task and agent that produced it.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+from travel_planner.logger import get_logger
+
+log = get_logger(__name__)
+
+
+@dataclass
+class TokenChunk:
+    """A piece of model output and the task / agent producing it."""
+    task: str
+    agent: str
+    text: str
+
+
+class PlanCancelled(Exception):
+    """Raised inside a run at the next task boundary after its caller cancelled it."""
+
+
+_sinks: dict = {}  # task id → on_token callback
+_sinks_lock = threading.Lock()
+_listener_installed = False
+
+
+def bind_stream(tasks: list, on_token: Callable[[TokenChunk], None]) -> None:
+    """Send the streamed tokens of these tasks to `on_token`."""
+    install_stream_listener()
+    with _sinks_lock:
+        for t in tasks:
+            _sinks[str(t.id)] = on_token
+
+
+def unbind_stream(tasks: list) -> None:
+    with _sinks_lock:
+        for t in tasks:
+            _sinks.pop(str(t.id), None)
+
+
+def install_stream_listener() -> None:
+    """Subscribe to LLM stream chunks once per process."""
+    global _listener_installed
+    with _sinks_lock:
+        if _listener_installed:
+            return
+        _listener_installed = True
+        try:
+            from crewai.events import LLMStreamChunkEvent, crewai_event_bus
+            from crewai.events.types.llm_events import LLMCallType
+        except ImportError as e:
+            log.warning(f"[Stream] CrewAI stream events unavailable, token streaming disabled: {e}")
+            return
+
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def _on_chunk(source, event):
+        # tool-call chunks are JSON arguments, not text for the reader
+        if not event.chunk or event.call_type == LLMCallType.TOOL_CALL:
+            return
+        with _sinks_lock:
+            on_token = _sinks.get(str(event.task_id)) if event.task_id else None
+        if on_token is None:
+            return
+        try:
+            on_token(TokenChunk(
+                task=event.task_name or "unknown",
+                agent=event.agent_role or "",
+                text=event.chunk,
+            ))
+        except Exception as e:
+            log.warning(f"[Stream] Token callback failed: {e}")
+
+    log.info("[Stream] CrewAI stream listener installed.")
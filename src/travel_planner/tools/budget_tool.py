@@ -0,0 +1,121 @@
+from typing import List, Optional, Type, Union
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from travel_planner.logger import get_logger
+from travel_planner.tools.calculator_tool import calculate_budget_scenarios
+
+log = get_logger(__name__)
+
+
+class BudgetCalculatorInput(BaseModel):
+    """Input schema for BudgetCalculatorTool."""
+    accommodation_per_night: Union[float, List[float]] = Field(
+        ..., description="Nightly accommodation rate in USD, or a list of rates to compare hotel tiers."
+    )
+    food_per_day: float = Field(..., description="Food cost per day in USD.")
+    transport_total: float = Field(..., description="Total local transport cost for the trip in USD.")
+    activities_total: float = Field(..., description="Total activities / entry fees for the trip in USD.")
+    num_days: Union[int, List[int]] = Field(
+        ..., description="Trip length in days, or a list of lengths to compare. "
+                         "Each day is one night of accommodation."
+    )
+    budget_usd: float = Field(0.0, description="The traveller's total budget in USD.")
+    nights_per_stop: List[int] = Field(
+        default_factory=list,
+        description="Multi-city trips only: nights at each stop, in the same order as one "
+                    "accommodation_per_night rate per stop. The stays are then combined into "
+                    "one accommodation line instead of compared as scenarios.",
+    )
+
+
+def _budget_table(s: dict, budget_usd: float) -> str:
+    """The Budget Breakdown table from tasks.yaml, filled in for one scenario."""
+    days = s["num_days"]
+    food_per_day = round(s["food"] / days, 2) if days else 0.0
+    lines = [
+        "| Category      | Amount per unit | Units | Total |",
+        "|---------------|-----------------|-------|-------|",
+        f"| Accommodation | ${s['accommodation_per_night']:,.2f} per night | {days} nights | ${s['accommodation']:,.2f} |",
+        f"| Food          | ${food_per_day:,.2f} per day | {days} days | ${s['food']:,.2f} |",
+        f"| Transport     |                 |          | ${s['transport']:,.2f} |",
+        f"| Activities    |                 |          | ${s['activities']:,.2f} |",
+        f"| **Total**     |                 |          | ${s['total']:,.2f} |",
+    ]
+    if budget_usd:
+        status = "Within Budget ✅" if s["within_budget"] else "Over Budget ⚠️"
+        lines += [
+            "",
+            f"**Budget Status:** {status} (Budget: ${budget_usd:,.2f}, Spent: ${s['total']:,.2f})",
+        ]
+    return "\n".join(lines)
+
+
+class BudgetCalculatorTool(BaseTool):
+    """
+    Deterministic budget arithmetic for the Budget Planner, so totals are
+    computed in code rather than by the LLM.
+    """
+
+    name: str = "budget_calculator"
+    description: str = (
+        "Compute exact trip budget totals. Give the nightly rate(s), food per day, "
+        "transport total, activities total, trip length(s) in days and the budget. "
+        "Returns the finished Budget Breakdown table for the first rate and length, "
+        "plus a comparison of every rate × length scenario when several are given. "
+        "For a multi-city trip give one rate per stop and nights_per_stop. "
+        "Call it once instead of doing any arithmetic yourself."
+    )
+    args_schema: Type[BaseModel] = BudgetCalculatorInput
+
+    def _run(
+        self,
+        accommodation_per_night: Union[float, List[float]],
+        food_per_day: float,
+        transport_total: float,
+        activities_total: float,
+        num_days: Union[int, List[int]],
+        budget_usd: float = 0.0,
+        nights_per_stop: Optional[List[int]] = None,
+    ) -> str:
+        log.info("[BudgetCalculatorTool] Computing budget scenarios")
+        rates = accommodation_per_night if isinstance(accommodation_per_night, list) else [accommodation_per_night]
+        lengths = num_days if isinstance(num_days, list) else [num_days]
+        if not rates or not lengths:
+            return "ERROR: accommodation_per_night and num_days must not be empty."
+
+        if nights_per_stop:
+            if len(nights_per_stop) != len(rates):
+                return "ERROR: give one accommodation_per_night rate for each entry of nights_per_stop."
+            # one stay across the stops: the nights-weighted nightly rate
+            nights = sum(int(n) for n in nights_per_stop)
+            stays = sum(float(r) * int(n) for r, n in zip(rates, nights_per_stop))
+            rates = [round(stays / nights, 2) if nights else 0.0]
+            lengths = [nights]
+
+        scenarios = calculate_budget_scenarios(
+            rates, food_per_day, transport_total, activities_total, lengths, budget_usd
+        )
+        failed = [s for s in scenarios if "error" in s]
+        if failed:
+            return f"ERROR: Budget calculation failed: {failed[0]['error']}"
+
+        # the plan file adds the section heading; the tool returns only the body
+        output = _budget_table(scenarios[0], budget_usd)
+
+        if len(scenarios) > 1:
+            rows = [
+                "| Rate / night | Days | Total | Status |",
+                "|--------------|------|-------|--------|",
+            ]
+            for s in scenarios:
+                status = ""
+                if budget_usd:
+                    status = "Within" if s["within_budget"] else f"Over by ${-s['remaining']:,.2f}"
+                rows.append(
+                    f"| ${s['accommodation_per_night']:,.2f} | {s['num_days']} | ${s['total']:,.2f} | {status} |"
+                )
+            output += "\n\n### Scenarios\n\n" + "\n".join(rows)
+
+        return output
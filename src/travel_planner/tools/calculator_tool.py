@@ -3,6 +3,8 @@ Budget Planner agent will use this to compute category totals and verify
 the grand total against the traveller's given budget.
 """
 
+from itertools import product
+
 from travel_planner.logger import get_logger
 
 log = get_logger(__name__)
@@ -49,4 +51,40 @@ def calculate_budget(
             "activities":    0.0,
             "total":         0.0,
             "error":         str(e),
-        }
\ No newline at end of file
+        }
+
+
+def calculate_budget_scenarios(
+    accommodation_options: list,
+    food_per_day: float,
+    transport_total: float,
+    activities_total: float,
+    trip_lengths: list,
+    budget_usd: float = 0.0,
+) -> list:
+    """
+    Batch form of calculate_budget: one breakdown per (nightly rate ×
+    trip length) combination, e.g. three hotel tiers × two trip lengths.
+    A trip of N days (end date − start date) has N nights.
+    """
+    scenarios = []
+    for rate, days in product(accommodation_options, trip_lengths):
+        breakdown = calculate_budget(
+            accommodation_per_night=float(rate),
+            food_per_day=float(food_per_day),
+            transport_total=float(transport_total),
+            activities_total=float(activities_total),
+            num_nights=int(days),
+            num_days=int(days),
+        )
+        breakdown.update({
+            "accommodation_per_night": float(rate),
+            "num_days":                int(days),
+        })
+        if budget_usd:
+            breakdown["within_budget"] = breakdown["total"] <= budget_usd
+            breakdown["remaining"]     = round(budget_usd - breakdown["total"], 2)
+        scenarios.append(breakdown)
+
+    log.info(f"[Calculator] Computed {len(scenarios)} scenario(s)")
+    return scenarios
@@ -0,0 +1,256 @@
+"""
+Compact, token-budgeted rendering of Serper results for the agents.
+
+Every web_search call ends up in the calling agent's prompt for all of
+its later turns, so results are trimmed before they get there:
+
+- a page the same task already got from an earlier search (same URL, or
+  a near-identical snippet) is left out. Other tasks never saw it in
+  their own prompts, so they still get it;
+- snippets are cut to their first sentences and links to the site name,
+  which is all the tasks cite;
+- price figures are pulled out of each snippet into a "Prices:" line;
+- the whole call is held to SERPER_RESULT_TOKEN_BUDGET tokens. Every query
+  gets its top results first; when the budget runs short, lower-ranked
+  results keep only their title and prices, then are dropped.
+"""
+
+import os
+import re
+import threading
+import weakref
+from typing import Optional
+from urllib.parse import urlsplit
+
+from travel_planner.compaction import estimate_tokens
+from travel_planner.logger import get_logger
+from travel_planner.metrics import REGISTRY, current_run, current_task
+
+log = get_logger(__name__)
+
+_DEFAULT_TOKEN_BUDGET = 800
+
+_RESULTS_METRIC = "travel_planner_search_results_total"
+
+_SNIPPET_CHARS = 220
+_MAX_PRICES = 4
+
+# word-set overlap at which two snippets count as the same text
+_NEAR_DUPLICATE = 0.8
+
+# "Mar 3, 2024 — " / "2 days ago ... " prefixes Google puts on snippets
+_DATE_PREFIX = re.compile(
+    r"^(?:\w{3} \d{1,2}, \d{4}|\d{1,2} \w{3} \d{4}|\d+ \w+ ago)\s*(?:[—–-]|\.\.\.|·)\s*"
+)
+
+_PRICE = re.compile(
+    r"(?:(?:US|C|A|NZ)?\$|€|£|¥|₹|\b(?:USD|EUR|GBP|JPY|INR)\s?)\s?\d[\d,]*(?:\.\d+)?"
+    r"(?:\s?(?:[-–]|to)\s?(?:\$|€|£|¥|₹)?\s?\d[\d,]*(?:\.\d+)?)?"
+    r"|\b\d[\d,]*(?:\.\d+)?\s?(?:USD|EUR|GBP|JPY|INR|dollars|euros|pounds)\b",
+    re.IGNORECASE,
+)
+_PRICE_UNIT = re.compile(
+    r"\s*(?:per|a|an|/)\s*(night|day|person|pp|adult|child|ticket|ride|trip|week|month|hour|meal)\b",
+    re.IGNORECASE,
+)
+
+_TRACKING_PARAM = re.compile(r"^(?:utm_\w+|gclid|fbclid|ref)=", re.IGNORECASE)
+
+
+def token_budget() -> int:
+    """Per-call budget from SERPER_RESULT_TOKEN_BUDGET; 0 means unlimited."""
+    try:
+        return max(0, int(os.getenv("SERPER_RESULT_TOKEN_BUDGET", _DEFAULT_TOKEN_BUDGET)))
+    except ValueError:
+        log.warning("[ResultDigest] SERPER_RESULT_TOKEN_BUDGET is not a number; using the default")
+        return _DEFAULT_TOKEN_BUDGET
+
+
+def normalize_url(url: str) -> str:
+    """Host (without www.) + path + query without tracking parameters."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = "&".join(p for p in parts.query.split("&") if p and not _TRACKING_PARAM.match(p))
+    return host + parts.path.rstrip("/") + (f"?{query}" if query else "")
+
+
+def site_name(url: str) -> str:
+    return urlsplit(url.strip()).netloc.lower().removeprefix("www.")
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(re.findall(r"[a-z0-9$€£]+", text.lower()))
+
+
+def trim_snippet(snippet: str, limit: int = _SNIPPET_CHARS) -> str:
+    """Drop the date prefix and cut to whole sentences within `limit` characters."""
+    text = _DATE_PREFIX.sub("", " ".join(snippet.split()))
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if end >= limit // 2:
+        return cut[: end + 1]
+    return cut.rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+def extract_prices(text: str) -> list:
+    """Price figures in `text`, with their unit when one follows ("$120 per night")."""
+    prices = []
+    for match in _PRICE.finditer(text):
+        figure = " ".join(match.group(0).split())
+        unit = _PRICE_UNIT.match(text, match.end())
+        if unit:
+            figure += f"/{unit.group(1).lower()}"
+        if figure not in prices:
+            prices.append(figure)
+        if len(prices) == _MAX_PRICES:
+            break
+    return prices
+
+
+class SeenResults:
+    """URLs and snippets already shown to one task."""
+
+    def __init__(self):
+        self._urls: set = set()
+        self._snippets: list = []
+        self._lock = threading.Lock()
+
+    def is_repeat(self, url_key: str, words: frozenset) -> bool:
+        with self._lock:
+            if url_key and url_key in self._urls:
+                return True
+            return bool(words) and any(
+                len(words & seen) / len(words | seen) >= _NEAR_DUPLICATE for seen in self._snippets
+            )
+
+    def add(self, url_key: str, words: frozenset) -> None:
+        with self._lock:
+            if url_key:
+                self._urls.add(url_key)
+            if words:
+                self._snippets.append(words)
+
+
+_runs: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()  # run → {task id: SeenResults}
+_runs_lock = threading.Lock()
+
+
+def seen_by_task() -> SeenResults:
+    """
+    The SeenResults of the task searching in this context, kept for its
+    run; outside a task, a fresh one (dedup within the call only).
+    """
+    run, task_id = current_run(), current_task()
+    if run is None or task_id is None:
+        return SeenResults()
+    with _runs_lock:
+        tasks = _runs.setdefault(run, {})
+        seen = tasks.get(task_id)
+        if seen is None:
+            seen = tasks[task_id] = SeenResults()
+        return seen
+
+
+class _Entry:
+    """One result, renderable in full or as a title + prices line."""
+
+    def __init__(self, number: int, item: dict):
+        self.number = number
+        self.title = " ".join(str(item.get("title") or "No Title").split())
+        link = str(item.get("link") or "")
+        self.url_key = normalize_url(link) if link else ""
+        self.site = site_name(link) if link else "unknown source"
+        raw = str(item.get("snippet") or "")
+        self.words = _words(raw)
+        self.snippet = trim_snippet(raw) or "No description."
+        self.prices = extract_prices(raw)
+        self.full = False
+        self.shown = False
+
+    def render(self) -> str:
+        head = f"{self.number}. {self.title} [{self.site}]"
+        prices = f"   Prices: {', '.join(self.prices)}" if self.prices else ""
+        if not self.full:
+            return head + (f"\n{prices}" if prices else "")
+        return "\n".join(filter(None, (head, f"   {self.snippet}", prices)))
+
+
+def digest(outcomes: list, seen: Optional[SeenResults] = None, budget: Optional[int] = None) -> str:
+    """
+    Render (query, results) pairs for the agent, where results is the
+    organic list or an already formatted message (error, no results).
+    Query headings are added when there is more than one query.
+    """
+    seen = seen or SeenResults()
+    budget = token_budget() if budget is None else budget
+
+    groups = []  # (query, entries or message, repeats)
+    in_call = SeenResults()  # results repeated between this call's queries
+    for query, results in outcomes:
+        if isinstance(results, str):
+            groups.append((query, results, 0))
+            continue
+        entries, repeats = [], 0
+        for item in results:
+            entry = _Entry(len(entries) + 1, item)
+            if in_call.is_repeat(entry.url_key, entry.words) or seen.is_repeat(entry.url_key, entry.words):
+                repeats += 1
+                continue
+            in_call.add(entry.url_key, entry.words)
+            entries.append(entry)
+        groups.append((query, entries, repeats))
+
+    # breadth first: every query's top results, compact, then upgrade to full
+    ranked = sorted(
+        (e for _, entries, _ in groups if not isinstance(entries, str) for e in entries),
+        key=lambda e: e.number,
+    )
+    used = sum(estimate_tokens(f"### Results for: {q}") for q, _, _ in groups) if len(groups) > 1 else 0
+    used += sum(estimate_tokens(g[1]) for g in groups if isinstance(g[1], str))
+    for entry in ranked:
+        cost = estimate_tokens(entry.render())
+        if budget and used + cost > budget and entry is not ranked[0]:
+            break
+        entry.shown = True
+        used += cost
+    for entry in ranked:
+        if not entry.shown:
+            break
+        compact = estimate_tokens(entry.render())
+        entry.full = True
+        extra = estimate_tokens(entry.render()) - compact
+        if budget and used + extra > budget:
+            entry.full = False
+            break
+        used += extra
+
+    blocks = []
+    for query, entries, repeats in groups:
+        if isinstance(entries, str):
+            text = entries
+        else:
+            lines = [e.render() for e in entries if e.shown]
+            for e in entries:
+                if e.shown:
+                    seen.add(e.url_key, e.words)
+            omitted = len(entries) - len(lines)
+            _count("shown", len(lines))
+            _count("repeat", repeats)
+            _count("over_budget", omitted)
+            notes = []
+            if repeats:
+                notes.append(f"{repeats} result(s) already returned by an earlier search")
+            if omitted:
+                notes.append(f"{omitted} lower-ranked result(s) over the size limit")
+            if notes:
+                lines.append(f"({'; '.join(notes)} left out)")
+            text = "\n\n".join(lines) if lines else "No results found for this query."
+        blocks.append(f"### Results for: {query}\n\n{text}" if len(groups) > 1 else text)
+    return "\n\n".join(blocks)
+
+
+def _count(outcome: str, n: int) -> None:
+    if n:
+        REGISTRY.inc(_RESULTS_METRIC, {"outcome": outcome}, n)
@@ -0,0 +1,208 @@
+"""
+SQLite-backed cache for Serper search results.
+
+Entries are keyed on the normalised query text and expire according to
+the query's class (prices go stale quickly, attractions and culture do
+not). The table is bounded by SERPER_CACHE_MAX_ENTRIES and evicts the
+least recently used rows first.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from travel_planner.logger import get_logger
+from travel_planner.paths import cache_path
+
+log = get_logger(__name__)
+
+
+# Default TTL in seconds for each query class
+_DEFAULT_TTLS = {
+    "price":   6 * 3600,
+    "weather": 12 * 3600,
+    "visa":    7 * 86400,
+    "culture": 30 * 86400,
+    "default": 3 * 86400,
+}
+
+# First matching class wins, so "hotel prices" is a price query
+_CLASS_KEYWORDS = (
+    ("price",   ("price", "cost", "fee", "fare", "rate", "cheap", "budget",
+                 "hotel", "hostel", "accommodation", "ticket", "pass")),
+    ("weather", ("weather", "forecast", "temperature", "rain", "climate")),
+    ("visa",    ("visa", "entry requirement", "passport", "customs")),
+    ("culture", ("attraction", "culture", "cuisine", "food", "museum",
+                 "things to do", "sights", "history", "neighbourhood",
+                 "neighborhood", "area", "district", "tips")),
+)
+
+_FILLER_WORDS = {"a", "an", "the", "in", "for", "of", "at", "on", "and"}
+
+_DEFAULT_MAX_ENTRIES = 5000
+
+# Recency is only rewritten when older than this, so hot hits stay read-only
+_TOUCH_INTERVAL_S = 60
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase, strip punctuation and filler words, and collapse whitespace
+    so that "Hotel prices in Lisbon?" and "hotel prices lisbon" share a key.
+    """
+    text = re.sub(r"[^\w$€£ ]+", " ", query.lower())
+    words = [w for w in text.split() if w not in _FILLER_WORDS]
+    return " ".join(words)
+
+
+def classify_query(normalized: str) -> str:
+    """Return the TTL class for an already-normalised query."""
+    for query_class, keywords in _CLASS_KEYWORDS:
+        if any(re.search(rf"\b{re.escape(k)}(?:s|es)?\b", normalized) for k in keywords):
+            return query_class
+    return "default"
+
+
+def _load_ttls() -> dict:
+    """
+    Default TTLs, overridden by SERPER_CACHE_TTL, e.g.
+    "price=3600,culture=2592000".
+    """
+    ttls = dict(_DEFAULT_TTLS)
+    raw = os.getenv("SERPER_CACHE_TTL", "")
+    for item in filter(None, (p.strip() for p in raw.split(","))):
+        try:
+            name, seconds = item.split("=", 1)
+            ttls[name.strip()] = int(seconds)
+        except ValueError:
+            log.warning(f"[SearchCache] Ignoring malformed TTL entry: '{item}'")
+    return ttls
+
+
+class SearchCache:
+    """
+    Persistent query → organic-results cache with per-class TTLs,
+    LRU eviction and hit/miss counters.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+        ttls: Optional[dict] = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = ttls or dict(_DEFAULT_TTLS)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key          TEXT PRIMARY KEY,
+                query_class  TEXT NOT NULL,
+                payload      TEXT NOT NULL,
+                created_at   REAL NOT NULL,
+                expires_at   REAL NOT NULL,
+                last_access  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_access "
+            "ON search_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, query: str) -> Optional[list]:
+        """Return cached results for the query, or None on a miss/expiry."""
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at, last_access FROM search_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            if now - row[2] > _TOUCH_INTERVAL_S:
+                self._conn.execute(
+                    "UPDATE search_cache SET last_access = ? WHERE key = ?",
+                    (now, key),
+                )
+                self._conn.commit()
+            self.hits += 1
+        log.debug(f"[SearchCache] Hit: '{key}'")
+        return json.loads(row[0])
+
+    def put(self, query: str, results: list) -> None:
+        """Store results for the query and evict LRU rows over the size bound."""
+        key = normalize_query(query)
+        query_class = classify_query(key)
+        ttl = self.ttls.get(query_class, self.ttls["default"])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache "
+                "(key, query_class, payload, created_at, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query_class, json.dumps(results), now, now + ttl, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM search_cache WHERE key IN ("
+                    "SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+        log.debug(f"[SearchCache] Stored '{key}' as {query_class} (ttl={ttl}s)")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus the current table size."""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "evictions": self.evictions,
+            "entries":   size,
+            "hit_rate":  round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Return the process-wide search cache, or None when disabled via
+    SERPER_CACHE_ENABLED=0. The database is opened on first use.
+    """
+    global _cache
+    if os.getenv("SERPER_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            path = os.getenv("SERPER_CACHE_PATH") or cache_path("serper_cache.sqlite3")
+            max_entries = int(os.getenv("SERPER_CACHE_MAX_ENTRIES", _DEFAULT_MAX_ENTRIES))
+            _cache = SearchCache(path, max_entries=max_entries, ttls=_load_ttls())
+            log.info(f"[SearchCache] Opened {path} (max {max_entries} entries)")
+        return _cache
@@ -0,0 +1,153 @@
+"""
+Shared HTTP client for the Serper Dev API.
+
+One keep-alive connection pool and one worker pool are shared by every
+SerperSearchTool in the process, so repeated searches reuse TLS
+connections and multi-query tool calls fan out in parallel. Requests go
+through the shared Serper limiter (rate_limit.py), which keeps them within
+SERPER_QPS across processes and retries 429s with jittered backoff.
+Identical queries in flight at the same time share one request. With
+LLM_CACHE=record / replay, searches are recorded and replayed alongside
+the LLM responses (llm_cache.py).
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from travel_planner.llm_cache import cache_mode, search_key, through_cache
+from travel_planner.logger import get_logger
+from travel_planner.metrics import span
+from travel_planner.rate_limit import limited
+from travel_planner.single_flight import SingleFlight
+from travel_planner.tools.search_cache import get_search_cache, normalize_query
+
+log = get_logger(__name__)
+
+_SERPER_URL = "https://google.serper.dev/search"
+
+# concurrent searches for the same (normalised) query, across all clients
+_searches = SingleFlight("serper")
+
+
+class SerperClient:
+    """
+    Pooled Serper client. search() returns the organic result list and
+    raises requests exceptions; callers decide how to surface errors.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        pool_size: int = 8,
+        max_workers: int = 4,
+        timeout: float = 15,
+        url: str = _SERPER_URL,
+    ):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.url = url
+        self._session = requests.Session()
+        self._session.headers.update({
+            "X-API-KEY": api_key,
+            "Content-Type": "application/json",
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="serper"
+        )
+
+    def search(self, query: str) -> list:
+        """
+        Return organic results for one query, served from cache when fresh
+        or from an identical search already in flight.
+        """
+        with span("serper", "search", query=query, cache_hit=False) as attrs:
+            cache = get_search_cache()
+            if cache is not None:
+                try:
+                    cached = cache.get(query)
+                except Exception as e:
+                    log.warning(f"[SerperClient] Cache lookup failed, searching instead: {e}")
+                    cached = None
+                if cached is not None:
+                    log.info(f"[SerperClient] Cache hit for: '{query}'")
+                    attrs["cache_hit"] = True
+                    return cached
+
+            def fetch(_publish) -> list:
+                post = lambda: limited("serper", lambda: self._post(query))  # noqa: E731
+                if cache_mode() in ("record", "replay"):
+                    results, attrs["cache_hit"] = through_cache(
+                        search_key(normalize_query(query)), "serper", post
+                    )
+                else:
+                    results = post()
+                # an empty result list is not cached, so the next search tries again
+                if cache is not None and results:
+                    try:
+                        cache.put(query, results)
+                    except Exception as e:
+                        log.warning(f"[SerperClient] Could not cache results for '{query}': {e}")
+                return results
+
+            results, shared = _searches.do(normalize_query(query), fetch)
+            attrs["shared"] = shared
+            return results
+
+    def _post(self, query: str) -> list:
+        response = self._session.post(
+            self.url, json={"q": query, "num": 5}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json().get("organic", [])
+
+    def search_many(self, queries: list) -> list:
+        """
+        Run several queries concurrently. Returns (query, results) pairs in
+        input order, where results is an exception if that query failed.
+        """
+        # each worker runs in a copy of the caller's context so its spans
+        # are attributed to the caller's run
+        futures = [
+            (q, self._executor.submit(contextvars.copy_context().run, self.search, q))
+            for q in queries
+        ]
+        pairs = []
+        for query, future in futures:
+            try:
+                pairs.append((query, future.result()))
+            except Exception as e:
+                pairs.append((query, e))
+        return pairs
+
+
+_clients: dict = {}  # api key → SerperClient
+_client_lock = threading.Lock()
+
+
+def get_serper_client(api_key: str) -> SerperClient:
+    """
+    Return the process-wide client for this API key, building it on first
+    use. Each key keeps its own client, so tools using different keys
+    neither rebuild nor orphan each other's pools.
+    Pool sizes come from SERPER_POOL_SIZE and SERPER_MAX_WORKERS;
+    SERPER_BASE_URL points it at another endpoint (e.g. a local fake).
+    """
+    with _client_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = SerperClient(
+                api_key,
+                pool_size=int(os.getenv("SERPER_POOL_SIZE", "8")),
+                max_workers=int(os.getenv("SERPER_MAX_WORKERS", "4")),
+                url=os.getenv("SERPER_BASE_URL") or _SERPER_URL,
+            )
+            log.info("[SerperClient] Connection pool initialised.")
+        return client
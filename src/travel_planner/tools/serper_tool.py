@@ -1,25 +1,36 @@
 import os
+import re
 import requests
 from crewai.tools import BaseTool
 from pydantic import Field
 
 from travel_planner.logger import get_logger
+from travel_planner.tools.result_digest import digest, seen_by_task
+from travel_planner.tools.serper_client import get_serper_client
 
 log = get_logger(__name__)
 
 
+def _split_queries(query: str) -> list:
+    """Split "a; b; c" (or one query per line) into individual queries."""
+    return [q.strip() for q in re.split(r"[;\n]", query) if q.strip()]
+
+
 class SerperSearchTool(BaseTool):
     """
     Searches the web via Serper Dev API (https://serper.dev).
-    Input: a plain-text search query string.
-    Output: top 5 organic results as formatted text.
+    Input: a plain-text search query string, or several separated by ';'.
+    Output: top 5 organic results per query as compact text, without pages
+    already returned earlier in the run and within a token budget
+    (see result_digest.py).
     """
 
     name: str = "web_search"
     description: str = (
         "Search the web for up-to-date travel information such as attractions, "
         "hotel prices, transport costs, visa requirements, and local tips. "
-        "Input must be a clear search query string."
+        "Input must be a clear search query string. To look up several things "
+        "at once, separate the queries with ';' and they will run in parallel."
     )
 
     api_key: str = Field(default="")
@@ -39,52 +50,50 @@ class SerperSearchTool(BaseTool):
         if not self.api_key:
             msg = "ERROR: SERPER_API_KEY is missing. Cannot perform web search."
             log.error(msg)
-            return msg  
-
-        url = "https://google.serper.dev/search"
-        headers = {
-            "X-API-KEY": self.api_key,
-            "Content-Type": "application/json",
-        }
-        payload = {"q": query, "num": 5}
+            return msg
 
+        queries = _split_queries(query) or [query.strip()]
+        client = get_serper_client(self.api_key)
+        if len(queries) == 1:
+            outcomes = [(queries[0], self._search_one(client, queries[0]))]
+        else:
+            log.info(f"[SerperSearchTool] Running {len(queries)} queries concurrently")
+            outcomes = client.search_many(queries)
+
+        output = digest([(q, self._outcome(q, results)) for q, results in outcomes], seen_by_task())
+        # the text itself is in the run's LLM messages; a size line is enough here
+        log.debug(f"[SerperSearchTool] {len(outcomes)} query(ies) → {len(output):,} chars of results")
+        return output
+
+    @staticmethod
+    def _search_one(client, query: str):
+        """Results of a single query, or the exception it raised."""
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=15)
-            response.raise_for_status()
-            results = response.json().get("organic", [])
-
-            if not results:
-                log.warning(f"[SerperSearchTool] No results for: '{query}'")
-                return "No results found for this query."
-
-            lines = []
-            for i, item in enumerate(results, start=1):
-                lines.append(
-                    f"{i}. {item.get('title', 'No Title')}\n"
-                    f"   {item.get('snippet', 'No description.')}\n"
-                    f"   Source: {item.get('link', '')}"
-                )
-
-            output = "\n\n".join(lines)
-            log.debug(f"[SerperSearchTool] Results:\n{output}")
-            return output
-
-        except requests.exceptions.Timeout:
+            return client.search(query)
+        except Exception as e:
+            return e
+
+    def _outcome(self, query: str, results):
+        """The organic list, or the message the agent sees instead of it."""
+        if isinstance(results, Exception):
+            return self._error_message(query, results)
+        if not results:
+            log.warning(f"[SerperSearchTool] No results for: '{query}'")
+            return "No results found for this query."
+        return results
+
+    @staticmethod
+    def _error_message(query: str, error: Exception) -> str:
+        if isinstance(error, requests.exceptions.Timeout):
             msg = f"ERROR: Serper API request timed out for query: '{query}'"
             log.error(msg)
-            return msg
-
-        except requests.exceptions.HTTPError as e:
-            msg = f"ERROR: Serper API HTTP error: {e}"
+        elif isinstance(error, requests.exceptions.HTTPError):
+            msg = f"ERROR: Serper API HTTP error: {error}"
             log.error(msg)
-            return msg
-
-        except requests.exceptions.RequestException as e:
-            msg = f"ERROR: Serper API request failed: {e}"
+        elif isinstance(error, requests.exceptions.RequestException):
+            msg = f"ERROR: Serper API request failed: {error}"
             log.error(msg)
-            return msg
-
-        except Exception as e:
-            msg = f"ERROR: Unexpected error in web_search: {e}"
-            log.exception(msg)
-            return msg
\ No newline at end of file
+        else:
+            msg = f"ERROR: Unexpected error in web_search: {error}"
+            log.error(msg, exc_info=error)
+        return msg
@@ -0,0 +1,188 @@
+"""
+validation.py
+
+Code-side checks run on the budget and itinerary texts before the
+validation agent. They parse the Markdown budget table and the
+"Estimated Daily Spend: $XX" lines that tasks.yaml asks for, check the
+arithmetic, budget alignment and day coverage, and produce a compact
+findings summary. A plan that passes every check can skip the LLM
+validator entirely.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from travel_planner.logger import get_logger
+
+log = get_logger(__name__)
+
+_AMOUNT = r"\$\s*([\d,]+(?:\.\d+)?)"
+_DAY_HEADING = re.compile(r"^[^\w\n]*Day\s+(\d+)\b[^\n]*", re.IGNORECASE | re.MULTILINE)
+_DAILY_SPEND = re.compile(r"Estimated\s+Daily\s+Spend\W*" + _AMOUNT, re.IGNORECASE)
+_CATEGORIES = ("accommodation", "food", "transport", "activities", "total")
+
+# Itinerary spend may differ from the budget's non-accommodation costs by this much
+_SPEND_TOLERANCE = 0.25
+
+
+def _to_float(raw: str) -> float:
+    return float(raw.replace(",", ""))
+
+
+def parse_budget_table(text: str) -> dict:
+    """
+    Category → total from the Budget Breakdown table (the last dollar
+    amount in each row), plus "budget" / "spent" from the status line.
+    """
+    figures = {}
+    for line in text.splitlines():
+        if not line.strip().startswith("|"):
+            continue
+        cells = [c.strip(" *") for c in line.strip().strip("|").split("|")]
+        category = cells[0].lower() if cells else ""
+        name = next((c for c in _CATEGORIES if category.startswith(c)), None)
+        amounts = re.findall(_AMOUNT, line)
+        if name and amounts and name not in figures:
+            figures[name] = _to_float(amounts[-1])
+
+    status = re.search(r"Budget:\s*" + _AMOUNT + r".*?Spent:\s*" + _AMOUNT, text, re.IGNORECASE)
+    if status:
+        figures["budget"] = _to_float(status.group(1))
+        figures["spent"] = _to_float(status.group(2))
+    return figures
+
+
+def parse_itinerary(text: str) -> dict:
+    """
+    Day number → {"title", "spend", "segments"} from "**Day N — Title**"
+    headings and the Morning / Afternoon / Evening / Estimated Daily Spend
+    lines under each.
+    """
+    days = {}
+    headings = list(_DAY_HEADING.finditer(text))
+    for i, match in enumerate(headings):
+        number = int(match.group(1))
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        body = text[match.end():end]
+        spend = _DAILY_SPEND.search(body)
+        days[number] = {
+            "title":    match.group(0).strip(" *#-"),
+            "spend":    _to_float(spend.group(1)) if spend else None,
+            "segments": [s for s in ("morning", "afternoon", "evening") if s in body.lower()],
+        }
+    return days
+
+
+@dataclass
+class Finding:
+    check: str
+    status: str  # PASS / WARN / FAIL
+    notes: str
+
+
+@dataclass
+class PrecheckReport:
+    findings: list = field(default_factory=list)
+    day_titles: list = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return bool(self.findings) and all(f.status == "PASS" for f in self.findings)
+
+    def summary(self) -> str:
+        """Compact findings text handed to the validation agent."""
+        lines = [f"- {f.check}: {f.status} — {f.notes}" for f in self.findings]
+        if self.day_titles:
+            lines.append("- Day outline: " + "; ".join(self.day_titles))
+        return "\n".join(lines)
+
+    def to_markdown(self) -> str:
+        """Validation Summary used when the LLM validator is skipped."""
+        lines = [f"- {f.check}: {f.status} — {f.notes}" for f in self.findings]
+        if self.passed:
+            verdict = "APPROVED ✅ (all automated checks passed; the LLM review was skipped)"
+        else:
+            verdict = "NEEDS REVISION ⚠️ (automated checks only; the LLM review was disabled)"
+        lines.append(f"- Overall Verdict: {verdict}")
+        return "\n".join(lines)
+
+
+def precheck(inputs: dict, budget_text: str, itinerary_text: str) -> PrecheckReport:
+    """Run the budget and itinerary checks for one plan."""
+    report = PrecheckReport()
+    budget_usd = float(inputs.get("budget_usd") or 0)
+    num_days = int(inputs.get("num_days") or 0)
+
+    table = parse_budget_table(budget_text or "")
+    days = parse_itinerary(itinerary_text or "")
+    report.day_titles = [days[n]["title"] for n in sorted(days)]
+
+    # --- budget table arithmetic ---
+    parts = [table.get(c) for c in _CATEGORIES[:-1]]
+    total = table.get("total")
+    if total is None or any(p is None for p in parts):
+        missing = [c for c in _CATEGORIES if table.get(c) is None]
+        report.findings.append(Finding(
+            "Budget Table", "FAIL", f"Could not read: {', '.join(missing)}"))
+    elif abs(sum(parts) - total) > 1:
+        report.findings.append(Finding(
+            "Budget Table", "FAIL",
+            f"Categories add up to ${sum(parts):,.2f}, table total is ${total:,.2f}"))
+    else:
+        report.findings.append(Finding(
+            "Budget Table", "PASS", f"Categories add up to ${total:,.2f}"))
+
+    # --- grand total vs budget ---
+    if total is not None and budget_usd:
+        if total <= budget_usd:
+            report.findings.append(Finding(
+                "Budget Alignment", "PASS",
+                f"Grand total ${total:,.2f} is within ${budget_usd:,.2f}"))
+        else:
+            report.findings.append(Finding(
+                "Budget Alignment", "FAIL",
+                f"Grand total ${total:,.2f} exceeds ${budget_usd:,.2f} "
+                f"by ${total - budget_usd:,.2f}"))
+
+    # --- itinerary daily spend vs budget ---
+    spends = [d["spend"] for d in days.values() if d["spend"] is not None]
+    if total is not None and table.get("accommodation") is not None and spends:
+        expected = total - table["accommodation"]
+        planned = sum(spends)
+        if expected > 0 and abs(planned - expected) / expected <= _SPEND_TOLERANCE:
+            status = "PASS"
+        else:
+            status = "WARN"
+        report.findings.append(Finding(
+            "Daily Spend", status,
+            f"Itinerary daily spends total ${planned:,.2f} vs ${expected:,.2f} "
+            f"budgeted for food, transport and activities"))
+    elif days:
+        report.findings.append(Finding(
+            "Daily Spend", "WARN", "No 'Estimated Daily Spend' figures found"))
+
+    # --- day coverage ---
+    if num_days:
+        expected_days = set(range(1, num_days + 1))
+        missing = sorted(expected_days - set(days))
+        extra = sorted(set(days) - expected_days)
+        no_segments = sorted(n for n, d in days.items() if len(d["segments"]) < 3)
+        if missing or extra:
+            notes = []
+            if missing:
+                notes.append(f"missing day(s) {', '.join(map(str, missing))}")
+            if extra:
+                notes.append(f"unexpected day(s) {', '.join(map(str, extra))}")
+            report.findings.append(Finding("Day Coverage", "FAIL", "; ".join(notes)))
+        elif no_segments:
+            report.findings.append(Finding(
+                "Day Coverage", "WARN",
+                f"Day(s) {', '.join(map(str, no_segments))} lack a morning, afternoon or evening segment"))
+        else:
+            report.findings.append(Finding(
+                "Day Coverage", "PASS", f"All {num_days} days planned with three segments"))
+
+    log.info(
+        "[Precheck] " + ", ".join(f"{f.check}={f.status}" for f in report.findings)
+    )
+    return report
@@ -0,0 +1,160 @@
+"""
+workers.py
+
+Supervisor for planning worker processes. Each worker process claims jobs
+from the durable job queue (job_store.py) and plans them, one at a time,
+with its own crew, LLM clients and GIL, so throughput grows with the
+number of processes. The queue is a local SQLite file, so every worker
+runs on the machine that holds it.
+
+The supervisor restarts a worker that dies; the job it was running is
+picked up again once its lease expires (JOB_LEASE_S) and resumes from its
+checkpoints. On SIGTERM / Ctrl-C, workers hand their jobs back to the
+queue and exit.
+
+    plan_workers --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+from travel_planner.logger import get_logger
+
+log = get_logger(__name__)
+
+# a worker exiting sooner than this after starting counts as a crash loop
+_MIN_UPTIME_S = 10.0
+_MAX_RESTART_DELAY_S = 30.0
+
+
+def _load_env() -> None:
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+
+def _raise_exit(signum, frame) -> None:
+    raise SystemExit(128 + signum)
+
+
+def _worker_main(name: str) -> None:
+    """Body of one worker process."""
+    _load_env()
+    # SIGTERM interrupts the running plan; run_job then hands the job back
+    signal.signal(signal.SIGTERM, _raise_exit)
+    signal.signal(signal.SIGINT, _raise_exit)
+
+    # heavy; imported in the child only
+    from travel_planner.crew import get_crew_pool
+    from travel_planner.job_store import get_job_store
+    from travel_planner.jobs import run_worker
+
+    try:
+        get_crew_pool().warm(1)
+    except Exception as e:
+        log.error(f"[Workers] {name}: could not pre-build a crew: {e}")
+    log.info(f"[Workers] {name} (pid {os.getpid()}) ready")
+    run_worker(get_job_store(), name, threading.Event())
+
+
+class Supervisor:
+    """Keeps `workers` worker processes running until stopped."""
+
+    def __init__(self, workers: int, grace_s: float = 30.0):
+        self.workers = max(1, workers)
+        self.grace_s = grace_s
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs: list = [None] * self.workers
+        self._started: list = [0.0] * self.workers
+        self._failures: list = [0] * self.workers
+        self._stopping = threading.Event()
+
+    def _spawn(self, slot: int) -> None:
+        proc = self._ctx.Process(
+            target=_worker_main, args=(f"worker-{slot}",), name=f"plan-worker-{slot}", daemon=False
+        )
+        proc.start()
+        self._procs[slot] = proc
+        self._started[slot] = time.monotonic()
+
+    def _check(self, slot: int) -> None:
+        """Start the slot's worker, or restart it (with backoff if it keeps dying)."""
+        proc = self._procs[slot]
+        if proc is not None and proc.is_alive():
+            if time.monotonic() - self._started[slot] >= _MIN_UPTIME_S:
+                self._failures[slot] = 0
+            return
+        if proc is not None:
+            uptime = time.monotonic() - self._started[slot]
+            self._failures[slot] = self._failures[slot] + 1 if uptime < _MIN_UPTIME_S else 0
+            delay = min(_MAX_RESTART_DELAY_S, 2 ** self._failures[slot] - 1)
+            log.warning(
+                f"[Workers] worker-{slot} (pid {proc.pid}) exited with code {proc.exitcode}; "
+                f"restarting{f' in {delay}s' if delay else ''}"
+            )
+            if self._stopping.wait(delay):
+                return
+        self._spawn(slot)
+
+    def run(self) -> None:
+        """Supervise until stop() (or SIGTERM / SIGINT in the main thread)."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+            signal.signal(signal.SIGINT, lambda *_: self.stop())
+        log.info(f"[Workers] Supervising {self.workers} worker process(es)")
+        while not self._stopping.is_set():
+            for slot in range(self.workers):
+                if not self._stopping.is_set():
+                    self._check(slot)
+            self._stopping.wait(1.0)
+        self._shutdown()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _shutdown(self) -> None:
+        alive = [p for p in self._procs if p is not None and p.is_alive()]
+        log.info(f"[Workers] Stopping {len(alive)} worker(s)")
+        for proc in alive:
+            proc.terminate()
+        deadline = time.monotonic() + self.grace_s
+        for proc in alive:
+            proc.join(timeout=max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                log.warning(f"[Workers] pid {proc.pid} did not exit in {self.grace_s}s; killing")
+                proc.kill()
+                proc.join()
+        log.info("[Workers] All workers stopped.")
+
+
+def serve_workers() -> None:
+    """
+    Run planning worker processes on the durable job queue.
+    Usage: plan_workers [--workers N]
+    """
+    _load_env()
+    parser = argparse.ArgumentParser(prog="plan_workers", description=serve_workers.__doc__)
+    parser.add_argument(
+        "--workers", type=int,
+        default=int(os.getenv("PLAN_WORKER_PROCESSES", str(os.cpu_count() or 2))),
+        help="worker processes to keep running (default: CPU count)",
+    )
+    args = parser.parse_args()
+
+    for var in ("GROQ_API_KEY", "SERPER_API_KEY"):
+        if not os.getenv(var):
+            log.error(f"[Workers] Missing: {var}")
+            print(f" {var} is not set. Add it to your .env file")
+            sys.exit(1)
+
+    from travel_planner.job_store import get_job_store
+    store = get_job_store()  # creates the schema before the workers race for it
+    log.info(f"[Workers] Queue at {store.path}: {store.counts()}")
+    Supervisor(args.workers).run()
@@ -0,0 +1,72 @@
+"""Job leases: expiry hands a job to the next worker, JOB_MAX_ATTEMPTS ends it."""
+
+import time
+
+import pytest
+
+from travel_planner.job_store import JobStore
+
+_LEASE_S = 0.05
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+
+
+def _expire():
+    time.sleep(_LEASE_S * 2)
+
+
+def test_expired_lease_is_reclaimed(store):
+    job = store.submit({"destination": "Lisbon"})
+    first = store.claim("host:1:thread-0", _LEASE_S)
+    assert first.job_id == job.job_id
+    assert store.claim("host:2:thread-0", _LEASE_S) is None  # still leased
+
+    _expire()
+    second = store.claim("host:2:thread-0", _LEASE_S)
+    assert second.job_id == job.job_id
+    assert second.attempts == 2
+    assert second.worker == "host:2:thread-0"
+
+    # the worker that lost the lease can no longer renew or finish the job
+    assert not store.heartbeat(job.job_id, "host:1:thread-0", _LEASE_S)
+    assert not store.finish(job.job_id, "host:1:thread-0", "done")
+    assert store.finish(job.job_id, "host:2:thread-0", "done", output_path="plan.md")
+    assert store.get(job.job_id).status == "done"
+
+
+def test_heartbeat_keeps_the_lease(store):
+    job = store.submit({"destination": "Lisbon"})
+    store.claim("host:1:thread-0", _LEASE_S)
+    for _ in range(3):
+        time.sleep(_LEASE_S / 2)
+        assert store.heartbeat(job.job_id, "host:1:thread-0", _LEASE_S)
+    assert store.claim("host:2:thread-0", _LEASE_S) is None
+
+
+def test_job_fails_after_max_attempts(store):
+    job = store.submit({"destination": "Lisbon"})
+    store.claim("host:1:thread-0", _LEASE_S)
+    _expire()
+    store.claim("host:2:thread-0", _LEASE_S)
+    _expire()
+
+    assert store.claim("host:3:thread-0", _LEASE_S) is None
+    failed = store.get(job.job_id)
+    assert failed.status == "failed"
+    assert "host:2:thread-0" in failed.error
+
+
+def test_release_owned_only_touches_the_given_owners(store):
+    ids = [store.submit({"n": i}).job_id for i in range(2)]
+    store.claim("host:1:thread-1", 60)
+    store.claim("host:1:thread-10", 60)
+
+    assert store.release_owned(["host:1:thread-1"]) == 1
+    released, running = (store.get(job_id) for job_id in ids)
+    assert released.status == "queued"
+    assert released.attempts == 0  # a release does not count as an attempt
+    assert running.status == "running"
+    assert store.release_owned([]) == 0
@@ -0,0 +1,88 @@
+"""
+Plan store reuse, run end to end against the offline fakes: a fresh plan
+is answered from the store, one older than PLAN_STORE_MAX_AGE_HOURS makes
+the crew plan again.
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("crewai")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+from fakes import FakeLLM, FakeSerperServer  # noqa: E402
+
+_REQUEST = {
+    "destination": "Lisbon, Portugal",
+    "start_date":  "2027-05-10",
+    "end_date":    "2027-05-13",
+    "budget_usd":  1200,
+    "preferences": "history",
+}
+
+
+@pytest.fixture
+def plan_trip(tmp_path, monkeypatch):
+    """plan_trip wired to the fakes, with every store and the log file in tmp_path."""
+    with FakeSerperServer(latency_s=0) as serper:
+        for name, value in {
+            "SERPER_BASE_URL":            serper.url,
+            "SERPER_API_KEY":             "offline-test",
+            "GROQ_API_KEY":               "offline-test",
+            "TRAVEL_PLANNER_CACHE_DIR":   str(tmp_path / "cache"),
+            "TRAVEL_PLANNER_OUTPUT_DIR":  str(tmp_path / "output"),
+            "TRAVEL_PLANNER_METRICS_DIR": str(tmp_path / "metrics"),
+            "TRAVEL_PLANNER_LOG_DIR":     str(tmp_path / "logs"),
+            "PLAN_STORE_ENABLED":         "1",
+            "CHECKPOINTS_ENABLED":        "1",
+            "SERPER_QPS":                 "0",
+        }.items():
+            monkeypatch.setenv(name, value)
+
+        import travel_planner.checkpoints as checkpoints
+        import travel_planner.crew as crew_module
+        import travel_planner.plan_store as plan_store
+
+        monkeypatch.setattr(checkpoints, "_store", None)
+        monkeypatch.setattr(plan_store, "_store", None)
+        monkeypatch.setattr(crew_module, "_crew_pool", None)
+        monkeypatch.setattr(crew_module, "_get_llm", lambda: FakeLLM(latency_s=0))
+        yield crew_module.plan_trip
+
+
+def _inputs() -> dict:
+    from travel_planner.batch import normalise_inputs
+    return normalise_inputs(dict(_REQUEST))
+
+
+def test_fresh_plan_is_reused(plan_trip):
+    first = plan_trip(_inputs())
+    assert not first.reused
+    assert first.llm_calls > 0
+
+    again = plan_trip(_inputs())
+    assert again.reused
+    assert again.llm_calls == 0
+    assert again.run_id == first.run_id
+
+
+def test_stale_plan_runs_the_crew(plan_trip):
+    from travel_planner.plan_store import get_plan_store
+
+    first = plan_trip(_inputs())
+    assert first.llm_calls > 0
+
+    # age the stored plan past PLAN_STORE_MAX_AGE_HOURS
+    store = get_plan_store()
+    with store._lock:
+        store._conn.execute("UPDATE plans SET created_at = created_at - ?", (store.max_age_s + 60,))
+        store._conn.commit()
+    assert store.fresh(_inputs()) is None
+
+    stale = plan_trip(_inputs())
+    assert not stale.reused
+    assert stale.llm_calls > 0
+    assert stale.run_id != first.run_id
+    assert store.fresh(_inputs()) is not None
@@ -0,0 +1,40 @@
+"""Shared token buckets: taking quota, waiting for the refill, blocking after a 429."""
+
+import pytest
+
+from travel_planner.rate_limit import Limit, TokenBuckets
+
+
+@pytest.fixture
+def buckets(tmp_path):
+    return TokenBuckets(str(tmp_path / "rate_limits.sqlite3"))
+
+
+def test_take_until_the_burst_is_spent(buckets):
+    limit = Limit("serper:requests", per_minute=60, burst=2)
+    assert buckets.take(limit, 1) == 0
+    assert buckets.take(limit, 1) == 0
+    wait = buckets.take(limit, 1)
+    assert 0.9 < wait <= 1.0  # one unit refills per second
+
+
+def test_oversized_take_leaves_the_bucket_in_debt(buckets):
+    limit = Limit("groq:tokens", per_minute=60, burst=2)
+    assert buckets.take(limit, 5) == 0
+    assert buckets.take(limit, 1) > 3.5
+
+
+def test_adjust_gives_back_unused_quota(buckets):
+    limit = Limit("groq:tokens", per_minute=60, burst=4)
+    assert buckets.take(limit, 4) == 0
+    buckets.adjust(limit, 3)
+    assert buckets.take(limit, 3) == 0
+
+
+def test_block_holds_every_taker_off(buckets):
+    limit = Limit("groq:requests", per_minute=600, burst=10)
+    buckets.block(limit, 5)
+    assert 4.5 < buckets.take(limit, 1) <= 5
+    # shared through the file with other processes
+    other = TokenBuckets(buckets.path)
+    assert other.take(limit, 1) > 4.5
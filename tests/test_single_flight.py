@@ -0,0 +1,72 @@
+"""SingleFlight: joiners share the leader's call, including its failure."""
+
+import threading
+
+import pytest
+
+from travel_planner.single_flight import SingleFlight
+
+_JOINERS = 3
+
+
+def _run_coalesced(flight: SingleFlight, outcome) -> tuple:
+    """
+    A leader whose call ends with `outcome` (returned, or raised when it is
+    an exception) and _JOINERS callers that join it while it runs.
+    Returns (leader's (result, shared) or error, joiners' the same).
+    """
+    release = threading.Event()
+    joined = threading.Semaphore(0)
+
+    def leader_fn(publish):
+        publish("started")  # replayed to each joiner as it subscribes
+        release.wait(5)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def call(fn, on_event, results):
+        try:
+            results.append(flight.do("key", fn, on_event=on_event))
+        except Exception as e:
+            results.append(e)
+
+    leader_result, joiner_results = [], []
+    leader = threading.Thread(target=call, args=(leader_fn, lambda _: joined.release(), leader_result))
+    leader.start()
+    assert joined.acquire(timeout=5)
+
+    joiners = [
+        threading.Thread(target=call, args=(pytest.fail, lambda _: joined.release(), joiner_results))
+        for _ in range(_JOINERS)
+    ]
+    for t in joiners:
+        t.start()
+    for _ in range(_JOINERS):
+        assert joined.acquire(timeout=5)
+    release.set()
+    for t in [leader, *joiners]:
+        t.join(5)
+    return leader_result[0], joiner_results
+
+
+def test_leader_error_reaches_every_joiner():
+    flight = SingleFlight("test")
+    error = ValueError("search failed")
+    leader, joiners = _run_coalesced(flight, error)
+    assert leader is error
+    assert joiners == [error] * _JOINERS
+    assert flight.in_flight() == 0
+
+
+def test_joiners_get_the_leader_result():
+    flight = SingleFlight("test")
+    leader, joiners = _run_coalesced(flight, "plan")
+    assert leader == ("plan", False)
+    assert joiners == [("plan", True)] * _JOINERS
+
+
+def test_a_finished_call_is_not_shared():
+    flight = SingleFlight("test")
+    assert flight.do("key", lambda publish: 1) == (1, False)
+    assert flight.do("key", lambda publish: 2) == (2, False)